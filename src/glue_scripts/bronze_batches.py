@@ -0,0 +1,37 @@
+import math
+
+# Batch planning of the Bronze -> Silver job: a run's new bronze files are cut
+# into batches of about max_batch_bytes of input, sized by the estimated
+# uncompressed bytes of each file, since that is what Spark reads.
+
+# NDJSON, plain or compressed: Spark picks the codec from the extension. bzip2
+# files are still split across tasks, gzip and zstd files are one task each.
+# Values are the expected uncompressed/compressed size ratios for batch sizing.
+BRONZE_FILE_SUFFIXES = {".json": 1, ".json.gz": 8, ".json.bz2": 10, ".json.zst": 8}
+
+
+def input_bytes(f):
+    # Estimated uncompressed size of a bronze file ({"key", "size", ...})
+    for suffix, ratio in BRONZE_FILE_SUFFIXES.items():
+        if f["key"].endswith(suffix):
+            return f["size"] * ratio
+    return f["size"]
+
+
+def plan_batches(files, max_batch_bytes):
+    # Consecutive (key-ordered, so time-ordered) runs of files of about equal
+    # input size, none above max_batch_bytes unless a single file is
+    total_bytes = sum(input_bytes(f) for f in files)
+    batch_count = max(1, math.ceil(total_bytes / max_batch_bytes))
+    target_bytes = total_bytes / batch_count
+
+    batches, current, current_bytes = [], [], 0
+    for f in files:
+        if current and current_bytes + input_bytes(f) > target_bytes:
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(f)
+        current_bytes += input_bytes(f)
+    if current:
+        batches.append(current)
+    return batches
@@ -1,12 +1,43 @@
+import builtins
+import json
 import logging
 import sys
+import uuid
+from datetime import datetime, timedelta
 
+import boto3
 from awsglue.context import GlueContext
 from awsglue.dynamicframe import DynamicFrame
 from awsglue.job import Job
 from awsglue.utils import getResolvedOptions
+from bronze_batches import BRONZE_FILE_SUFFIXES, input_bytes, plan_batches
+from job_args import get_optional_arg
+from layer_stats import count_live_rows, parquet_file_stats, record_batch_rows
+from partition_commit import (
+    BATCH_FILE_PREFIX,
+    batch_file_pattern,
+    batch_id_for,
+    parquet_write_options,
+    record_changed_partitions,
+    write_partitioned_batch,
+)
 from pyspark.context import SparkContext
+from pyspark.sql import Observation
 from pyspark.sql.functions import *
+from s3_listing import iter_daily_objects, iter_keys, iter_objects, prefix_exists
+from silver_transforms import (
+    BRONZE_SCHEMA,
+    EXPECTED_FIELDS,
+    add_enrichment_fields,
+    bronze_read_schema,
+    cast_data_types,
+    dedup_index_rows,
+    drop_indexed_event_ids,
+    silver_columns,
+    tag_validation_failures,
+    validation_rules,
+)
+from writer_lease import acquire_lease, release_lease
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +52,56 @@ job = Job(glueContext)
 # Get job parameters
 args = getResolvedOptions(sys.argv, ["JOB_NAME"])
 
+
+# Unknown bronze columns: "off", "warn" (log them) or "fail" (stop the run)
+schema_drift_mode = get_optional_arg("schema_drift_mode", "warn")
+schema_drift_sample_lines = int(get_optional_arg("schema_drift_sample_lines", "1000"))
+# Extra actions for debugging (schema print), off in production
+diagnostic_counts = get_optional_arg("diagnostic_counts", "false").lower() == "true"
+# How far back the cross-run event_id dedup looks, 0 turns it off
+dedup_window_days = int(get_optional_arg("dedup_window_days", "7"))
+metrics_namespace = get_optional_arg(
+    "metrics_namespace", "ServerlessDataPipeline/DataQuality"
+)
+# Executor cores of the job (terraform derives them from number_of_workers and
+# worker_type); a backlog is processed in batches of about batch_mb_per_core MB
+# of bronze input per core. Without the argument Spark's parallelism is used.
+executor_cores = int(get_optional_arg("executor_cores", str(sc.defaultParallelism)))
+batch_mb_per_core = int(get_optional_arg("batch_mb_per_core", "128"))
+# Bronze is listed from the manifest's low-water mark minus this many days,
+# which catches files that arrive after later days; full_bronze_listing lists
+# it all
+bronze_lookback_days = int(get_optional_arg("bronze_lookback_days", "1"))
+full_bronze_listing = get_optional_arg("full_bronze_listing", "false").lower() == "true"
+# Lease of writer_lease.py, held for the whole run (minutes, about the job
+# timeout), and how long to wait for a fast-path writer to finish
+writer_lease_minutes = int(get_optional_arg("writer_lease_minutes", "30"))
+writer_lease_wait_seconds = int(get_optional_arg("writer_lease_wait_seconds", "600"))
+# Bronze fields carried into silver: "default" (what validation, enrichment and
+# gold use), "all" or a comma-separated allowlist. With silver_raw the other
+# fields (except client_ip) are kept in silver_raw/, keyed by event_id.
+silver_column_names = silver_columns(get_optional_arg("silver_columns", "default"))
+silver_raw = get_optional_arg("silver_raw", "false").lower() == "true"
+# Silver layout: rows sorted within each file by the clustering key and bloom
+# filters on high-cardinality lookup columns; the per-file min/max of those
+# columns is logged from the written footers
+silver_sort_key = [
+    c.strip()
+    for c in get_optional_arg("silver_sort_key", "event_ts").split(",")
+    if c.strip()
+]
+silver_bloom_columns = [
+    c.strip()
+    for c in get_optional_arg("silver_bloom_columns", "event_id,user_id").split(",")
+    if c.strip()
+]
+silver_file_stats = get_optional_arg("silver_file_stats", "true").lower() == "true"
+raw_column_names = [
+    name
+    for name in BRONZE_SCHEMA.fieldNames()
+    if name not in silver_column_names and name != "client_ip"
+]
+
 # Set default values
 bucket = "assignment5-data-lake"
 
@@ -28,331 +109,586 @@ logger.info("Reading from S3 bronze folder, writing to S3 silver folder")
 
 # Define S3 paths
 bronze_path = f"s3://{bucket}/bronze/"
-silver_path = f"s3://{bucket}/silver/"
+silver_prefix = "silver/"
+silver_path = f"s3://{bucket}/{silver_prefix}"
+quarantine_prefix = "quarantine/"
+silver_raw_prefix = "silver_raw/"
+
+# event_id dedup index, partitioned by event_date
+dedup_index_prefix = "_dedup/event_ids/"
+dedup_index_path = f"s3://{bucket}/{dedup_index_prefix}"
+
+# Processed-file manifest, committed only after the silver write succeeds: a
+# small top-level file with one shard of processed keys per bronze day
+manifest_key = "_manifests/bronze_silver/manifest.json"
+manifest_shard_prefix = "_manifests/bronze_silver/days/"
+manifest_inbox_prefix = "_manifests/bronze_silver/external/"
+bronze_file_prefix = "bronze/logs_"
+
+# Stage name -> Observation, filled in by observe_rows
+run_observations = {}
 
 logger.info(f"Reading from bronze structure: {bronze_path}")
 logger.info(f"Writing to silver layer: {silver_path}")
+logger.info(f"Silver columns: {silver_column_names}")
+if silver_raw:
+    logger.info(f"Other columns to {silver_raw_prefix}: {raw_column_names}")
 
 """
 ETL function
 """
 
 
-def handle_schema_validation(df):  # To validate schema
-    expected_fields = [
-        "event_id",
-        "event_ts",
-        "session_id",
-        "method",
-        "path",
-        "status",
-        "bytes_sent",
-        "response_time_ms",
-        "referrer",
-        "user_agent",
-        "user_id",
-        "cache_status",
-        "cdn_edge",
-        "db_query_time_ms",
-        "request_id",
-    ]
-
-    existing_fields = df.columns
-    missing_fields = [
-        field for field in expected_fields if field not in existing_fields
-    ]
+def apply_data_validations(df):
+    # Returns (valid rows, rejected rows). The tagged frame is cached so the
+    # quarantine and silver writes share one pass over the input.
+    df = tag_validation_failures(df).cache()
 
-    if missing_fields:
-        logger.warning(f"Missing fields: {missing_fields}")
-        for field in missing_fields:
-            df = df.withColumn(field, lit(None))
+    rejected_df = df.filter(size(col("failed_rules")) > 0)
+    valid_df = df.filter(size(col("failed_rules")) == 0).drop("failed_rules")
 
-    return df
+    return valid_df, rejected_df
 
 
-def cast_data_types(df):
-    df = df.withColumn("status", col("status").cast("int"))
-    df = df.withColumn("bytes_sent", col("bytes_sent").cast("long"))
-    df = df.withColumn("response_time_ms", col("response_time_ms").cast("int"))
-    df = df.withColumn("db_query_time_ms", col("db_query_time_ms").cast("int"))
+def observe_rows(df, stage):
+    # Row count of a stage, collected by whichever action computes df
+    observation = Observation(stage)
+    run_observations[stage] = observation
+    return df.observe(observation, count(lit(1)).alias("rows"))
 
-    # Handle optional fields
-    df = df.withColumn(
-        "user_id", when(col("user_id").isNull(), lit(None)).otherwise(col("user_id"))
-    )
-    df = df.withColumn(
-        "referrer",
-        when(col("referrer").isNull(), lit("direct")).otherwise(col("referrer")),
-    )
 
-    return df
+def run_stats():
+    # Only call once the actions computing every observed stage have run
+    return {
+        stage: observation.get["rows"] or 0
+        for stage, observation in run_observations.items()
+    }
 
 
-def apply_data_validations(df):
-    initial_count = df.count()
+def drop_previously_seen(df, s3_client, batch_id):
+    # Cross-run dedup against the event_id index of the last dedup_window_days.
+    # Index files of this batch (from an earlier attempt) do not count.
+    if dedup_window_days <= 0 or not prefix_exists(
+        s3_client, bucket, dedup_index_prefix
+    ):
+        return df
 
-    # HTTP validations
-    df = df.filter((col("status").isNotNull()) & (col("status").between(100, 599)))
-    df = df.filter(
-        col("method").isin(["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"])
+    index = spark.read.parquet(dedup_index_path).filter(
+        (col("event_date") >= date_sub(current_date(), dedup_window_days))
+        & ~input_file_name().contains(batch_file_pattern(batch_id))
     )
-
-    # Performance validations
-    df = df.filter(
-        (col("response_time_ms").isNotNull())
-        & (col("response_time_ms") > 0)
-        & (col("response_time_ms") <= 30000)
+    return drop_indexed_event_ids(df, index)
+
+
+def update_dedup_index(df, s3_client, batch_id):
+    # New silver event_ids
+    write_partitioned_batch(
+        dedup_index_rows(df),
+        s3_client,
+        bucket,
+        dedup_index_prefix,
+        batch_id,
+        ["event_date"],
     )
-    df = df.filter(
-        (col("bytes_sent").isNotNull())
-        & (col("bytes_sent") >= 0)
-        & (col("bytes_sent") <= 10000000)
+
+
+def write_quarantine(rejected_df, run_id, s3_client, batch_id):
+    # Per-rule counters are observed while the quarantine write runs
+    rule_names = [name for name, _ in validation_rules()]
+    observation = Observation("validation")
+    rejected_df = rejected_df.observe(
+        observation,
+        count(lit(1)).alias("rejected"),
+        *[
+            sum(array_contains(col("failed_rules"), name).cast("long")).alias(name)
+            for name in rule_names
+        ],
     )
 
-    # Data integrity validations
-    df = df.filter(col("event_ts").isNotNull())
-    df = df.filter(
-        (col("path").isNotNull()) & (col("path") != "") & (col("path") != "//")
+    # PII removal applies to quarantined rows as well
+    quarantine_df = (
+        rejected_df.drop("client_ip")
+        .withColumn("run_id", lit(run_id))
+        .withColumn("quarantine_date", current_date())
+    )
+    write_partitioned_batch(
+        quarantine_df,
+        s3_client,
+        bucket,
+        quarantine_prefix,
+        batch_id,
+        ["quarantine_date"],
     )
-    df = df.filter((col("client_ip").isNotNull()) & (col("client_ip") != ""))
 
-    # Deduplication
-    df = df.dropDuplicates(["event_id"])
+    metrics = {name: value or 0 for name, value in observation.get.items()}
+    logger.info(f"Validation: {metrics['rejected']:,} rows quarantined")
+    for name in rule_names:
+        if metrics[name]:
+            logger.info(f"  {name}: {metrics[name]:,}")
 
-    # PII removal
-    df = df.drop("client_ip")
+    publish_quality_metrics(metrics, rule_names)
+    return metrics
 
-    final_count = df.count()
-    logger.info(
-        f"Validation: {initial_count:,} → {final_count:,} ({initial_count-final_count:,} rejected)"
-    )
 
-    return df
+def report_silver_file_stats(s3_client, batch_id, partitions):
+    # Footer statistics of the files the batch committed, so the effect of the
+    # clustering key on row group skipping is visible in the job log
+    columns = list(dict.fromkeys(silver_sort_key + silver_bloom_columns))
+    try:
+        for partition in partitions:
+            file_prefix = f"{silver_prefix}{partition}/{BATCH_FILE_PREFIX}{batch_id}-"
+            for key in iter_keys(s3_client, bucket, file_prefix):
+                stats = parquet_file_stats(spark, f"s3://{bucket}/{key}", columns)
+                ranges = ", ".join(
+                    f"{name}=[{low} .. {high}]"
+                    for name, (low, high) in stats["columns"].items()
+                )
+                logger.info(
+                    f"Silver file {key}: {stats['rows']:,} rows, "
+                    f"{stats['row_groups']} row groups, {ranges}"
+                )
+    except Exception as stats_error:
+        logger.warning(f"Could not read silver file statistics: {stats_error}")
 
 
-def add_enrichment_fields(df):
-    # Status indicators
-    df = df.withColumn(
-        "is_client_error", when(col("status").between(400, 499), 1).otherwise(0)
-    )
-    df = df.withColumn(
-        "is_server_error", when(col("status").between(500, 599), 1).otherwise(0)
-    )
-    df = df.withColumn(
-        "is_success", when(col("status").between(200, 299), 1).otherwise(0)
+def write_silver_raw(paths, s3_client, batch_id):
+    # One row per bronze record: event_id plus the fields left out of silver
+    raw_df = (
+        spark.read.schema(
+            bronze_read_schema(["event_id", "event_ts"] + raw_column_names)
+        )
+        .json(paths)
+        .select(
+            "event_id",
+            to_date(col("event_ts")).alias("event_date"),
+            *raw_column_names,
+        )
     )
-    df = df.withColumn(
-        "is_redirect", when(col("status").between(300, 399), 1).otherwise(0)
+    write_partitioned_batch(
+        raw_df, s3_client, bucket, silver_raw_prefix, batch_id, ["event_date"]
     )
 
-    # Performance indicators
-    df = df.withColumn("is_slow", when(col("response_time_ms") > 1000, 1).otherwise(0))
-    df = df.withColumn("is_fast", when(col("response_time_ms") < 100, 1).otherwise(0))
 
-    # Size indicators
-    df = df.withColumn(
-        "is_large_response", when(col("bytes_sent") > 100000, 1).otherwise(0)
-    )
-    df = df.withColumn(
-        "is_small_response", when(col("bytes_sent") < 1000, 1).otherwise(0)
-    )
+def publish_quality_metrics(metrics, rule_names):
+    try:
+        dimensions = [{"Name": "JobName", "Value": args["JOB_NAME"]}]
+        metric_data = [
+            {
+                "MetricName": "RejectedRecords",
+                "Dimensions": dimensions,
+                "Value": metrics["rejected"],
+                "Unit": "Count",
+            }
+        ] + [
+            {
+                "MetricName": "RuleFailures",
+                "Dimensions": dimensions + [{"Name": "Rule", "Value": name}],
+                "Value": metrics[name],
+                "Unit": "Count",
+            }
+            for name in rule_names
+        ]
+        boto3.client("cloudwatch").put_metric_data(
+            Namespace=metrics_namespace, MetricData=metric_data
+        )
+    except Exception as metrics_error:
+        logger.warning(f"Could not publish data quality metrics: {metrics_error}")
+
+
+def check_schema_drift(paths):
+    # Infers the schema of the first few lines only, never the whole input
+    if schema_drift_mode == "off":
+        return []
+
+    sample = spark.read.text(paths).limit(schema_drift_sample_lines)
+    sample_schema = spark.read.json(sample.rdd.map(lambda row: row.value)).schema
+    unknown_fields = [
+        field.name
+        for field in sample_schema.fields
+        if field.name not in BRONZE_SCHEMA.fieldNames()
+        and field.name != "_corrupt_record"
+    ]
 
-    # Date partitions
-    df = df.withColumn("event_date", to_date(col("event_ts")))
-    df = df.withColumn("year", year(col("event_date")))
-    df = df.withColumn("month", month(col("event_date")))
-    df = df.withColumn("day", dayofmonth(col("event_date")))
-
-    # Session tracking
-    df = df.withColumn(
-        "user_session",
-        concat(
-            coalesce(col("user_id"), lit("anonymous")),
-            lit("_"),
-            date_format(col("event_ts"), "yyyy-MM-dd-HH"),
-        ),
-    )
-    df = df.withColumn("session_date", to_date(col("event_ts")))
-    df = df.withColumn("session_hour", hour(col("event_ts")))
+    if unknown_fields:
+        message = f"Schema drift: unknown bronze columns {unknown_fields}"
+        if schema_drift_mode == "fail":
+            raise ValueError(message)
+        logger.warning(f"{message} (not read into silver)")
+    return unknown_fields
+
+
+def list_bronze_files(s3_client, manifest):
+    # Bronze log files with the ETag/size needed for the manifest, from the
+    # committed low-water mark on, listed in parallel one logs_YYYYMMDD
+    # sub-prefix per day. Before the first run with a low-water mark (or when
+    # asked to) it is one full listing.
+    low_water_day = manifest.get("low_water_day")
+    if low_water_day and not full_bronze_listing:
+        first_day = datetime.strptime(low_water_day, "%Y%m%d").date()
+        first_day -= timedelta(days=bronze_lookback_days)
+        logger.info(f"Listing bronze files from {first_day}")
+        objects = iter_daily_objects(
+            s3_client, bucket, bronze_file_prefix, first_day, include_earlier=False
+        )
+    else:
+        objects = iter_objects(s3_client, bucket, bronze_file_prefix)
+
+    # Listings come back in key order, and logs_YYYYMMDD_HHMMSS sorts by time
+    return [
+        {"key": obj["Key"], "etag": obj["ETag"].strip('"'), "size": obj["Size"]}
+        for obj in objects
+        if obj["Key"].endswith(tuple(BRONZE_FILE_SUFFIXES))
+    ]
 
-    return df
 
+def manifest_day(key):
+    # Manifest shard of a bronze key: its logs_YYYYMMDD day, or "other"
+    day = key[len(bronze_file_prefix) :][:8]
+    if key.startswith(bronze_file_prefix) and len(day) == 8 and day.isdigit():
+        return day
+    return "other"
 
-def process_data():
-    try:
-        logger.info("Starting ETL processing")
-        logger.info("Reading from flat bronze layer")
-        logger.info(f"Bronze path: {bronze_path}")
-        logger.info(f"Bucket: {bucket}")
 
-        # Validate S3 path before reading
-        import boto3
+def dated_days(files):
+    # logs_YYYYMMDD days of files, without the "other" shard
+    return [day for day in (manifest_day(f["key"]) for f in files) if day != "other"]
 
-        s3_client = boto3.client("s3")
-        try:
-            # Check if bronze folder exists and has objects
-            response = s3_client.list_objects_v2(
-                Bucket=bucket, Prefix="bronze/", MaxKeys=1
-            )
-            if "Contents" not in response:
-                logger.error("No objects found in bronze folder")
-                logger.error(
-                    "This suggests no data has been uploaded to the bronze layer"
-                )
-                return False
-            else:
-                logger.info(
-                    f"Bronze folder validation: Found {response.get('KeyCount', 0)} objects"
-                )
-        except Exception as s3_error:
-            logger.error(f"Cannot access S3 bucket '{bucket}': {s3_error}")
-            return False
-
-        raw_data = glueContext.create_dynamic_frame.from_options(
-            connection_type="s3",
-            connection_options={"paths": [bronze_path], "recurse": True},
-            format="json",
-            transformation_ctx="bronze_data_",
-        )
 
-        df = raw_data.toDF()
-        initial_count = df.count()
-        logger.info(f"Bronze data count (total): {initial_count:,}")
+def read_json(s3_client, key, default):
+    try:
+        return json.loads(s3_client.get_object(Bucket=bucket, Key=key)["Body"].read())
+    except s3_client.exceptions.NoSuchKey:
+        return default
+
+
+def load_manifest(s3_client):
+    # The small top-level manifest only; day shards are read when needed
+    manifest = read_json(s3_client, manifest_key, None)
+    if manifest is None:
+        logger.info("No bronze manifest yet, treating every file as unprocessed")
+        manifest = {"version": 0, "days": {}}
+    manifest["shards"] = {}
+    manifest["changed_days"] = set()
+
+    if "files" in manifest:
+        # Unsharded manifest of earlier runs, split up by the next commit
+        for key, entry in manifest.pop("files").items():
+            manifest["shards"].setdefault(manifest_day(key), {})[key] = entry
+        manifest["days"] = {day: {} for day in manifest["shards"]}
+        manifest["changed_days"].update(manifest["shards"])
+
+    # Fold in entries other writers (the Lambda fast path) dropped in the inbox
+    inbox_keys = []
+    for key in iter_keys(s3_client, bucket, manifest_inbox_prefix):
+        entry = json.loads(s3_client.get_object(Bucket=bucket, Key=key)["Body"].read())
+        day = manifest_day(entry["key"])
+        manifest_shard(s3_client, manifest, day)[entry["key"]] = {
+            "etag": entry["etag"],
+            "size": entry["size"],
+            "run_id": entry.get("run_id", "external"),
+        }
+        manifest["changed_days"].add(day)
+        inbox_keys.append(key)
+
+    logger.info(
+        f"Bronze manifest v{manifest['version']}: {len(manifest['days']):,} "
+        f"days ({len(inbox_keys):,} files from inbox)"
+    )
+    return manifest, inbox_keys
+
+
+def manifest_shard(s3_client, manifest, day):
+    # Processed files of one bronze day, read on first use
+    if day not in manifest["shards"]:
+        shard = {"files": {}}
+        if day in manifest["days"]:
+            shard = read_json(s3_client, f"{manifest_shard_prefix}{day}.json", shard)
+        manifest["shards"][day] = shard["files"]
+    return manifest["shards"][day]
+
+
+def select_unprocessed(s3_client, bronze_files, manifest):
+    # New keys, and keys overwritten since they were processed (ETag changed)
+    return [
+        f
+        for f in bronze_files
+        if manifest_shard(s3_client, manifest, manifest_day(f["key"]))
+        .get(f["key"], {})
+        .get("etag")
+        != f["etag"]
+    ]
 
-        if initial_count == 0:
-            logger.info("No data in bronze layer")
-            return True
 
-        logger.info("Finding the most recent file by timestamp")
+def commit_manifest(s3_client, manifest, processed_files, inbox_keys, run_id):
+    # Rewrites only the day shards that changed, then bumps the top-level
+    # manifest. A shard is a single PUT: readers see its old or new version.
+    current_version = read_json(s3_client, manifest_key, {"version": 0})["version"]
+    if current_version != manifest["version"]:
+        raise RuntimeError(
+            f"Bronze manifest changed during the run "
+            f"(v{manifest['version']} -> v{current_version})"
+        )
 
-        import re
-        from datetime import datetime
+    for f in processed_files:
+        day = manifest_day(f["key"])
+        manifest_shard(s3_client, manifest, day)[f["key"]] = {
+            "etag": f["etag"],
+            "size": f["size"],
+            "run_id": run_id,
+        }
+        manifest["changed_days"].add(day)
+
+    updated_at = datetime.utcnow().isoformat()
+    for day in sorted(manifest["changed_days"]):
+        files = manifest["shards"][day]
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=f"{manifest_shard_prefix}{day}.json",
+            Body=json.dumps({"files": files}).encode("utf-8"),
+            ContentType="application/json",
+        )
+        manifest["days"][day] = {"files": len(files), "updated_at": updated_at}
+    changed_days = len(manifest["changed_days"])
+    manifest["changed_days"].clear()
+
+    manifest["version"] += 1
+    manifest["run_id"] = run_id
+    manifest["updated_at"] = updated_at
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=manifest_key,
+        Body=json.dumps(
+            {
+                name: manifest[name]
+                for name in ("version", "days", "low_water_day", "run_id", "updated_at")
+                if name in manifest
+            }
+        ).encode("utf-8"),
+        ContentType="application/json",
+    )
 
-        import boto3
+    # Inbox entries are part of the committed manifest now
+    for i in range(0, len(inbox_keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in inbox_keys[i : i + 1000]]},
+        )
 
-        s3_client = boto3.client("s3")
+    logger.info(
+        f"Committed bronze manifest v{manifest['version']}: "
+        f"{len(processed_files):,} files added by run {run_id}, "
+        f"{changed_days:,} day shards rewritten"
+    )
 
-        try:
-            # List all bronze files
-            response = s3_client.list_objects_v2(Bucket=bucket, Prefix="bronze/")
-
-            if "Contents" not in response:
-                logger.warning("No files found in bronze folder")
-                return True
-
-            # files matching the pattern logs_YYYYMMDD_HHMMSS.json
-            log_files = []
-            pattern = r"bronze/logs_(\d{8})_(\d{6})\.json$"
-
-            for obj in response["Contents"]:
-                key = obj["Key"]
-                match = re.match(pattern, key)
-                if match:
-                    date_str = match.group(1)
-                    time_str = match.group(2)
-
-                    # Parse timestamp from filename
-                    timestamp_str = f"{date_str}_{time_str}"
-                    timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-
-                    log_files.append(
-                        {
-                            "key": key,
-                            "timestamp": timestamp,
-                            "timestamp_str": timestamp_str,
-                        }
-                    )
-                    logger.debug(f"Found log file: {key} (timestamp: {timestamp})")
-
-            if not log_files:
-                logger.warning(
-                    "No log files matching pattern logs_YYYYMMDD_HHMMSS.json found"
-                )
-                return True
 
-            # Sort by timestamp and get the latest file
-            log_files.sort(key=lambda x: x["timestamp"], reverse=True)
-            latest_file = log_files[0]
+def configure_input_splits(batch_bytes):
+    # At least two input splits per core, between 16 MB and 128 MB each
+    # (builtins: the pyspark star import shadows min/max/sum)
+    split_bytes = builtins.min(batch_bytes // (2 * executor_cores), 128 * 1024 * 1024)
+    split_bytes = builtins.max(split_bytes, 16 * 1024 * 1024)
+    spark.conf.set("spark.sql.files.maxPartitionBytes", str(split_bytes))
+    return split_bytes
 
-            logger.info(f"LATEST FILE SELECTED: {latest_file['key']}")
-            logger.info(f"Timestamp: {latest_file['timestamp']}")
-            logger.info(f"Total log files found: {len(log_files)}")
 
-            # Process only the latest file
-            latest_path = f"s3://{bucket}/{latest_file['key']}"
-            logger.info(f"Reading latest file: {latest_path}")
+def process_batch(s3_client, manifest, batch_files, inbox_keys, run_id):
+    # Reads, validates and writes one batch, then commits it to the manifest.
+    # Returns the row counts of the batch.
+    run_observations.clear()
+    started_at = datetime.utcnow()
+    batch_bytes = builtins.sum(input_bytes(f) for f in batch_files)
 
-            latest_file_frame = glueContext.create_dynamic_frame.from_options(
-                connection_type="s3",
-                connection_options={"paths": [latest_path], "recurse": False},
-                format="json",
-                transformation_ctx="latest_file_data_",
-            )
-            df = latest_file_frame.toDF()
+    # Same files, same batch id: a retry replaces what an earlier attempt wrote
+    batch_id = batch_id_for(
+        "bronze_silver", sorted((f["key"], f["etag"]) for f in batch_files)
+    )
+    # Splits are cut from the stored (possibly compressed) bytes
+    split_bytes = configure_input_splits(builtins.sum(f["size"] for f in batch_files))
+    logger.info(
+        f"Batch {batch_id}: {len(batch_files):,} files, "
+        f"~{batch_bytes / 1024 / 1024:,.1f} MB of input, "
+        f"{split_bytes / 1024 / 1024:,.0f} MB input splits"
+    )
 
-            latest_count = df.count()
-            logger.info(f"Latest file data count: {latest_count:,} records")
+    # One scan over exactly the batch files, reading only the silver columns
+    new_paths = [f"s3://{bucket}/{f['key']}" for f in batch_files]
+    check_schema_drift(new_paths)
+    df = spark.read.schema(bronze_read_schema(silver_column_names)).json(new_paths)
 
-            if latest_count == 0:
-                logger.warning("No data in the latest file")
-                return True
+    # The other fields go to the cold table as they are, without the shuffles
+    if silver_raw and raw_column_names:
+        write_silver_raw(new_paths, s3_client, batch_id)
 
-        except Exception as e:
-            logger.error(f"Latest file processing failed: {e}")
-            logger.warning("Fallback: Processing all bronze data")
+    # Schema and type handling
+    if diagnostic_counts:
+        df.printSchema()
+    df = cast_data_types(
+        df, [name for name in EXPECTED_FIELDS if name in silver_column_names]
+    )
 
-            # Use the original df from the initial read
+    # Data quality validations, rejected rows go to quarantine
+    df, rejected_df = apply_data_validations(df)
+    df = observe_rows(df, "validated")
+    quality_metrics = write_quarantine(rejected_df, run_id, s3_client, batch_id)
+
+    # Deduplication (within the batch, then against earlier runs) and PII removal
+    df = df.dropDuplicates(["event_id"]).drop("client_ip")
+    df = observe_rows(df, "batch_unique")
+    df = drop_previously_seen(df, s3_client, batch_id)
+
+    # Add enrichment fields and processing metadata
+    df = add_enrichment_fields(df)
+    df = observe_rows(df, "silver").cache()
+
+    # Staged write, then the batch replaces its own files in each partition
+    silver_partitions = write_partitioned_batch(
+        df,
+        s3_client,
+        bucket,
+        silver_prefix,
+        batch_id,
+        ["year", "month", "day"],
+        sort_by=silver_sort_key,
+        options=parquet_write_options(silver_bloom_columns),
+    )
+    logger.info(f"Silver partitions written: {silver_partitions}")
+    # Change log entry, so Silver -> Gold reads only the partitions touched
+    record_changed_partitions(
+        s3_client, bucket, "silver", batch_id, silver_partitions, started_at
+    )
+    if silver_file_stats:
+        report_silver_file_stats(s3_client, batch_id, silver_partitions)
 
-        logger.info(f"Ready for processing: {df.count():,} records")
+    # Index the written event_ids (from the cache), then mark files processed
+    update_dedup_index(df, s3_client, batch_id)
+    commit_manifest(s3_client, manifest, batch_files, inbox_keys, run_id)
+    spark.catalog.clearCache()
 
-        # Schema and type handling
-        df.printSchema()
-        df = handle_schema_validation(df)
-        df = cast_data_types(df)
+    # Row counts of every stage, collected by the writes above
+    stats = run_stats()
+    stats["rejected"] = quality_metrics["rejected"]
 
-        # Data quality validations
-        df = apply_data_validations(df)
+    # Silver total from the stats file, recounted only if the file is missing
+    try:
+        silver_stats = record_batch_rows(
+            s3_client,
+            bucket,
+            "silver",
+            batch_id,
+            stats["silver"],
+            lambda: count_live_rows(spark, s3_client, bucket, silver_prefix),
+        )
+        stats["silver_total"] = silver_stats["total_rows"]
+    except Exception as count_error:
+        logger.warning(f"Could not get silver layer total count: {count_error}")
 
-        # Add enrichment fields and processing metadata
-        df = df.withColumn("processing_timestamp", current_timestamp())
-        df = add_enrichment_fields(df)
-        df = df.cache()
+    return stats
 
-        final_count = df.count()
-        logger.info(f"Final silver layer record count: {final_count:,}")
 
-        # Writing to silver layer with proper append mode using Spark DataFrame
-        logger.info("Writing to silver layer with APPEND mode using Spark DataFrame")
+def process_data():
+    try:
+        logger.info("Starting ETL processing")
+        logger.info("Reading unprocessed files from flat bronze layer")
+        logger.info(f"Bronze path: {bronze_path}")
+        logger.info(f"Bucket: {bucket}")
 
-        #  Spark DataFrame  for  append mode
-        df.write.mode("append").partitionBy("year", "month", "day").format(
-            "parquet"
-        ).option("compression", "snappy").save(silver_path)
+        run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        s3_client = boto3.client("s3")
 
-        # Get total count in silver bucket after writing
+        # No fast-path write may run between listing bronze and the last commit
+        lease_key = acquire_lease(
+            s3_client,
+            bucket,
+            "glue",
+            writer_lease_minutes * 60,
+            writer_lease_wait_seconds,
+            waits_for=("fastpath",),
+            logger=logger,
+        )
         try:
-            silver_total_frame = glueContext.create_dynamic_frame.from_options(
-                connection_type="s3",
-                connection_options={"paths": [silver_path], "recurse": True},
-                format="parquet",
-            )
-            silver_total_df = silver_total_frame.toDF()
-            silver_total_count = silver_total_df.count()
-            logger.info(f"JOB COMPLETED: Wrote {final_count:,} new records to silver")
-            logger.info(f"SILVER LAYER TOTAL: {silver_total_count:,} records")
-        except Exception as count_error:
-            logger.warning(f"Could not get silver layer total count: {count_error}")
-
-        logger.info("ETL processing completed successfully!")
-        logger.info(f"Silver transformation complete: {final_count:,} records")
-
-        return True
+            return process_new_files(s3_client, run_id)
+        finally:
+            release_lease(s3_client, bucket, lease_key)
 
     except Exception as e:
         logger.error(f"Error in ETL processing: {e}")
         raise e
 
 
+def process_new_files(s3_client, run_id):
+    # Everything the run does while holding the writer lease
+    try:
+        manifest, inbox_keys = load_manifest(s3_client)
+        bronze_files = list_bronze_files(s3_client, manifest)
+    except Exception as s3_error:
+        logger.error(f"Cannot access S3 bucket '{bucket}': {s3_error}")
+        return False
+
+    new_files = select_unprocessed(s3_client, bronze_files, manifest)
+    logger.info(
+        f"Bronze files: {len(bronze_files):,} total, " f"{len(new_files):,} unprocessed"
+    )
+
+    # Low-water mark: the oldest day that may still hold unprocessed files.
+    # Days of fast-path inbox entries do not move it, only files this run
+    # listed and committed; once all are, it is the newest listed day.
+    newest_day = builtins.max(
+        dated_days(bronze_files), default=manifest.get("low_water_day")
+    )
+
+    if not new_files:
+        logger.info("No unprocessed bronze files")
+        if inbox_keys or newest_day != manifest.get("low_water_day"):
+            manifest["low_water_day"] = newest_day
+            commit_manifest(s3_client, manifest, [], inbox_keys, run_id)
+        return True
+
+    for f in new_files:
+        logger.info(f"Unprocessed file: {f['key']} ({f['size']:,} bytes)")
+
+    # The whole backlog in one run, in batches sized to the workers
+    max_batch_bytes = executor_cores * batch_mb_per_core * 1024 * 1024
+    batches = plan_batches(new_files, max_batch_bytes)
+    logger.info(
+        f"Run {run_id}: {len(batches):,} batches for {executor_cores} "
+        f"executor cores (max {max_batch_bytes / 1024 / 1024:,.0f} MB each)"
+    )
+
+    totals = {"validated": 0, "rejected": 0, "batch_unique": 0, "silver": 0}
+    silver_total = None
+    for i, batch_files in enumerate(batches, start=1):
+        logger.info(f"Processing batch {i}/{len(batches)}")
+        later_files = [f for later in batches[i:] for f in later]
+        manifest["low_water_day"] = builtins.min(
+            dated_days(later_files), default=newest_day
+        )
+        # Inbox entries are committed with the first batch
+        stats = process_batch(
+            s3_client, manifest, batch_files, inbox_keys if i == 1 else [], run_id
+        )
+        for name in totals:
+            totals[name] += stats[name]
+        silver_total = stats.get("silver_total", silver_total)
+
+    final_count = totals["silver"]
+    input_count = totals["validated"] + totals["rejected"]
+    logger.info(
+        f"Processed {input_count:,} records from {len(new_files):,} files: "
+        f"{totals['rejected']:,} rejected, "
+        f"{totals['validated'] - totals['batch_unique']:,} duplicates in batch, "
+        f"{totals['batch_unique'] - final_count:,} seen in earlier runs, "
+        f"{final_count:,} written to silver"
+    )
+    if input_count == 0:
+        logger.warning("No data in the unprocessed files")
+    if silver_total is not None:
+        logger.info(f"SILVER LAYER TOTAL: {silver_total:,} records")
+
+    logger.info("ETL processing completed successfully!")
+    logger.info(f"Silver transformation complete: {final_count:,} records")
+
+    return True
+
+
 if __name__ == "__main__":
     job.init(args["JOB_NAME"], args)
     process_data()
@@ -0,0 +1,360 @@
+import argparse
+import glob
+import logging
+import os
+import sys
+from datetime import datetime
+
+from layer_stats import count_live_rows, record_batch_rows
+from partition_commit import (
+    batch_file_pattern,
+    batch_id_for,
+    parquet_write_options,
+    record_changed_partitions,
+    write_partitioned_batch,
+    write_partitioned_batch_local,
+)
+from pyspark.sql import Observation, SparkSession
+from pyspark.sql.functions import (
+    col,
+    count,
+    current_date,
+    date_sub,
+    input_file_name,
+    lit,
+    size,
+)
+from s3_listing import prefix_exists
+from silver_transforms import (
+    EXPECTED_FIELDS,
+    add_enrichment_fields,
+    bronze_read_schema,
+    cast_data_types,
+    dedup_index_rows,
+    drop_indexed_event_ids,
+    silver_columns,
+    tag_validation_failures,
+)
+from writer_lease import acquire_lease, release_lease
+
+# Bronze -> Silver on Spark Structured Streaming, as an alternative to the
+# manifest-driven batch job in bronze_silver.py. The file source and its
+# checkpoint track which bronze files were processed, and each micro-batch runs
+# the batch job's steps: silver_transforms casts and validations (rejected rows
+# to quarantine), event_id dedup within the micro-batch and against the
+# event_id index, enrichment, then an idempotent partitioned write (a replayed
+# micro-batch replaces its own files) and the index update. Like the batch
+# job, rows dated before the dedup window are not checked against the index
+# (which only covers the window) and are written. Runs as a Glue job
+# (--JOB_NAME given) or against a local filesystem:
+#
+#   python bronze_silver_streaming.py --bronze-path /tmp/lake/bronze \
+#       --silver-path /tmp/lake/silver --quarantine-path /tmp/lake/quarantine \
+#       --checkpoint-path /tmp/lake/_checkpoints/bronze_silver \
+#       --dedup-index-path /tmp/lake/_dedup/event_ids
+#
+# Do not point both modes at the same bronze files: they track processed files
+# separately (manifest vs checkpoint).
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BRONZE_FILE_GLOB = "logs_*"
+
+DEFAULT_OPTIONS = {
+    # "available_now" (everything new, in several micro-batches, then stop),
+    # "once" (everything new in one micro-batch, then stop) or
+    # "processing_time" (keep running, one micro-batch per trigger_interval)
+    "trigger": "available_now",
+    "trigger_interval": "1 minute",
+    "max_files_per_trigger": "100",
+    # Days of event dates the event_id index is checked over, as in
+    # bronze_silver.py; 0 turns cross-batch dedup off
+    "dedup_window_days": "7",
+    # Bronze fields read into silver and the silver file layout, as in
+    # bronze_silver.py
+    "silver_columns": "default",
+    "silver_sort_key": "event_ts",
+    "silver_bloom_columns": "event_id,user_id",
+    # Lease of writer_lease.py, held while the silver stats are updated (S3)
+    "writer_lease_minutes": "30",
+    "writer_lease_wait_seconds": "600",
+}
+
+
+def split_s3_path(path):
+    # s3://bucket/silver/ -> (bucket, "silver/")
+    bucket, _, prefix = path[len("s3://") :].partition("/")
+    return bucket, prefix.rstrip("/") + "/"
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def write_table(
+    df,
+    table_path,
+    batch_id,
+    partition_by,
+    sort_by=None,
+    options=None,
+    started_at=None,
+):
+    # started_at: also log the written partitions to the change log (S3 only)
+    if table_path.startswith("s3://"):
+        import boto3
+
+        s3_client = boto3.client("s3")
+        bucket, prefix = split_s3_path(table_path)
+        partitions = write_partitioned_batch(
+            df,
+            s3_client,
+            bucket,
+            prefix,
+            batch_id,
+            partition_by,
+            sort_by=sort_by,
+            options=options,
+        )
+        if started_at is not None:
+            table = prefix.rstrip("/")
+            record_changed_partitions(
+                s3_client, bucket, table, batch_id, partitions, started_at
+            )
+        return partitions
+    return write_partitioned_batch_local(
+        df, table_path, batch_id, partition_by, sort_by=sort_by, options=options
+    )
+
+
+def record_silver_rows(spark, options, batch_id, rows):
+    # The silver total under _stats/, kept as by the batch job (S3 only)
+    import boto3
+
+    s3_client = boto3.client("s3")
+    bucket, prefix = split_s3_path(options["silver_path"])
+    lease_key = acquire_lease(
+        s3_client,
+        bucket,
+        "stream",
+        int(options["writer_lease_minutes"]) * 60,
+        int(options["writer_lease_wait_seconds"]),
+        logger=logger,
+    )
+    try:
+        return record_batch_rows(
+            s3_client,
+            bucket,
+            prefix.rstrip("/"),
+            batch_id,
+            rows,
+            lambda: count_live_rows(spark, s3_client, bucket, prefix),
+        )
+    finally:
+        release_lease(s3_client, bucket, lease_key)
+
+
+def read_bronze_stream(spark, columns, options):
+    # New bronze files, plain or compressed, with the declared schema
+    return (
+        spark.readStream.schema(bronze_read_schema(columns))
+        .option("pathGlobFilter", BRONZE_FILE_GLOB)
+        .option("maxFilesPerTrigger", int(options["max_files_per_trigger"]))
+        .json(options["bronze_path"])
+    )
+
+
+def read_dedup_index(spark, options, batch_id):
+    # The event_id index of the dedup window without the files of this batch
+    # (a replayed micro-batch), or None while there is none
+    path = options["dedup_index_path"]
+    window_days = int(options["dedup_window_days"])
+    if window_days <= 0:
+        return None
+    if path.startswith("s3://"):
+        import boto3
+
+        bucket, prefix = split_s3_path(path)
+        exists = prefix_exists(boto3.client("s3"), bucket, f"{prefix}event_date=")
+    else:
+        exists = bool(glob.glob(os.path.join(path, "event_date=*")))
+    if not exists:
+        return None
+    return spark.read.parquet(path).filter(
+        (col("event_date") >= date_sub(current_date(), window_days))
+        & ~input_file_name().contains(batch_file_pattern(batch_id))
+    )
+
+
+def micro_batch_writer(options):
+    checkpoint_path = options["checkpoint_path"]
+
+    def process_micro_batch(batch_df, epoch_id):
+        # The checkpoint replays a failed epoch with the same files, and the
+        # same epoch gives the same batch id, so the replay replaces its output
+        batch_id = batch_id_for("bronze_silver_stream", checkpoint_path, epoch_id)
+        started_at = datetime.utcnow()
+        run_id = f"stream-{epoch_id}"
+
+        tagged = tag_validation_failures(batch_df).cache()
+        rejected = Observation(f"rejected-{epoch_id}")
+        written = Observation(f"silver-{epoch_id}")
+
+        # Data quality: rejected rows go to quarantine, without client_ip
+        quarantine_df = (
+            tagged.filter(size(col("failed_rules")) > 0)
+            .observe(rejected, count(lit(1)).alias("rows"))
+            .drop("client_ip")
+            .withColumn("run_id", lit(run_id))
+            .withColumn("quarantine_date", current_date())
+        )
+        write_table(
+            quarantine_df, options["quarantine_path"], batch_id, ["quarantine_date"]
+        )
+
+        # Deduplication (within the micro-batch, then against the event_ids of
+        # earlier ones), PII removal and enrichment, as in the batch job
+        silver_df = (
+            tagged.filter(size(col("failed_rules")) == 0)
+            .drop("failed_rules")
+            .dropDuplicates(["event_id"])
+            .drop("client_ip")
+        )
+        index = read_dedup_index(batch_df.sparkSession, options, batch_id)
+        if index is not None:
+            silver_df = drop_indexed_event_ids(silver_df, index)
+        silver_df = (
+            add_enrichment_fields(silver_df)
+            .observe(written, count(lit(1)).alias("rows"))
+            .cache()
+        )
+        partitions = write_table(
+            silver_df,
+            options["silver_path"],
+            batch_id,
+            ["year", "month", "day"],
+            sort_by=split_list(options["silver_sort_key"]),
+            options=parquet_write_options(split_list(options["silver_bloom_columns"])),
+            started_at=started_at,
+        )
+        write_table(
+            dedup_index_rows(silver_df),
+            options["dedup_index_path"],
+            batch_id,
+            ["event_date"],
+        )
+        silver_df.unpersist()
+        tagged.unpersist()
+
+        if options["silver_path"].startswith("s3://"):
+            try:
+                record_silver_rows(
+                    batch_df.sparkSession, options, batch_id, written.get["rows"] or 0
+                )
+            except Exception as stats_error:
+                logger.warning(f"Could not update the silver stats: {stats_error}")
+
+        logger.info(
+            f"Micro-batch {epoch_id} ({batch_id}): "
+            f"{written.get['rows'] or 0:,} rows to silver, "
+            f"{rejected.get['rows'] or 0:,} quarantined, partitions {partitions}"
+        )
+
+    return process_micro_batch
+
+
+def start_query(spark, options):
+    columns = silver_columns(options["silver_columns"])
+    df = cast_data_types(
+        read_bronze_stream(spark, columns, options),
+        [name for name in EXPECTED_FIELDS if name in columns],
+    )
+
+    writer = (
+        df.writeStream.queryName("bronze_silver_stream")
+        .option("checkpointLocation", options["checkpoint_path"])
+        .foreachBatch(micro_batch_writer(options))
+    )
+    if options["trigger"] == "once":
+        writer = writer.trigger(once=True)
+    elif options["trigger"] == "processing_time":
+        writer = writer.trigger(processingTime=options["trigger_interval"])
+    else:
+        writer = writer.trigger(availableNow=True)
+
+    logger.info(
+        f"Streaming {options['bronze_path']} -> {options['silver_path']} "
+        f"(trigger {options['trigger']}, checkpoint {options['checkpoint_path']})"
+    )
+    return writer.start()
+
+
+def run(spark, options):
+    query = start_query(spark, options)
+    query.awaitTermination()
+    progress = query.recentProgress
+    rows = sum(p["numInputRows"] for p in progress)
+    logger.info(f"Stream stopped: {len(progress)} micro-batches, {rows:,} input rows")
+    return rows
+
+
+def local_options(argv):
+    parser = argparse.ArgumentParser(description="Bronze -> Silver streaming mode")
+    parser.add_argument("--bronze-path", required=True)
+    parser.add_argument("--silver-path", required=True)
+    parser.add_argument("--quarantine-path", required=True)
+    parser.add_argument("--checkpoint-path", required=True)
+    parser.add_argument("--dedup-index-path", required=True)
+    for name, default in DEFAULT_OPTIONS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", default=default)
+    return vars(parser.parse_args(argv))
+
+
+def glue_main():
+    from awsglue.context import GlueContext
+    from awsglue.job import Job
+    from awsglue.utils import getResolvedOptions
+    from job_args import get_optional_arg
+    from pyspark.context import SparkContext
+
+    sc = SparkContext()
+    glueContext = GlueContext(sc)
+    job = Job(glueContext)
+
+    args = getResolvedOptions(sys.argv, ["JOB_NAME", "bucket"])
+    bucket = args["bucket"]
+    options = {
+        "bronze_path": f"s3://{bucket}/bronze/",
+        "silver_path": f"s3://{bucket}/silver/",
+        "quarantine_path": f"s3://{bucket}/quarantine/",
+        "checkpoint_path": f"s3://{bucket}/_checkpoints/bronze_silver_stream/",
+        "dedup_index_path": f"s3://{bucket}/_dedup/event_ids/",
+    }
+    for name, default in DEFAULT_OPTIONS.items():
+        options[name] = get_optional_arg(name, default)
+
+    job.init(args["JOB_NAME"], args)
+    run(glueContext.spark_session, options)
+    job.commit()
+
+
+def local_main(argv):
+    options = local_options(argv)
+    spark = (
+        SparkSession.builder.master("local[*]")
+        .appName("bronze-silver-streaming")
+        .config("spark.sql.session.timeZone", "UTC")
+        .getOrCreate()
+    )
+    try:
+        run(spark, options)
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    if "--JOB_NAME" in sys.argv:
+        glue_main()
+    else:
+        local_main(sys.argv[1:])
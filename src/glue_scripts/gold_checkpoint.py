@@ -0,0 +1,92 @@
+import json
+from datetime import datetime
+
+# Checkpoint of what silver is in gold, one JSON object: the position in the
+# silver change log up to which the logged batches were read, and the
+# processing_timestamp watermark of those rows (for runs that read all of
+# silver). Every commit bumps its version, and only the run that started from
+# the current version may commit, so a run that lost a race to another one
+# fails instead of moving the checkpoint back.
+
+CHECKPOINT_KEY = "_checkpoints/silver_gold/watermark.json"
+
+
+def read_json(s3_client, bucket, key):
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(body)
+
+
+def write_json(s3_client, bucket, key, value):
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(value, indent=2, default=str).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def checkpoint_version(checkpoint):
+    # 0 before the first commit
+    return checkpoint["version"] if checkpoint else 0
+
+
+def read_checkpoint(s3_client, bucket, key=CHECKPOINT_KEY):
+    checkpoint = read_json(s3_client, bucket, key)
+    if checkpoint and checkpoint["watermark"]:
+        checkpoint["watermark"] = datetime.fromisoformat(checkpoint["watermark"])
+    return checkpoint
+
+
+def write_checkpoint(
+    s3_client,
+    bucket,
+    version,
+    watermark,
+    run_id,
+    batch_id,
+    change_log_position=None,
+    key=CHECKPOINT_KEY,
+):
+    checkpoint = {
+        "version": version,
+        "watermark": watermark.isoformat() if watermark else None,
+        "change_log": change_log_position,
+        "run_id": run_id,
+        "batch_id": batch_id,
+        "committed_at": datetime.utcnow().isoformat(),
+    }
+    write_json(s3_client, bucket, key, checkpoint)
+    return checkpoint
+
+
+def commit_checkpoint(
+    s3_client,
+    bucket,
+    checkpoint,
+    watermark,
+    run_id,
+    batch_id,
+    change_log_position,
+    key=CHECKPOINT_KEY,
+):
+    # checkpoint: the one the run started from
+    version = checkpoint_version(checkpoint)
+    current = checkpoint_version(read_checkpoint(s3_client, bucket, key))
+    if current != version:
+        raise RuntimeError(
+            f"Watermark checkpoint moved to version {current} during run {run_id} "
+            f"(started from version {version})"
+        )
+    return write_checkpoint(
+        s3_client,
+        bucket,
+        version + 1,
+        watermark,
+        run_id,
+        batch_id,
+        change_log_position,
+        key,
+    )
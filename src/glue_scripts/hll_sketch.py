@@ -0,0 +1,75 @@
+from pyspark.sql.functions import col, expr, lit, round, when, xxhash64
+
+# HyperLogLog distinct-count sketches as plain Spark columns (Spark 3.3 has no
+# sketch functions), so distinct counts can be stored in gold and merged with
+# later increments. A sketch is a dense array<int> of 2^PRECISION registers:
+# two sketches merge by element-wise max, and the estimate is the HyperLogLog
+# formula with linear counting for small cardinalities.
+
+PRECISION = 14  # 16384 registers, ~0.8% standard error
+REGISTERS = 1 << PRECISION
+
+
+def register_columns(value):
+    # The low PRECISION bits of the 64-bit hash pick the register; the rank is
+    # the position of the highest set bit of the remaining 64 - PRECISION bits,
+    # counted from the top (1 when it is the top bit)
+    width = 64 - PRECISION
+    rest = f"shiftrightunsigned(xxhash64({value}), {PRECISION})"
+    return [
+        xxhash64(col(value))
+        .bitwiseAND(lit(REGISTERS - 1))
+        .cast("int")
+        .alias("register"),
+        expr(
+            f"cast(if({rest} = 0, {width + 1}, {width + 1} - length(bin({rest}))) as int)"
+        ).alias("rank"),
+    ]
+
+
+def sketch_by(df, key, value, name):
+    # One sketch of the non-null values of `value` per `key`
+    registers = (
+        df.filter(col(value).isNotNull())
+        .select(key, *register_columns(value))
+        .groupBy(key, "register")
+        .agg(expr("max(rank)").alias("rank"))
+    )
+    return (
+        registers.groupBy(key)
+        .agg(expr("map_from_entries(collect_list(struct(register, rank)))").alias(name))
+        .withColumn(
+            name,
+            expr(
+                f"transform(sequence(0, {REGISTERS - 1}), "
+                f"i -> coalesce(element_at({name}, i), 0))"
+            ),
+        )
+    )
+
+
+def empty():
+    # Sketch of no values
+    return expr(f"array_repeat(0, {REGISTERS})")
+
+
+def merge(left, right):
+    # Union of two sketch columns; a missing sketch counts as empty
+    return expr(
+        f"if({left} is null, {right}, if({right} is null, {left}, "
+        f"zip_with({left}, {right}, (a, b) -> greatest(a, b))))"
+    )
+
+
+def estimate(sketch):
+    # Approximate distinct count of a sketch column
+    alpha = 0.7213 / (1 + 1.079 / REGISTERS)
+    harmonic = expr(f"aggregate({sketch}, cast(0 as double), (s, r) -> s + pow(2, -r))")
+    zeros = expr(f"size(filter({sketch}, r -> r = 0))")
+    raw = lit(alpha * REGISTERS * REGISTERS) / harmonic
+    linear = lit(float(REGISTERS)) * expr(
+        f"ln({REGISTERS} / size(filter({sketch}, r -> r = 0)))"
+    )
+    return round(
+        when((raw <= 2.5 * REGISTERS) & (zeros > 0), linear).otherwise(raw)
+    ).cast("long")
@@ -0,0 +1,12 @@
+import sys
+
+from awsglue.utils import getResolvedOptions
+
+# Job arguments shared by the Glue job scripts. getResolvedOptions fails on
+# arguments that were not passed, so optional ones are looked up first.
+
+
+def get_optional_arg(name, default):
+    if f"--{name}" in sys.argv:
+        return getResolvedOptions(sys.argv, [name])[name]
+    return default
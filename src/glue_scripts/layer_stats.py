@@ -0,0 +1,113 @@
+import json
+from datetime import datetime
+
+from partition_commit import iter_live_objects
+
+# Running row totals of the lake tables, one small JSON object per table under
+# _stats/, so jobs can log layer totals without re-reading the layer. Each write
+# records the rows of its batch; contributions are keyed by batch id, so a
+# retried batch (see partition_commit) replaces its count instead of adding it
+# twice. Deleting a stats file makes the next run recount that table once.
+# Every writer of a table records its batches (for silver: the batch and
+# streaming jobs, the Lambda fast path, and compaction with zero rows), under
+# the Bronze -> Silver writer lease so no update is lost.
+# parquet_file_stats reads the row counts and column min/max of a written
+# file from its footer, without decoding any data page.
+
+STATS_PREFIX = "_stats/"
+RECENT_BATCHES = 200  # batch ids remembered for retries
+
+
+def stats_key(table):
+    return f"{STATS_PREFIX}{table}.json"
+
+
+def read_layer_stats(s3_client, bucket, table):
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=stats_key(table))["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(body)
+
+
+def record_batch_rows(s3_client, bucket, table, batch_id, rows, count_table=None):
+    # count_table: callable returning the row count of the table as written,
+    # only called when there is no stats file yet. Returns the updated stats.
+    stats = read_layer_stats(s3_client, bucket, table)
+    if stats is None:
+        # The recount already includes this batch
+        total_rows = count_table() if count_table else rows
+        batches = []
+    else:
+        earlier_rows = sum(
+            b["rows"] for b in stats["batches"] if b["batch_id"] == batch_id
+        )
+        total_rows = stats["total_rows"] - earlier_rows + rows
+        batches = [b for b in stats["batches"] if b["batch_id"] != batch_id]
+
+    batches.append({"batch_id": batch_id, "rows": rows})
+    stats = {
+        "table": table,
+        "total_rows": total_rows,
+        "updated_at": datetime.utcnow().isoformat(),
+        "batches": batches[-RECENT_BATCHES:],
+    }
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=stats_key(table),
+        Body=json.dumps(stats, indent=2).encode("utf-8"),
+        ContentType="application/json",
+    )
+    return stats
+
+
+def count_live_rows(spark, s3_client, bucket, prefix):
+    # Recount for count_table, through the compaction marker so a partition
+    # being compacted is not counted twice
+    paths = [
+        f"s3://{bucket}/{obj['Key']}"
+        for obj in iter_live_objects(s3_client, bucket, prefix)
+        if obj["Key"].endswith(".parquet")
+    ]
+    return spark.read.parquet(*paths).count() if paths else 0
+
+
+def parquet_file_stats(spark, path, columns):
+    # {"rows", "row_groups", "columns": {name: (min, max)}} of one Parquet file,
+    # via the parquet-mr footer reader in the Spark JVM. min/max are strings,
+    # None when a column has no non-null values or no statistics.
+    jvm = spark._jvm
+    input_file = jvm.org.apache.parquet.hadoop.util.HadoopInputFile.fromPath(
+        jvm.org.apache.hadoop.fs.Path(path), spark._jsc.hadoopConfiguration()
+    )
+    reader = jvm.org.apache.parquet.hadoop.ParquetFileReader.open(input_file)
+    try:
+        blocks = list(reader.getFooter().getBlocks())
+    finally:
+        reader.close()
+
+    # Row group statistics merged on the JVM side, in the column's own order
+    merged = {}
+    rows = 0
+    for block in blocks:
+        rows += block.getRowCount()
+        for chunk in block.getColumns():
+            name = chunk.getPath().toDotString()
+            statistics = chunk.getStatistics()
+            if name not in columns or statistics is None or statistics.isEmpty():
+                continue
+            if name in merged:
+                merged[name].mergeStatistics(statistics)
+            else:
+                merged[name] = statistics.copy()
+
+    ranges = {
+        name: (statistics.minAsString(), statistics.maxAsString())
+        for name, statistics in merged.items()
+        if statistics.hasNonNullValue()
+    }
+    return {
+        "rows": rows,
+        "row_groups": len(blocks),
+        "columns": {name: ranges.get(name, (None, None)) for name in columns},
+    }
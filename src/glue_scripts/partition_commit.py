@@ -0,0 +1,420 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from s3_listing import is_hidden, iter_keys, iter_objects
+
+# Idempotent partitioned writes shared by the Glue jobs. A batch is written by
+# Spark to a hidden staging directory, then copied into its partitions under
+# file names derived from a deterministic batch id. Running the same batch
+# again (a retry or a backfill) replaces the files it wrote before in every
+# partition it touches, instead of appending a second copy.
+#
+# Writers can also append the partitions a batch committed to a change log
+# (_changes/<table>/, one JSON object per batch, named by commit time), so an
+# incremental reader lists only the partitions changed after its watermark, or
+# reads exactly the batches logged after its position in the log.
+#
+# Compaction (silver_compaction.py) swaps a partition's files for compacted
+# ones without any listing reader seeing both: the compacted files go to a
+# hidden directory inside the partition, a _COMPACTED marker points readers
+# there while the partition directory itself is rewritten, and the marker is
+# removed once the directory holds the compacted files. Readers going through
+# S3 use iter_live_objects, which follows the marker; catalog readers (Athena)
+# follow the partition location, which compaction switches along with it. The
+# ids of the batches it folds in are kept in the partition (_COMPACTED_BATCHES):
+# a batch committed again after that (a retry of a run that failed before its
+# manifest commit) is already in the compacted files and leaves the partition.
+
+BATCH_FILE_PREFIX = "batch-"
+STAGING_DIRECTORY = "_staging"
+DELETE_BATCH_SIZE = 1000  # delete_objects maximum
+CHANGES_PREFIX = "_changes/"
+CHANGE_TIME_FORMAT = "%Y%m%dT%H%M%S%f"
+CHANGE_LOG_MARGIN = timedelta(hours=1)  # clock skew between jobs
+BLOOM_FILTER_NDV = 1000000  # expected distinct values per file and column
+COMPACTION_MARKER = "_COMPACTED"
+COMPACTED_FILE_PREFIX = "compacted-"
+COMPACTED_DIRECTORY_PREFIX = "_compacted-"
+COMPACTED_BATCHES = "_COMPACTED_BATCHES"
+
+
+def batch_id_for(*parts):
+    # Same inputs, same id: e.g. the bronze files (key, ETag) of a batch
+    payload = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def batch_file_pattern(batch_id):
+    # Substring of the committed file paths of a batch, for input_file_name()
+    return f"/{BATCH_FILE_PREFIX}{batch_id}-"
+
+
+def delete_keys(s3_client, bucket, keys):
+    keys = list(keys)
+    for i in range(0, len(keys), DELETE_BATCH_SIZE):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={
+                "Objects": [{"Key": key} for key in keys[i : i + DELETE_BATCH_SIZE]]
+            },
+        )
+
+
+def parquet_write_options(bloom_columns=()):
+    # Parquet writer options, with bloom filters on the given columns
+    options = {"compression": "snappy"}
+    for column in bloom_columns:
+        options[f"parquet.bloom.filter.enabled#{column}"] = "true"
+        options[f"parquet.bloom.filter.expected.ndv#{column}"] = str(BLOOM_FILTER_NDV)
+    return options
+
+
+def staged_writer(df, partition_by, sort_by=None, options=None):
+    # sort_by clusters rows within each output file (after the partition
+    # columns, which the partitioned writer sorts by anyway), so Parquet
+    # min/max statistics of those columns let readers skip row groups
+    if sort_by:
+        df = df.sortWithinPartitions(*partition_by, *sort_by)
+    return (
+        df.write.mode("overwrite")
+        .partitionBy(*partition_by)
+        .format("parquet")
+        .options(**(options or parquet_write_options()))
+    )
+
+
+def write_partitioned_batch(
+    df,
+    s3_client,
+    bucket,
+    table_prefix,
+    batch_id,
+    partition_by,
+    sort_by=None,
+    options=None,
+    replace_partitions=False,
+):
+    # Returns the partition paths (e.g. year=2025/month=1/day=2) the batch wrote.
+    # replace_partitions: the batch holds the full content of the partitions it
+    # writes, and files of other batches in them are removed once it is in.
+    staging_prefix = f"{table_prefix}{STAGING_DIRECTORY}/{batch_id}/"
+    staged_writer(df, partition_by, sort_by, options).save(
+        f"s3://{bucket}/{staging_prefix}"
+    )
+    return commit_batch(s3_client, bucket, table_prefix, batch_id, replace_partitions)
+
+
+def commit_batch(s3_client, bucket, table_prefix, batch_id, replace_partitions=False):
+    staging_prefix = f"{table_prefix}{STAGING_DIRECTORY}/{batch_id}/"
+    staged = [obj["Key"] for obj in iter_objects(s3_client, bucket, staging_prefix)]
+
+    by_partition = {}
+    for key in staged:
+        relative = key[len(staging_prefix) :]
+        if relative.endswith(".parquet") and not is_hidden(relative):
+            partition = relative.rpartition("/")[0]
+            by_partition.setdefault(partition, []).append(key)
+
+    for partition, keys in sorted(by_partition.items()):
+        directory = f"{table_prefix}{partition}/" if partition else table_prefix
+        file_prefix = f"{directory}{BATCH_FILE_PREFIX}{batch_id}-"
+        if not replace_partitions and batch_id in read_compacted_batches(
+            s3_client, bucket, directory.rstrip("/")
+        ):
+            continue
+
+        # Copy over the names of an earlier attempt, then drop the ones it had
+        # in excess (or, replacing, every other file), so the partition never
+        # lacks the batch
+        if replace_partitions:
+            previous = {
+                key
+                for key in iter_keys(s3_client, bucket, directory)
+                if not is_hidden(key[len(directory) :])
+            }
+        else:
+            previous = set(iter_keys(s3_client, bucket, file_prefix))
+        committed = set()
+        for i, key in enumerate(sorted(keys)):
+            target = f"{file_prefix}{i:05d}.snappy.parquet"
+            s3_client.copy({"Bucket": bucket, "Key": key}, bucket, target)
+            committed.add(target)
+        delete_keys(s3_client, bucket, sorted(previous - committed))
+
+    delete_keys(s3_client, bucket, staged)
+    return sorted(by_partition)
+
+
+def write_partitioned_batch_local(
+    df, table_dir, batch_id, partition_by, sort_by=None, options=None
+):
+    # write_partitioned_batch on a local filesystem (local Spark runs), with
+    # renames in place of S3 copies
+    staging_dir = os.path.join(table_dir, STAGING_DIRECTORY, batch_id)
+    staged_writer(df, partition_by, sort_by, options).save(staging_dir)
+
+    by_partition = {}
+    for root, _, names in os.walk(staging_dir):
+        partition = os.path.relpath(root, staging_dir)
+        partition = "" if partition == "." else partition.replace(os.sep, "/")
+        for name in names:
+            relative = f"{partition}/{name}" if partition else name
+            if name.endswith(".parquet") and not is_hidden(relative):
+                by_partition.setdefault(partition, []).append(os.path.join(root, name))
+
+    for partition, paths in sorted(by_partition.items()):
+        directory = os.path.join(table_dir, *partition.split("/"))
+        os.makedirs(directory, exist_ok=True)
+        file_prefix = os.path.join(directory, f"{BATCH_FILE_PREFIX}{batch_id}-")
+
+        previous = set(glob.glob(f"{file_prefix}*"))
+        committed = set()
+        for i, path in enumerate(sorted(paths)):
+            target = f"{file_prefix}{i:05d}.snappy.parquet"
+            os.replace(path, target)
+            committed.add(target)
+        for path in sorted(previous - committed):
+            os.remove(path)
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return sorted(by_partition)
+
+
+def change_log_prefix(table):
+    return f"{CHANGES_PREFIX}{table}/"
+
+
+def record_changed_partitions(
+    s3_client, bucket, table, batch_id, partitions, started_at
+):
+    # started_at: taken before the batch computed its rows, so every row it
+    # wrote is newer. The entry is written after the partitions are committed.
+    committed_at = datetime.utcnow()
+    key = (
+        f"{change_log_prefix(table)}"
+        f"{committed_at.strftime(CHANGE_TIME_FORMAT)}-{batch_id}.json"
+    )
+    entry = {
+        "batch_id": batch_id,
+        "partitions": sorted(partitions),
+        "started_at": started_at.isoformat(),
+        "committed_at": committed_at.isoformat(),
+    }
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(entry).encode("utf-8"),
+        ContentType="application/json",
+    )
+    return key
+
+
+def changed_partitions_since(s3_client, bucket, table, watermark):
+    # Partitions committed after watermark (a naive UTC datetime), or None when
+    # the log does not reach back to it (no entries yet, or the entries from
+    # before the watermark have expired) and the whole table has to be read
+    prefix = change_log_prefix(table)
+    first = next(iter_keys(s3_client, bucket, prefix), None)
+    if first is None:
+        return None
+    body = s3_client.get_object(Bucket=bucket, Key=first)["Body"].read()
+    if datetime.fromisoformat(json.loads(body)["started_at"]) > watermark:
+        return None
+
+    start = (watermark - CHANGE_LOG_MARGIN).strftime(CHANGE_TIME_FORMAT)
+    partitions = set()
+    for key in iter_keys(s3_client, bucket, prefix, start_after=f"{prefix}{start}"):
+        body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+        partitions.update(json.loads(body)["partitions"])
+    return sorted(partitions)
+
+
+def change_log_time(key):
+    # Commit time of a change log entry, from its key
+    name = key.rpartition("/")[2]
+    return datetime.strptime(name.split("-", 1)[0], CHANGE_TIME_FORMAT)
+
+
+def read_change_log(s3_client, bucket, table, start_after=None):
+    # (key, entry) of the change log entries after start_after, in key order
+    prefix = change_log_prefix(table)
+    for key in iter_keys(s3_client, bucket, prefix, start_after=start_after):
+        body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+        yield key, json.loads(body)
+
+
+def unread_changes(s3_client, bucket, table, position):
+    # Entries a reader at position has not read, as (key, entry) in key order,
+    # or None when the log does not reach back to the position (entries from
+    # before it expired) and the whole table has to be read. position: the
+    # last key read and the keys read within CHANGE_LOG_MARGIN before it; a
+    # writer whose clock lags logs entries before keys already read.
+    prefix = change_log_prefix(table)
+    first = next(iter_keys(s3_client, bucket, prefix), None)
+    if first is None or first > position["key"]:
+        return None
+
+    start = change_log_time(position["key"]) - CHANGE_LOG_MARGIN
+    read = set(position["recent"]) | {position["key"]}
+    return [
+        (key, entry)
+        for key, entry in read_change_log(
+            s3_client,
+            bucket,
+            table,
+            start_after=f"{prefix}{start.strftime(CHANGE_TIME_FORMAT)}",
+        )
+        if key not in read
+    ]
+
+
+def position_after(position, keys):
+    # The position of a reader at position once it has read keys
+    read = set(keys)
+    if position:
+        read |= set(position["recent"]) | {position["key"]}
+    if not read:
+        return position
+    read = sorted(read)
+    start = change_log_time(read[-1]) - CHANGE_LOG_MARGIN
+    return {
+        "key": read[-1],
+        "recent": [key for key in read[:-1] if change_log_time(key) >= start],
+    }
+
+
+def partition_values(table_prefix, directory):
+    # silver/year=2025/month=1/day=2 -> ["2025", "1", "2"]
+    relative = directory[len(table_prefix) :].strip("/")
+    return [part.partition("=")[2] for part in relative.split("/")]
+
+
+def read_compaction_marker(s3_client, bucket, directory):
+    # The marker of a compaction being swapped in, or None
+    try:
+        body = s3_client.get_object(
+            Bucket=bucket, Key=f"{directory}/{COMPACTION_MARKER}"
+        )["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(body)
+
+
+def compacted_location(directory, marker):
+    # Prefix holding the compacted files; markers written before compaction
+    # used a location kept them in the partition directory itself
+    return f"{directory}/{marker.get('location', '')}"
+
+
+def apply_compaction_marker(s3_client, bucket, directory, objects, marker):
+    # objects: the visible files of directory. While a compaction is swapped
+    # in, the live files are its compacted files in the marker's location and
+    # the files written to the directory since, without the ones it replaced
+    # and the copies of its own files being put back
+    location = compacted_location(directory, marker)
+    compacted = {f"{location}{name}" for name in marker["files"]}
+    excluded = set(marker["files"]) | set(marker["replaced"])
+    live = [
+        obj
+        for obj in iter_objects(s3_client, bucket, location)
+        if obj["Key"] in compacted
+    ]
+    live += [obj for obj in objects if obj["Key"].rpartition("/")[2] not in excluded]
+    return live
+
+
+def iter_live_objects(s3_client, bucket, prefix):
+    # Data files under prefix as a compaction-aware reader sees them
+    by_directory = {}
+    marked = set()
+    for obj in iter_objects(s3_client, bucket, prefix):
+        directory, _, name = obj["Key"].rpartition("/")
+        if name == COMPACTION_MARKER:
+            marked.add(directory)
+        elif not is_hidden(obj["Key"][len(prefix) :]):
+            by_directory.setdefault(directory, []).append(obj)
+
+    for directory in sorted(set(by_directory) | marked):
+        objects = by_directory.get(directory, [])
+        marker = None
+        if directory in marked:
+            marker = read_compaction_marker(s3_client, bucket, directory)
+        if marker:
+            objects = apply_compaction_marker(
+                s3_client, bucket, directory, objects, marker
+            )
+        yield from objects
+
+
+def batch_ids_of(names):
+    # Batch ids of committed file names, batch-<id>-NNNNN.snappy.parquet
+    return {
+        name[len(BATCH_FILE_PREFIX) :].split("-", 1)[0]
+        for name in names
+        if name.startswith(BATCH_FILE_PREFIX)
+    }
+
+
+def read_compacted_batches(s3_client, bucket, directory):
+    # Ids of the batches compactions folded into the directory's files
+    try:
+        body = s3_client.get_object(
+            Bucket=bucket, Key=f"{directory}/{COMPACTED_BATCHES}"
+        )["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        return set()
+    return set(json.loads(body)["batches"])
+
+
+def record_compacted_batches(s3_client, bucket, directory, batch_ids):
+    # Written before the compaction is swapped in. A compaction that fails
+    # after it leaves those batches' files live, which a retry then keeps.
+    batches = read_compacted_batches(s3_client, bucket, directory) | set(batch_ids)
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{directory}/{COMPACTED_BATCHES}",
+        Body=json.dumps({"batches": sorted(batches)}).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def write_compaction_marker(s3_client, bucket, directory, marker):
+    # The swap's commit point for S3 readers
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{directory}/{COMPACTION_MARKER}",
+        Body=json.dumps(marker).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def restore_compacted_directory(s3_client, bucket, directory, marker):
+    # With readers on the marker's location: copy the compacted files into the
+    # partition directory and delete the files they replaced. Safe to repeat.
+    location = compacted_location(directory, marker)
+    if location != f"{directory}/":
+        for name in marker["files"]:
+            s3_client.copy(
+                {"Bucket": bucket, "Key": f"{location}{name}"},
+                bucket,
+                f"{directory}/{name}",
+            )
+    delete_keys(
+        s3_client, bucket, [f"{directory}/{name}" for name in marker["replaced"]]
+    )
+
+
+def clear_compaction_marker(s3_client, bucket, directory, marker):
+    # Once the directory is restored: readers go back to it
+    s3_client.delete_object(Bucket=bucket, Key=f"{directory}/{COMPACTION_MARKER}")
+    location = compacted_location(directory, marker)
+    if location != f"{directory}/":
+        delete_keys(
+            s3_client,
+            bucket,
+            [obj["Key"] for obj in iter_objects(s3_client, bucket, location)],
+        )
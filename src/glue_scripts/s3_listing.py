@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Paginated S3 listing shared by the Glue jobs.
+# Listings follow continuation tokens and yield objects lazily; time-named keys
+# (bronze/logs_YYYYMMDD_HHMMSS.json) can be listed as one sub-prefix per day,
+# fanned out over a thread pool so large prefixes are not walked page by page.
+
+DEFAULT_MAX_WORKERS = 16
+PAGE_SIZE = 1000  # list_objects_v2 maximum
+
+
+def iter_objects(s3_client, bucket, prefix, start_after=None, page_size=PAGE_SIZE):
+    kwargs = {
+        "Bucket": bucket,
+        "Prefix": prefix,
+        "PaginationConfig": {"PageSize": page_size},
+    }
+    if start_after:
+        kwargs["StartAfter"] = start_after
+
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(**kwargs):
+        for obj in page.get("Contents", []):
+            yield obj
+
+
+def iter_keys(s3_client, bucket, prefix, start_after=None):
+    for obj in iter_objects(s3_client, bucket, prefix, start_after=start_after):
+        yield obj["Key"]
+
+
+def prefix_exists(s3_client, bucket, prefix):
+    response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1)
+    return response.get("KeyCount", len(response.get("Contents", []))) > 0
+
+
+def daily_prefixes(prefix, first_day, last_day, date_format="%Y%m%d"):
+    # e.g. bronze/logs_20250101, bronze/logs_20250102, ... (both days included)
+    day = first_day
+    while day <= last_day:
+        yield f"{prefix}{day.strftime(date_format)}"
+        day += timedelta(days=1)
+
+
+def iter_objects_parallel(s3_client, bucket, prefixes, max_workers=DEFAULT_MAX_WORKERS):
+    # Each sub-prefix is listed in its own thread; results come back in prefix
+    # order, one prefix at a time, while later prefixes are still being listed
+    prefixes = list(prefixes)
+    if not prefixes:
+        return
+
+    def list_prefix(prefix):
+        return list(iter_objects(s3_client, bucket, prefix))
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(prefixes))) as executor:
+        for objects in executor.map(list_prefix, prefixes):
+            yield from objects
+
+
+def iter_daily_objects(
+    s3_client,
+    bucket,
+    prefix,
+    first_day,
+    last_day=None,
+    date_format="%Y%m%d",
+    max_workers=DEFAULT_MAX_WORKERS,
+    include_earlier=True,
+):
+    # Everything under prefix in key order, with the [first_day, last_day]
+    # range listed in parallel. Keys sorting before or after that range (older
+    # files, names that do not follow the date pattern) come from sequential
+    # listings that end where the range starts and start where it ends; with
+    # include_earlier=False the keys before the range are skipped unlisted.
+    last_day = last_day or datetime.utcnow().date() + timedelta(days=1)
+    first_prefix = f"{prefix}{first_day.strftime(date_format)}"
+    last_prefix = f"{prefix}{last_day.strftime(date_format)}"
+
+    if include_earlier:
+        for obj in iter_objects(s3_client, bucket, prefix):
+            if obj["Key"] >= first_prefix:
+                break
+            yield obj
+
+    yield from iter_objects_parallel(
+        s3_client,
+        bucket,
+        daily_prefixes(prefix, first_day, last_day, date_format),
+        max_workers=max_workers,
+    )
+
+    # The last day itself was listed above
+    for obj in iter_objects(s3_client, bucket, prefix, start_after=last_prefix):
+        if not obj["Key"].startswith(last_prefix):
+            yield obj
+
+
+def is_hidden(relative_key):
+    # Same rule as Spark/Hive: any path component starting with _ or .
+    return any(part.startswith(("_", ".")) for part in relative_key.split("/"))
@@ -0,0 +1,344 @@
+import logging
+import math
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import boto3
+from awsglue.context import GlueContext
+from awsglue.job import Job
+from awsglue.utils import getResolvedOptions
+from gold_checkpoint import CHECKPOINT_KEY, read_checkpoint
+from job_args import get_optional_arg
+from layer_stats import count_live_rows, record_batch_rows
+from partition_commit import (
+    COMPACTED_DIRECTORY_PREFIX,
+    COMPACTED_FILE_PREFIX,
+    COMPACTION_MARKER,
+    batch_id_for,
+    batch_ids_of,
+    clear_compaction_marker,
+    delete_keys,
+    parquet_write_options,
+    partition_values,
+    read_compaction_marker,
+    record_compacted_batches,
+    restore_compacted_directory,
+    unread_changes,
+    write_compaction_marker,
+)
+from pyspark.context import SparkContext
+from pyspark.sql.functions import col
+from s3_listing import is_hidden, iter_objects
+from writer_lease import acquire_lease, release_lease
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Initialize Glue context
+sc = SparkContext()
+glueContext = GlueContext(sc)
+spark = glueContext.spark_session
+job = Job(glueContext)
+
+# Get job parameters
+args = getResolvedOptions(sys.argv, ["JOB_NAME", "bucket"])
+
+
+bucket = args.get("bucket", "assignment5-data-lake")
+target_file_mb = int(get_optional_arg("target_file_mb", "128"))
+sort_key = [c.strip() for c in get_optional_arg("sort_key", "event_ts").split(",")]
+# Days back from today to compact, or an explicit list of YYYY-MM-DD dates
+lookback_days = int(get_optional_arg("lookback_days", "2"))
+partition_dates = get_optional_arg("partitions", "")
+bloom_columns = [
+    c.strip()
+    for c in get_optional_arg("bloom_columns", "event_id,user_id").split(",")
+    if c.strip()
+]
+# Partitions with fewer live files than this are left alone
+min_files = int(get_optional_arg("min_files", "4"))
+# Catalog table of the silver crawler, whose partition locations follow the
+# swap; no database, no catalog updates
+database = get_optional_arg("database", "")
+catalog_table = get_optional_arg("catalog_table", "silver_silver")
+crawler_name = get_optional_arg("crawler_name", "")
+CRAWLER_POLL_SECONDS = 30
+# Checkpoint of Silver -> Gold, which reads the silver batches logged after its
+# change log position from their batch files: partitions holding batches it
+# has not read yet are left alone
+gold_checkpoint_key = get_optional_arg("gold_checkpoint_key", CHECKPOINT_KEY)
+# Lease of writer_lease.py, held while the silver stats are updated
+writer_lease_minutes = int(get_optional_arg("writer_lease_minutes", "30"))
+writer_lease_wait_seconds = int(get_optional_arg("writer_lease_wait_seconds", "600"))
+
+silver_prefix = "silver/"
+
+logger.info(f"Silver compaction: bucket={bucket}, target={target_file_mb} MB")
+logger.info(f"Sort key: {sort_key}")
+
+"""
+Compaction
+"""
+
+
+def selected_dates():
+    if partition_dates:
+        return [
+            datetime.strptime(d.strip(), "%Y-%m-%d").date()
+            for d in partition_dates.split(",")
+            if d.strip()
+        ]
+    today = datetime.utcnow().date()
+    return [today - timedelta(days=offset) for offset in range(lookback_days, -1, -1)]
+
+
+def partition_directory(day):
+    # Matches partitionBy("year", "month", "day") output (no zero padding)
+    return f"{silver_prefix}year={day.year}/month={day.month}/day={day.day}"
+
+
+def list_partition(s3_client, directory):
+    # (visible data files, hidden keys such as staging output)
+    visible, hidden = [], []
+    for obj in iter_objects(s3_client, bucket, f"{directory}/"):
+        relative = obj["Key"][len(directory) + 1 :]
+        if relative == COMPACTION_MARKER:
+            continue
+        if is_hidden(relative):
+            hidden.append(obj["Key"])
+        elif relative.endswith(".parquet"):
+            visible.append(obj)
+    return visible, hidden
+
+
+def unread_partitions(s3_client):
+    # Silver partitions with batches Silver -> Gold has not read yet
+    checkpoint = read_checkpoint(s3_client, bucket, gold_checkpoint_key)
+    position = checkpoint.get("change_log") if checkpoint else None
+    changes = (
+        unread_changes(s3_client, bucket, "silver", position) if position else None
+    )
+    if changes is None:
+        # Gold reads all of silver next time
+        return set()
+    return {partition for _, entry in changes for partition in entry["partitions"]}
+
+
+def switch_catalog_location(glue_client, directory, location=""):
+    # Points the catalog partition of directory at one of its locations;
+    # partitions the crawler has not added yet are left to it
+    if not database:
+        return
+    values = partition_values(silver_prefix, directory)
+    try:
+        partition = glue_client.get_partition(
+            DatabaseName=database, TableName=catalog_table, PartitionValues=values
+        )["Partition"]
+    except glue_client.exceptions.EntityNotFoundException:
+        return
+    descriptor = dict(
+        partition["StorageDescriptor"],
+        Location=f"s3://{bucket}/{directory}/{location}",
+    )
+    glue_client.update_partition(
+        DatabaseName=database,
+        TableName=catalog_table,
+        PartitionValueList=values,
+        PartitionInput={
+            "Values": values,
+            "StorageDescriptor": descriptor,
+            "Parameters": partition.get("Parameters", {}),
+        },
+    )
+
+
+def wait_for_crawler(glue_client):
+    # A crawl in the middle of a swap could point the partition back at its
+    # directory while that is being rewritten
+    if not crawler_name:
+        return
+    while glue_client.get_crawler(Name=crawler_name)["Crawler"]["State"] != "READY":
+        logger.info(f"Waiting for crawler {crawler_name} before swapping")
+        time.sleep(CRAWLER_POLL_SECONDS)
+
+
+def finish_swap(s3_client, glue_client, directory, marker):
+    # Readers are on the compacted files: rewrite the directory, then send
+    # the catalog and the S3 readers back to it
+    restore_compacted_directory(s3_client, bucket, directory, marker)
+    switch_catalog_location(glue_client, directory)
+    clear_compaction_marker(s3_client, bucket, directory, marker)
+
+
+def compact_partition(s3_client, glue_client, directory, run_id):
+    marker = read_compaction_marker(s3_client, bucket, directory)
+    if marker:
+        logger.info(f"{directory}: finishing the swap of run {marker['run_id']}")
+        wait_for_crawler(glue_client)
+        finish_swap(s3_client, glue_client, directory, marker)
+
+    # Leftovers of runs that failed before their swap: staging output and
+    # compacted files that were never committed
+    live, hidden = list_partition(s3_client, directory)
+    leftovers = [
+        key
+        for key in hidden
+        if "/_staging-" in key or f"/{COMPACTED_DIRECTORY_PREFIX}" in key
+    ]
+    if leftovers:
+        logger.info(f"{directory}: removing {len(leftovers)} leftover files")
+        delete_keys(s3_client, bucket, leftovers)
+
+    total_bytes = sum(obj["Size"] for obj in live)
+    if directory[len(silver_prefix) :] in unread_partitions(s3_client):
+        logger.info(f"{directory}: batches not read by Silver -> Gold yet, skipping")
+        return None
+    if len(live) < min_files:
+        logger.info(f"{directory}: {len(live)} live files, skipping")
+        return None
+
+    output_files = max(1, math.ceil(total_bytes / (target_file_mb * 1024 * 1024)))
+    logger.info(
+        f"{directory}: {len(live)} files, {total_bytes / 1024 / 1024:,.1f} MB "
+        f"-> {output_files} files"
+    )
+
+    # 1. Write the compacted, sorted partition to a hidden staging directory
+    staging_prefix = f"{directory}/_staging-{run_id}/"
+    # Files from before and after a silver_columns change differ in columns
+    source_df = spark.read.option("mergeSchema", "true").parquet(
+        *[f"s3://{bucket}/{obj['Key']}" for obj in live]
+    )
+    source_rows = source_df.count()
+
+    sort_columns = [col(c) for c in sort_key]
+    source_df.repartitionByRange(output_files, *sort_columns).sortWithinPartitions(
+        *sort_columns
+    ).write.mode("overwrite").options(**parquet_write_options(bloom_columns)).parquet(
+        f"s3://{bucket}/{staging_prefix}"
+    )
+
+    staged = sorted(
+        obj["Key"]
+        for obj in iter_objects(s3_client, bucket, staging_prefix)
+        if obj["Key"].endswith(".parquet")
+    )
+    staged_rows = spark.read.parquet(
+        *[f"s3://{bucket}/{key}" for key in staged]
+    ).count()
+    if staged_rows != source_rows:
+        delete_keys(
+            s3_client,
+            bucket,
+            [obj["Key"] for obj in iter_objects(s3_client, bucket, staging_prefix)],
+        )
+        raise RuntimeError(
+            f"{directory}: compacted {staged_rows:,} rows, expected {source_rows:,}"
+        )
+
+    # 2. Copy into a hidden directory of the partition, unseen by readers
+    location = f"{COMPACTED_DIRECTORY_PREFIX}{run_id}/"
+    compacted_names = []
+    for i, key in enumerate(staged):
+        name = f"{COMPACTED_FILE_PREFIX}{run_id}-{i:05d}.snappy.parquet"
+        s3_client.copy(
+            {"Bucket": bucket, "Key": key}, bucket, f"{directory}/{location}{name}"
+        )
+        compacted_names.append(name)
+    delete_keys(
+        s3_client,
+        bucket,
+        [obj["Key"] for obj in iter_objects(s3_client, bucket, staging_prefix)],
+    )
+
+    # 3. Commit: the marker moves S3 readers to the compacted files in one PUT,
+    # the partition location does the same for the catalog. Files written to
+    # the directory meanwhile stay live for S3 readers; the catalog shows them
+    # once it points back at the directory.
+    marker = {
+        "run_id": run_id,
+        "committed_at": datetime.utcnow().isoformat(),
+        "rows": source_rows,
+        "location": location,
+        "files": compacted_names,
+        "replaced": sorted(obj["Key"].rpartition("/")[2] for obj in live),
+    }
+    # A retry of a batch folded in here must not add its rows again
+    record_compacted_batches(
+        s3_client, bucket, directory, batch_ids_of(marker["replaced"])
+    )
+    wait_for_crawler(glue_client)
+    write_compaction_marker(s3_client, bucket, directory, marker)
+    switch_catalog_location(glue_client, directory, location)
+
+    # 4. Rewrite the directory behind the readers' backs and move them back; a
+    # failure here leaves the marker, and the next run finishes the swap
+    finish_swap(s3_client, glue_client, directory, marker)
+
+    logger.info(
+        f"{directory}: compacted {source_rows:,} rows from {len(live)} into "
+        f"{len(compacted_names)} files"
+    )
+    return {"files_in": len(live), "files_out": len(compacted_names)}
+
+
+def record_compaction(s3_client, run_id):
+    # Compaction keeps every row: the run goes into the silver stats with
+    # none, and a missing stats file is recounted
+    lease_key = acquire_lease(
+        s3_client,
+        bucket,
+        "compaction",
+        writer_lease_minutes * 60,
+        writer_lease_wait_seconds,
+        logger=logger,
+    )
+    try:
+        return record_batch_rows(
+            s3_client,
+            bucket,
+            "silver",
+            batch_id_for("silver_compaction", run_id),
+            0,
+            lambda: count_live_rows(spark, s3_client, bucket, silver_prefix),
+        )
+    finally:
+        release_lease(s3_client, bucket, lease_key)
+
+
+def process_data():
+    try:
+        logger.info("Starting silver compaction")
+        run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        s3_client = boto3.client("s3")
+        glue_client = boto3.client("glue")
+
+        compacted = 0
+        for day in selected_dates():
+            if compact_partition(
+                s3_client, glue_client, partition_directory(day), run_id
+            ):
+                compacted += 1
+
+        if compacted:
+            try:
+                silver_stats = record_compaction(s3_client, run_id)
+                logger.info(f"Silver total: {silver_stats['total_rows']:,} rows")
+            except Exception as stats_error:
+                logger.warning(f"Could not update the silver stats: {stats_error}")
+
+        logger.info(f"Silver compaction completed: {compacted} partitions compacted")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error in silver compaction: {e}")
+        raise e
+
+
+if __name__ == "__main__":
+    job.init(args["JOB_NAME"], args)
+    process_data()
+    job.commit()
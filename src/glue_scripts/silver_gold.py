@@ -1,14 +1,45 @@
-import json
+import builtins
 import logging
 import sys
+import uuid
+from datetime import datetime
 
 import boto3
+import hll_sketch
 from awsglue.context import GlueContext
 from awsglue.dynamicframe import DynamicFrame
 from awsglue.job import Job
 from awsglue.utils import getResolvedOptions
+from gold_checkpoint import (
+    CHECKPOINT_KEY,
+    checkpoint_version,
+    commit_checkpoint,
+    read_checkpoint,
+    read_json,
+    write_checkpoint,
+    write_json,
+)
+from layer_stats import record_batch_rows
+from partition_commit import (
+    BATCH_FILE_PREFIX,
+    CHANGE_LOG_MARGIN,
+    CHANGE_TIME_FORMAT,
+    batch_id_for,
+    batch_ids_of,
+    change_log_prefix,
+    change_log_time,
+    iter_live_objects,
+    partition_values,
+    position_after,
+    read_change_log,
+    read_compacted_batches,
+    unread_changes,
+    write_partitioned_batch,
+)
 from pyspark.context import SparkContext
+from pyspark.sql import Observation
 from pyspark.sql.functions import *
+from s3_listing import iter_keys, prefix_exists
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -36,6 +67,32 @@ pipeline_run = "unknown"
 gold_path = f"s3://{bucket}/gold/"
 silver_path = f"s3://{bucket}/silver/"
 
+# Checkpoint of what silver is in gold (gold_checkpoint.py), written once both
+# gold tables of a run are committed
+checkpoint_key = CHECKPOINT_KEY
+# The change log entries a run from a checkpoint version reads, so that a
+# retry reads the same batches
+plan_key = "_checkpoints/silver_gold/plan.json"
+
+# Daily metrics are stored as mergeable state (one row per event_date): these
+# sums and counts, max(processing_timestamp) and a HyperLogLog sketch of the
+# user_ids. unique_users and avg_response_time are derived from the state.
+daily_sums = {
+    "total_bytes_sent": "bytes_sent",
+    "response_time_sum": "response_time_ms",
+    # Error counts
+    "client_error_count": "is_client_error",
+    "server_error_count": "is_server_error",
+    "success_count": "is_success",
+    "redirect_count": "is_redirect",
+    # Performance indicators
+    "slow_requests": "is_slow",
+    "fast_requests": "is_fast",
+    "large_responses": "is_large_response",
+    "small_responses": "is_small_response",
+}
+daily_counts = ["total_requests", "response_time_count"]
+
 logger.info(f"Silver to Gold ETL Configuration")
 logger.info(f"Bucket: {bucket}")
 logger.info(f"Database: {database}")
@@ -118,6 +175,7 @@ def business_kpis(df):
 def get_latest_processed_timestamp(bucket):
 
     # Get the latest processing_timestamp from the gold layer.
+    # Full scan of the daily metrics, only used to rebuild a missing checkpoint.
 
     try:
         # Try to read existing daily_metrics to get the latest processed timestamp
@@ -152,14 +210,269 @@ def get_latest_processed_timestamp(bucket):
         return None
 
 
+def observe_rows(df, name):
+    # (df, observation); the row count is collected by the write of df
+    observation = Observation(name)
+    return df.observe(observation, count(lit(1)).alias("rows")), observation
+
+
+def load_checkpoint(s3_client):
+    # The checkpoint, rebuilt from max(processing_timestamp) of the gold daily
+    # metrics when it is missing. None before the first gold run.
+    checkpoint = read_checkpoint(s3_client, bucket, checkpoint_key)
+    if checkpoint is not None:
+        return checkpoint
+
+    logger.warning(f"No watermark checkpoint at {checkpoint_key}, rebuilding from gold")
+    watermark = get_latest_processed_timestamp(bucket)
+    if watermark is None:
+        return None
+    return write_checkpoint(
+        s3_client, bucket, 0, watermark, "rebuilt-from-gold", None, key=checkpoint_key
+    )
+
+
+def plan_increment(s3_client, checkpoint):
+    # The silver change log entries the run reads: {"version", "keys", "full"},
+    # where full means every silver file (no position yet, or the log does not
+    # reach back to it). A retry from the same checkpoint version gets the
+    # plan of the first attempt.
+    version = checkpoint_version(checkpoint)
+    plan = read_json(s3_client, bucket, plan_key)
+    if plan and plan["version"] == version:
+        logger.info(f"Reading the {len(plan['keys']):,} change log entries planned")
+        return plan
+
+    position = checkpoint.get("change_log") if checkpoint else None
+    changes = (
+        unread_changes(s3_client, bucket, "silver", position) if position else None
+    )
+    if changes is None:
+        keys = list(iter_keys(s3_client, bucket, change_log_prefix("silver")))
+        plan = {"version": version, "keys": keys, "full": True, "read": []}
+    else:
+        plan = {
+            "version": version,
+            "keys": [key for key, _ in changes],
+            "full": False,
+            "read": [position["key"], *position.get("recent", [])],
+        }
+    write_json(s3_client, bucket, plan_key, plan)
+    return plan
+
+
+def later_batch_ids(s3_client, plan):
+    # Batches logged after the plan was made; their files are the next run's.
+    # Entries read by earlier runs ("read") are not.
+    start_after = None
+    known = plan["keys"] + plan["read"]
+    if known:
+        start = builtins.max(map(change_log_time, known)) - CHANGE_LOG_MARGIN
+        start_after = (
+            f"{change_log_prefix('silver')}{start.strftime(CHANGE_TIME_FORMAT)}"
+        )
+    known = set(known)
+    return {
+        entry["batch_id"]
+        for key, entry in read_change_log(
+            s3_client, bucket, "silver", start_after=start_after
+        )
+        if key not in known
+    }
+
+
+def partition_day(partition):
+    # year=2025/month=1/day=2 -> date(2025, 1, 2), None for the null partition
+    try:
+        return datetime(*[int(v) for v in partition_values("", partition)]).date()
+    except ValueError:
+        return None
+
+
+def silver_increment_files(s3_client, plan, later_ids):
+    # (live silver files to read, days whose batches a compaction folded in
+    # before they were read, which are recomputed from silver)
+    if plan["full"]:
+        logger.info("Reading all silver partitions")
+        objects = [
+            obj
+            for obj in iter_live_objects(s3_client, bucket, "silver/")
+            if not batch_ids_of([obj["Key"].rpartition("/")[2]]) & later_ids
+        ]
+        return live_paths(objects), []
+
+    batches = {}
+    for key in plan["keys"]:
+        entry = read_json(s3_client, bucket, key)
+        for partition in entry["partitions"]:
+            batches.setdefault(partition, set()).add(entry["batch_id"])
+    logger.info(f"Silver partitions changed since the checkpoint: {sorted(batches)}")
+
+    objects, rebuild_days = [], []
+    for partition, batch_ids in sorted(batches.items()):
+        directory = f"silver/{partition}"
+        live = list(iter_live_objects(s3_client, bucket, f"{directory}/"))
+        objects += [
+            obj
+            for obj in live
+            if batch_ids_of([obj["Key"].rpartition("/")[2]]) & batch_ids
+        ]
+        missing = batch_ids - batch_ids_of(
+            obj["Key"].rpartition("/")[2] for obj in live
+        )
+        if missing & read_compacted_batches(s3_client, bucket, directory):
+            day = partition_day(partition)
+            if day is not None:
+                logger.warning(f"{directory}: batches compacted before gold read them")
+                rebuild_days.append(day)
+    return live_paths(objects), rebuild_days
+
+
+def record_gold_rows(s3_client, table, batch_id, rows):
+    # Running table total from _stats/, recounted once if the file is missing
+    stats = record_batch_rows(
+        s3_client,
+        bucket,
+        f"gold_{table}",
+        batch_id,
+        rows,
+        lambda: spark.read.parquet(f"{gold_path}{table}/").count(),
+    )
+    return stats["total_rows"]
+
+
+def day_partition(day):
+    # Partition path of an event_date, as written by partitionBy
+    return f"year={day.year}/month={day.month}/day={day.day}"
+
+
+def daily_state(df):
+    # Mergeable daily state of silver rows
+    df = df.filter(col("event_date").isNotNull())
+    totals = df.groupBy("event_date").agg(
+        count("*").alias("total_requests"),
+        count("response_time_ms").alias("response_time_count"),
+        *[sum(source).alias(name) for name, source in daily_sums.items()],
+        max("processing_timestamp").alias("processing_timestamp"),
+    )
+    users = hll_sketch.sketch_by(df, "event_date", "user_id", "user_hll")
+    return totals.join(users, "event_date", "left").withColumn(
+        "user_hll", coalesce(col("user_hll"), hll_sketch.empty())
+    )
+
+
+def fold_daily_state(increment, existing):
+    # One row per event_date: counts and sums added, sketches merged
+    joined = increment.alias("n").join(existing.alias("e"), "event_date", "full_outer")
+    return joined.select(
+        "event_date",
+        *[
+            (coalesce(col(f"n.{c}"), lit(0)) + coalesce(col(f"e.{c}"), lit(0))).alias(c)
+            for c in daily_counts + list(daily_sums)
+        ],
+        greatest(col("n.processing_timestamp"), col("e.processing_timestamp")).alias(
+            "processing_timestamp"
+        ),
+        hll_sketch.merge("n.user_hll", "e.user_hll").alias("user_hll"),
+    )
+
+
+def merge_daily_state(s3_client, increment, batch_id, rebuild_days, later_ids):
+    # Folds the increment into the gold rows of the days it touches. Returns
+    # the new state of those days and the number of gold rows it replaces.
+    days = {row["event_date"] for row in increment.select("event_date").collect()}
+    days = sorted(days | set(rebuild_days))
+
+    # Days a failed attempt of this batch already wrote hold the merged state
+    merged_days, existing_objects = [], []
+    for day in days:
+        objects = [
+            obj
+            for obj in iter_live_objects(
+                s3_client, bucket, f"gold/daily_metrics/{day_partition(day)}/"
+            )
+            if obj["Key"].endswith(".parquet")
+        ]
+        own = [
+            obj
+            for obj in objects
+            if obj["Key"]
+            .rpartition("/")[2]
+            .startswith(f"{BATCH_FILE_PREFIX}{batch_id}-")
+        ]
+        if own:
+            merged_days.append(day)
+        existing_objects += own or objects
+
+    if not existing_objects:
+        existing = None
+        stale_days = list(rebuild_days)
+        replaced_rows = 0
+    else:
+        existing = spark.read.option("mergeSchema", "true").parquet(
+            *live_paths(existing_objects)
+        )
+        replaced_rows = existing.filter(~col("event_date").isin(merged_days)).count()
+        # Days without state (rows from before the state columns) cannot be
+        # merged either; they are recomputed from their silver partitions
+        if "user_hll" in existing.columns:
+            unmerged = existing.filter(col("user_hll").isNull())
+        else:
+            unmerged = existing
+        stale_days = {
+            row["event_date"]
+            for row in unmerged.select("event_date").distinct().collect()
+        }
+        stale_days = sorted((stale_days | set(rebuild_days)) - set(merged_days))
+
+    done = merged_days + stale_days
+    state = increment.filter(~col("event_date").isin(done))
+    if existing is not None and "user_hll" in existing.columns:
+        state = fold_daily_state(state, existing.filter(~col("event_date").isin(done)))
+        state = state.unionByName(
+            existing.filter(col("event_date").isin(merged_days)).select(*state.columns)
+        )
+    if not stale_days:
+        return state, replaced_rows
+
+    # Everything in the days' partitions up to this run's batches
+    logger.info(f"Recomputing daily metrics from silver for: {stale_days}")
+    silver_objects = [
+        obj
+        for day in stale_days
+        for obj in iter_live_objects(s3_client, bucket, f"silver/{day_partition(day)}/")
+        if obj["Key"].endswith(".parquet")
+        and not batch_ids_of([obj["Key"].rpartition("/")[2]]) & later_ids
+    ]
+    if not silver_objects:
+        return state, replaced_rows
+    rebuilt = daily_state(
+        spark.read.option("mergeSchema", "true").parquet(*live_paths(silver_objects))
+    )
+    return state.unionByName(rebuilt), replaced_rows
+
+
+def daily_metrics(state):
+    return state.withColumn("unique_users", hll_sketch.estimate("user_hll")).withColumn(
+        "avg_response_time", col("response_time_sum") / col("response_time_count")
+    )
+
+
+def live_paths(objects):
+    # Live files only, so a compaction in progress is never read twice
+    return [
+        f"s3://{bucket}/{obj['Key']}"
+        for obj in objects
+        if obj["Key"].endswith(".parquet")
+    ]
+
+
 def check_s3_path_exists(bucket, prefix):
 
     # This can be used for validation before processing.
 
     try:
-        s3_client = boto3.client("s3")
-        response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1)
-        return "Contents" in response and len(response["Contents"]) > 0
+        return prefix_exists(boto3.client("s3"), bucket, prefix)
     except Exception as e:
         logger.error(f"Error checking S3 path {prefix}: {e}")
         return False
@@ -168,94 +481,118 @@ def check_s3_path_exists(bucket, prefix):
 def process_data():
     try:
         logger.info("Starting Silver -> Gold ETL processing")
+        run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        s3_client = boto3.client("s3")
 
-        # PRIMARY APPROACH: Direct S3 reading with timestamp-based incremental processing
-        logger.info("Reading silver data directly from S3")
-        silver_path = f"s3://{bucket}/silver/"
-        logger.info(f"Reading from S3 path: {silver_path}")
+        # Last processed timestamp from the watermark checkpoint
+        checkpoint = load_checkpoint(s3_client)
+        latest_processed_timestamp = checkpoint["watermark"] if checkpoint else None
+        logger.info(
+            f"Last processed timestamp: {latest_processed_timestamp} "
+            f"(checkpoint version {checkpoint_version(checkpoint)})"
+        )
 
         # Validate S3 path exists
         if not check_s3_path_exists(bucket, "silver/"):
             logger.error("Silver path does not exist or is empty")
             return False
 
-        # Read Silver data directly from S3 (no crawler dependency)
-        silver_data = glueContext.create_dynamic_frame.from_options(
-            connection_type="s3",
-            connection_options={
-                "paths": [silver_path],
-                "recurse": True,
-                "useS3ListImplementation": True,
-            },
-            format="parquet",
-            transformation_ctx="silver_to_gold_bookmark",
+        # The silver batches logged since the checkpoint's change log position:
+        # rows are selected by the batch that wrote them, not by their
+        # processing_timestamp, which concurrent writers do not commit in order
+        plan = plan_increment(s3_client, checkpoint)
+        later_ids = later_batch_ids(s3_client, plan)
+        silver_files, rebuild_days = silver_increment_files(s3_client, plan, later_ids)
+        change_log_position = position_after(
+            checkpoint.get("change_log") if checkpoint else None, plan["keys"]
         )
-
-        df = silver_data.toDF()
-        total_count = df.count()
-        logger.info(f"Total Silver data found in S3: {total_count:,}")
-
-        if total_count == 0:
-            logger.info("No Silver data to process")
-            return True
-
-        # Get last processed timestamp from Gold layer to determine what's new
-        latest_processed_timestamp = get_latest_processed_timestamp(bucket)
+        # The batch is keyed by the checkpoint version and the planned entries.
+        # A retry reads the same entries and replaces the failed attempt's files.
+        batch_id = batch_id_for("silver_gold", plan["version"], plan["keys"])
         logger.info(
-            f"Last processed timestamp from Gold layer: {latest_processed_timestamp}"
+            f"Gold batch {batch_id}: {len(plan['keys']):,} change log entries, "
+            f"{len(silver_files):,} live silver files to read"
         )
+        if not silver_files and not rebuild_days:
+            logger.info("No new data to process - all data already processed")
+            commit_checkpoint(
+                s3_client,
+                bucket,
+                checkpoint,
+                latest_processed_timestamp,
+                run_id,
+                batch_id,
+                change_log_position,
+                checkpoint_key,
+            )
+            return True
 
-        if latest_processed_timestamp:
-            # Filter to only process newer data (incremental processing)
-            df = df.filter(col("processing_timestamp") > latest_processed_timestamp)
-            new_count = df.count()
+        # Read Silver data directly from S3 (no crawler dependency); with only
+        # days to recompute the increment is empty
+        df = spark.read.option("mergeSchema", "true").parquet(
+            *(
+                silver_files
+                or [f"s3://{bucket}/silver/{day_partition(rebuild_days[0])}/"]
+            )
+        )
+        if not silver_files:
+            df = df.limit(0)
+
+        if plan["full"] and latest_processed_timestamp:
+            # All of silver: rows newer than the watermark; the predicate is
+            # pushed down to the Parquet reader, which skips row groups
+            df = df.filter(
+                col("processing_timestamp") > lit(latest_processed_timestamp)
+            )
+            logger.info("Reading all of silver past the watermark")
+        elif plan["full"]:
             logger.info(
-                f"New data to process (after {latest_processed_timestamp}): {new_count:,}"
+                "No previous checkpoint found - processing all data (first run)"
             )
 
-            if new_count == 0:
-                logger.info("No new data to process - all data already processed")
-                return True
-
-            logger.info(f"Processing {new_count:,} new records with incremental logic")
-        else:
-            logger.info("No previous timestamp found - processing all data (first run)")
-            logger.info(f"Processing {total_count:,} total records")
+        # Row count and the newest processing_timestamp, in one pass
+        summary = df.agg(
+            count(lit(1)).alias("rows"),
+            max("processing_timestamp").alias("watermark"),
+        ).collect()[0]
+        processed_count = summary["rows"]
+        new_watermark = summary["watermark"]
+        if new_watermark is None or (
+            latest_processed_timestamp and new_watermark < latest_processed_timestamp
+        ):
+            new_watermark = latest_processed_timestamp
+        logger.info(f"Records to process: {processed_count:,} (up to {new_watermark})")
 
         # Debug: Show schema and sample data
         logger.debug("Data schema:")
         df.printSchema()
 
-        if df.count() == 0:
+        if processed_count == 0 and not rebuild_days:
             logger.info("No new silver data to process")
+            commit_checkpoint(
+                s3_client,
+                bucket,
+                checkpoint,
+                new_watermark,
+                run_id,
+                batch_id,
+                change_log_position,
+                checkpoint_key,
+            )
             return True
 
         # Validate data quality
-        if not validate_data(df):
+        if processed_count and not validate_data(df):
             logger.error("Data validation failed. Stopping processing.")
             return False
 
         # Curated metrics
 
-        # Daily aggregations
-        curated_metrics = df.groupBy("event_date").agg(
-            count("*").alias("total_requests"),
-            countDistinct("user_id").alias("unique_users"),
-            avg("response_time_ms").alias("avg_response_time"),
-            sum("bytes_sent").alias("total_bytes_sent"),
-            # Error counts
-            sum("is_client_error").alias("client_error_count"),
-            sum("is_server_error").alias("server_error_count"),
-            sum("is_success").alias("success_count"),
-            sum("is_redirect").alias("redirect_count"),
-            # Performance indicators
-            sum("is_slow").alias("slow_requests"),
-            sum("is_fast").alias("fast_requests"),
-            sum("is_large_response").alias("large_responses"),
-            sum("is_small_response").alias("small_responses"),
-            # CRITICAL: Include max processing_timestamp for next incremental run
-            max("processing_timestamp").alias("processing_timestamp"),
+        # Daily aggregations, folded into the days already in gold
+        daily_state_df, replaced_daily_rows = merge_daily_state(
+            s3_client, daily_state(df), batch_id, rebuild_days, later_ids
         )
+        curated_metrics = daily_metrics(daily_state_df)
 
         # Session aggregations
         session_metrics = df.groupBy("user_session").agg(
@@ -266,25 +603,10 @@ def process_data():
             sum("response_time_ms").alias("total_response_time"),
         )
 
-        # Always use APPEND mode - safer approach
-        logger.info("Writing daily metrics to Gold layer with APPEND mode")
-        logger.info("This ensures we never lose existing data")
-        write_mode = "append"
-
         # Add business KPIs and partitions for dashboard-ready data
         curated_metrics = business_kpis(curated_metrics)
         curated_metrics = partition_columns(curated_metrics)
 
-        # Write using Spark DataFrame with appropriate mode
-        curated_metrics.write.mode(write_mode).partitionBy(
-            "year", "month", "day"
-        ).format("parquet").option("compression", "snappy").save(
-            f"{gold_path}/daily_metrics/"
-        )
-
-        # Writing session metrics to Gold layer with APPEND mode
-        logger.info("Writing session metrics to Gold layer with APPEND mode")
-
         # Add session date for partitioning
         session_metrics = session_metrics.withColumn(
             "session_date", to_date(col("session_start"))
@@ -297,49 +619,77 @@ def process_data():
             "day", dayofmonth(col("session_date"))
         )
 
-        # Write using Spark DataFrame
-        session_metrics.write.mode(write_mode).partitionBy(
-            "year", "month", "day"
-        ).format("parquet").option("compression", "snappy").save(
-            f"{gold_path}/session_metrics/"
+        # Output row counts are collected by the writes
+        session_metrics, session_observation = observe_rows(
+            session_metrics, "session_metrics"
+        )
+        curated_metrics, daily_observation = observe_rows(
+            curated_metrics, "daily_metrics"
+        )
+
+        # Both tables are written before the watermark checkpoint moves, so the
+        # batch only counts as processed once both are committed
+        logger.info("Writing session metrics to Gold layer")
+        write_partitioned_batch(
+            session_metrics,
+            s3_client,
+            bucket,
+            "gold/session_metrics/",
+            batch_id,
+            ["year", "month", "day"],
+        )
+
+        # One row per day: the merged rows replace the day partitions
+        logger.info("Writing daily metrics to Gold layer")
+        write_partitioned_batch(
+            curated_metrics,
+            s3_client,
+            bucket,
+            "gold/daily_metrics/",
+            batch_id,
+            ["year", "month", "day"],
+            replace_partitions=True,
+        )
+
+        # Both tables are committed: move the checkpoint on. A run failing
+        # before this point is retried with the same plan and batch id.
+        checkpoint = commit_checkpoint(
+            s3_client,
+            bucket,
+            checkpoint,
+            new_watermark,
+            run_id,
+            batch_id,
+            change_log_position,
+            checkpoint_key,
+        )
+        logger.info(
+            f"Watermark checkpoint version {checkpoint['version']}: "
+            f"{checkpoint['watermark']}"
         )
 
         logger.info("Silver -> Gold ETL processing completed successfully!")
 
         # Final processing summary
-        daily_count = curated_metrics.count()
-        session_count = session_metrics.count()
+        daily_count = daily_observation.get["rows"] or 0
+        session_count = session_observation.get["rows"] or 0
 
         logger.info(f"Processing Summary:")
-        logger.info(f"   Records processed: {df.count():,}")
-        logger.info(f"   Daily metrics created: {daily_count:,}")
+        logger.info(f"   Records processed: {processed_count:,}")
+        logger.info(
+            f"   Daily metrics written: {daily_count:,} "
+            f"(replacing {replaced_daily_rows:,})"
+        )
         logger.info(f"   Session metrics created: {session_count:,}")
 
-        # Get total counts in gold bucket after writing
+        # Gold totals from the stats files instead of re-reading both tables
         try:
-            # Get total daily metrics count
-            daily_metrics_total_frame = glueContext.create_dynamic_frame.from_options(
-                connection_type="s3",
-                connection_options={
-                    "paths": [f"{gold_path}/daily_metrics/"],
-                    "recurse": True,
-                },
-                format="parquet",
+            daily_metrics_total_count = record_gold_rows(
+                s3_client, "daily_metrics", batch_id, daily_count - replaced_daily_rows
             )
-            daily_metrics_total_df = daily_metrics_total_frame.toDF()
-            daily_metrics_total_count = daily_metrics_total_df.count()
-
-            # Get total session metrics count
-            session_metrics_total_frame = glueContext.create_dynamic_frame.from_options(
-                connection_type="s3",
-                connection_options={
-                    "paths": [f"{gold_path}/session_metrics/"],
-                    "recurse": True,
-                },
-                format="parquet",
+            session_metrics_total_count = record_gold_rows(
+                s3_client, "session_metrics", batch_id, session_count
             )
-            session_metrics_total_df = session_metrics_total_frame.toDF()
-            session_metrics_total_count = session_metrics_total_df.count()
 
             logger.info(
                 f"JOB  COMPLETED: Wrote {daily_count:,} daily metrics and {session_count:,} session metrics to gold"
@@ -358,7 +708,8 @@ def process_data():
         import traceback
 
         logger.error(f"Traceback: {traceback.format_exc()}")
-        return False
+        # Fail the run, so Glue retries it instead of committing the bookmark
+        raise e
 
 
 if __name__ == "__main__":
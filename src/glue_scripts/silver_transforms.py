@@ -0,0 +1,272 @@
+import logging
+
+from pyspark.sql.functions import (
+    array,
+    array_remove,
+    coalesce,
+    col,
+    concat,
+    current_timestamp,
+    date_format,
+    dayofmonth,
+    hour,
+    lit,
+    month,
+    to_date,
+    when,
+    xxhash64,
+    year,
+)
+from pyspark.sql.types import LongType, StringType, StructField, StructType
+
+# Bronze -> Silver record transforms, plain pyspark with no awsglue imports so
+# they run on a local SparkSession too. Casts and enrichment are column specs
+# applied with one select each instead of a withColumn per field, which keeps
+# the logical plan flat.
+
+logger = logging.getLogger(__name__)
+
+EXPECTED_FIELDS = [
+    "event_id",
+    "event_ts",
+    "session_id",
+    "method",
+    "path",
+    "status",
+    "bytes_sent",
+    "response_time_ms",
+    "referrer",
+    "user_agent",
+    "user_id",
+    "cache_status",
+    "cdn_edge",
+    "db_query_time_ms",
+    "request_id",
+]
+
+VALID_METHODS = ["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"]
+
+# Web-log record as written by sample_data_generator.generate_event. Declaring it
+# skips the JSON schema inference pass over the input. Numeric fields are read
+# as long and narrowed by cast_data_types, as with the inferred schema.
+BRONZE_SCHEMA = StructType(
+    [
+        StructField("event_id", StringType()),
+        StructField("event_ts", StringType()),
+        StructField("session_id", StringType()),
+        StructField("client_ip", StringType()),
+        StructField("method", StringType()),
+        StructField("path", StringType()),
+        StructField("status", LongType()),
+        StructField("bytes_sent", LongType()),
+        StructField("response_time_ms", LongType()),
+        StructField("referrer", StringType()),
+        StructField("user_agent", StringType()),
+        StructField("user_id", StringType()),
+        StructField("cache_status", StringType()),
+        StructField("cdn_edge", StringType()),
+        StructField("db_query_time_ms", LongType()),
+        StructField("request_id", StringType()),
+        # Padding fields
+        StructField("log_level", StringType()),
+        StructField("log_message", StringType()),
+        StructField("server_name", StringType()),
+        StructField("datacenter", StringType()),
+        StructField("request_headers", StringType()),
+        StructField("response_headers", StringType()),
+    ]
+)
+
+# Bronze fields the silver rows need: event_id dedup, the validation rules and
+# the enrichment, which also covers every field Silver -> Gold reads. The
+# default silver allowlist; other fields (mostly the generator's padding) are
+# not read unless listed, or go to the optional silver_raw table.
+REQUIRED_FIELDS = [
+    "event_id",
+    "event_ts",
+    "client_ip",
+    "method",
+    "path",
+    "status",
+    "bytes_sent",
+    "response_time_ms",
+    "user_id",
+]
+
+
+def silver_columns(spec="default"):
+    # "default", "all" (every bronze field) or a comma-separated allowlist,
+    # always including REQUIRED_FIELDS; returned in bronze schema order
+    if spec == "all":
+        return BRONZE_SCHEMA.fieldNames()
+    names = set(REQUIRED_FIELDS)
+    if spec != "default":
+        names.update(name.strip() for name in spec.split(",") if name.strip())
+    unknown = names - set(BRONZE_SCHEMA.fieldNames())
+    if unknown:
+        raise ValueError(f"Unknown silver columns: {sorted(unknown)}")
+    return [name for name in BRONZE_SCHEMA.fieldNames() if name in names]
+
+
+def bronze_read_schema(columns):
+    # BRONZE_SCHEMA pruned to columns, so the JSON reader skips the others
+    return StructType(
+        [field for field in BRONZE_SCHEMA.fields if field.name in columns]
+    )
+
+
+# Target type and null default of the cast columns
+CAST_SPEC = {
+    "status": ("int", None),
+    "bytes_sent": ("long", None),
+    "response_time_ms": ("int", None),
+    "db_query_time_ms": ("int", None),
+    "referrer": (None, "direct"),
+}
+
+
+def cast_columns(columns, expected_fields=EXPECTED_FIELDS):
+    # Existing columns in order, then the missing expected fields as nulls
+    names = list(columns) + [name for name in expected_fields if name not in columns]
+    specs = []
+    for name in names:
+        cast_type, default = CAST_SPEC.get(name, (None, None))
+        if name in columns:
+            column = col(name)
+        else:
+            column = lit(None).cast("string")
+        if cast_type:
+            column = column.cast(cast_type)
+        if default is not None:
+            column = coalesce(column, lit(default))
+        specs.append(column.alias(name))
+    return specs
+
+
+def cast_data_types(df, expected_fields=EXPECTED_FIELDS):
+    # expected_fields: the EXPECTED_FIELDS kept by the silver allowlist
+    missing_fields = [field for field in expected_fields if field not in df.columns]
+    if missing_fields:
+        logger.warning(f"Missing fields: {missing_fields}")
+    return df.select(*cast_columns(df.columns, expected_fields))
+
+
+def validation_rules():
+    # (rule name, condition a valid row meets); null results count as failures
+    return [
+        # HTTP validations
+        ("invalid_status", col("status").between(100, 599)),
+        ("invalid_method", col("method").isin(VALID_METHODS)),
+        # Performance validations
+        (
+            "invalid_response_time",
+            (col("response_time_ms") > 0) & (col("response_time_ms") <= 30000),
+        ),
+        (
+            "invalid_bytes_sent",
+            (col("bytes_sent") >= 0) & (col("bytes_sent") <= 10000000),
+        ),
+        # Data integrity validations
+        ("missing_event_ts", col("event_ts").isNotNull()),
+        ("invalid_path", (col("path") != "") & (col("path") != "//")),
+        ("missing_client_ip", col("client_ip") != ""),
+    ]
+
+
+def tag_validation_failures(df):
+    # All rules in one projection: failed_rules lists the rules a row breaks
+    checks = [
+        when(coalesce(condition, lit(False)), lit("")).otherwise(lit(name))
+        for name, condition in validation_rules()
+    ]
+    return df.withColumn("failed_rules", array_remove(array(*checks), ""))
+
+
+def _flag(condition):
+    return when(condition, 1).otherwise(0)
+
+
+def enrichment_columns(processing_time=None):
+    # (column name, expression) pairs, in silver column order
+    status = col("status")
+    response_time_ms = col("response_time_ms")
+    bytes_sent = col("bytes_sent")
+    event_ts = col("event_ts")
+    event_date = to_date(event_ts)
+
+    return [
+        # Processing metadata
+        (
+            "processing_timestamp",
+            current_timestamp() if processing_time is None else processing_time,
+        ),
+        # Status indicators
+        ("is_client_error", _flag(status.between(400, 499))),
+        ("is_server_error", _flag(status.between(500, 599))),
+        ("is_success", _flag(status.between(200, 299))),
+        ("is_redirect", _flag(status.between(300, 399))),
+        # Performance indicators
+        ("is_slow", _flag(response_time_ms > 1000)),
+        ("is_fast", _flag(response_time_ms < 100)),
+        # Size indicators
+        ("is_large_response", _flag(bytes_sent > 100000)),
+        ("is_small_response", _flag(bytes_sent < 1000)),
+        # Date partitions
+        ("event_date", event_date),
+        ("year", year(event_date)),
+        ("month", month(event_date)),
+        ("day", dayofmonth(event_date)),
+        # Session tracking
+        (
+            "user_session",
+            concat(
+                coalesce(col("user_id"), lit("anonymous")),
+                lit("_"),
+                date_format(event_ts, "yyyy-MM-dd-HH"),
+            ),
+        ),
+        ("session_date", event_date),
+        ("session_hour", hour(event_ts)),
+    ]
+
+
+def add_enrichment_fields(df, processing_time=None):
+    # Enrichment columns replace same-named input columns, like withColumn did
+    enrichment = enrichment_columns(processing_time)
+    names = {name for name, _ in enrichment}
+    return df.select(
+        *[col(c) for c in df.columns if c not in names],
+        *[column.alias(name) for name, column in enrichment],
+    )
+
+
+def dedup_index_rows(df):
+    # event_id index rows of silver rows, sorted by hash so index reads can
+    # skip row groups
+    return (
+        df.filter(col("event_id").isNotNull() & col("event_date").isNotNull())
+        .select(
+            "event_date", xxhash64(col("event_id")).alias("event_id_hash"), "event_id"
+        )
+        .repartition("event_date")
+        .sortWithinPartitions("event_id_hash")
+    )
+
+
+def drop_indexed_event_ids(df, index):
+    # Rows of df whose (event date, event_id) is not in the index. The 8-byte
+    # hash column is the cheap filter: hash misses are new events, hash hits
+    # are confirmed against the exact ids of the matching rows.
+    keyed = df.withColumn("event_date", to_date(col("event_ts"))).withColumn(
+        "event_id_hash", xxhash64(col("event_id"))
+    )
+    hash_keys = ["event_date", "event_id_hash"]
+    hashes = index.select(*hash_keys)
+
+    misses = keyed.join(hashes, hash_keys, "left_anti")
+    hits = keyed.join(hashes, hash_keys, "left_semi")
+    collisions = hits.join(
+        index.select(*hash_keys, "event_id"), hash_keys + ["event_id"], "left_anti"
+    )
+
+    return misses.unionByName(collisions).drop("event_date", "event_id_hash")
@@ -0,0 +1,102 @@
+import json
+import random
+import time
+import uuid
+from datetime import datetime
+
+from s3_listing import iter_keys
+
+# Mutual exclusion between the Bronze -> Silver writers: this Glue job and the
+# Lambda small-file fast path (lambda_code/fast_path.py, packaged with this
+# module). Both consult and append to the manifest and the event_id dedup
+# index, so only one may work on bronze at a time. Silver compaction and the
+# streaming job take it only around their update of the silver stats
+# (layer_stats.py), which every silver writer reads and rewrites.
+#
+# A writer puts a lease object, then lists the leases. Without other live
+# leases it holds the lock; S3 is strongly consistent, so two writers racing
+# for it both see each other. A writer that sees a writer it does not wait for
+# drops its own lease and backs off; one that only sees writers it waits for
+# keeps its lease (newcomers back off from it) until those are gone. The Glue
+# job waits for fast-path leases, the fast path waits for nobody. The expiry
+# is part of the key, so checking leases needs no reads; leases of writers
+# that died stop counting once they expire.
+
+LEASE_PREFIX = "_manifests/bronze_silver/leases/"
+POLL_SECONDS = 5
+
+
+def lease_key(writer, seconds):
+    # <expiry epoch seconds>-<writer>-<id>, writer without dashes
+    expires_at = int(time.time() + seconds)
+    return f"{LEASE_PREFIX}{expires_at:012d}-{writer}-{uuid.uuid4().hex[:12]}"
+
+
+def parse_lease_key(key):
+    # (expires_at, writer)
+    expires_at, writer, _ = key[len(LEASE_PREFIX) :].split("-", 2)
+    return int(expires_at), writer
+
+
+def other_leases(s3_client, bucket, own_key):
+    # Writers of the other live leases; expired ones are removed on the way
+    now = time.time()
+    writers = []
+    for key in iter_keys(s3_client, bucket, LEASE_PREFIX):
+        if key == own_key:
+            continue
+        expires_at, writer = parse_lease_key(key)
+        if expires_at > now:
+            writers.append(writer)
+        else:
+            s3_client.delete_object(Bucket=bucket, Key=key)
+    return writers
+
+
+def acquire_lease(
+    s3_client,
+    bucket,
+    writer,
+    seconds,
+    wait_seconds,
+    waits_for=(),
+    logger=None,
+    poll_seconds=POLL_SECONDS,
+):
+    # Key of the lease held by `writer`, valid for `seconds`; RuntimeError
+    # when no lease could be had within wait_seconds
+    deadline = time.time() + wait_seconds
+    key = None
+    while True:
+        if key is None:
+            key = lease_key(writer, seconds)
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=json.dumps(
+                    {"writer": writer, "requested_at": datetime.utcnow().isoformat()}
+                ).encode("utf-8"),
+                ContentType="application/json",
+            )
+
+        others = other_leases(s3_client, bucket, key)
+        if not others:
+            return key
+        if any(other not in waits_for for other in others):
+            s3_client.delete_object(Bucket=bucket, Key=key)
+            key = None
+
+        if time.time() >= deadline:
+            if key is not None:
+                s3_client.delete_object(Bucket=bucket, Key=key)
+            raise RuntimeError(
+                f"Bronze -> Silver writers {sorted(set(others))} still hold "
+                f"leases after {wait_seconds}s"
+            )
+        if logger:
+            logger.info(f"Waiting for Bronze -> Silver writers {sorted(set(others))}")
+        time.sleep(poll_seconds * (1 + random.random()))
+
+
+def release_lease(s3_client, bucket, key):
+    s3_client.delete_object(Bucket=bucket, Key=key)
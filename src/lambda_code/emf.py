@@ -0,0 +1,64 @@
+import json
+import time
+from contextlib import contextmanager
+
+# CloudWatch Embedded Metric Format: one structured log line per flush that
+# CloudWatch turns into metrics, no PutMetricData calls on the hot path.
+
+MAX_VALUES_PER_METRIC = 100  # EMF limit for a value array in one document
+
+
+class MetricsLogger:
+    def __init__(self, namespace, dimensions, enabled=True):
+        self.namespace = namespace
+        self.dimensions = dimensions
+        self.enabled = enabled
+        self._metrics = {}
+
+    def put(self, name, value, unit="Count"):
+        if self.enabled:
+            self._metrics.setdefault(name, (unit, []))[1].append(value)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put(name, (time.perf_counter() - start) * 1000.0, "Milliseconds")
+
+    def _document(self, metrics, timestamp_ms):
+        document = {
+            "_aws": {
+                "Timestamp": timestamp_ms,
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [list(self.dimensions)],
+                        "Metrics": [
+                            {"Name": name, "Unit": unit}
+                            for name, (unit, _) in metrics.items()
+                        ],
+                    }
+                ],
+            }
+        }
+        document.update(self.dimensions)
+        for name, (_, values) in metrics.items():
+            document[name] = values[0] if len(values) == 1 else values
+        return document
+
+    def flush(self):
+        if not self._metrics:
+            return
+        timestamp_ms = int(time.time() * 1000)
+        # Value arrays (histograms) longer than the EMF limit span several lines
+        longest = max(len(values) for _, values in self._metrics.values())
+        for offset in range(0, longest, MAX_VALUES_PER_METRIC):
+            chunk = {
+                name: (unit, values[offset : offset + MAX_VALUES_PER_METRIC])
+                for name, (unit, values) in self._metrics.items()
+                if values[offset : offset + MAX_VALUES_PER_METRIC]
+            }
+            print(json.dumps(self._document(chunk, timestamp_ms)), flush=True)
+        self._metrics = {}
@@ -0,0 +1,698 @@
+import bz2
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+
+from layer_stats import read_layer_stats, record_batch_rows
+from partition_commit import (
+    BATCH_FILE_PREFIX,
+    batch_id_for,
+    read_compacted_batches,
+    record_changed_partitions,
+)
+from s3_listing import iter_objects
+from writer_lease import acquire_lease, release_lease
+
+# Small-object fast path: the Bronze -> Silver rules of
+# glue_scripts/silver_transforms.py (silver_columns, cast_data_types,
+# validation_rules, add_enrichment_fields, in-batch event_id dedup) in plain
+# Python, written straight into the partitioned silver layout. Parquet output
+# needs pyarrow, which comes from a Lambda layer; without it the trigger routes
+# to Glue.
+#
+# Like the Glue job, an object is checked against and added to the event_id
+# dedup index and the processed-file manifest. Both writers hold the lease of
+# glue_scripts/writer_lease.py meanwhile, so neither works on bronze while the
+# other does; an object that cannot get the lease goes to Glue. That module,
+# partition_commit.py, layer_stats.py and s3_listing.py are packaged with the
+# Lambda code (terraform/modules/lambda).
+
+logger = logging.getLogger()
+
+VALID_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"}
+
+# silver_transforms.BRONZE_SCHEMA field order and REQUIRED_FIELDS, the default
+# silver allowlist; bronze fields outside the allowlist are not carried over
+BRONZE_FIELDS = [
+    "event_id",
+    "event_ts",
+    "session_id",
+    "client_ip",
+    "method",
+    "path",
+    "status",
+    "bytes_sent",
+    "response_time_ms",
+    "referrer",
+    "user_agent",
+    "user_id",
+    "cache_status",
+    "cdn_edge",
+    "db_query_time_ms",
+    "request_id",
+    "log_level",
+    "log_message",
+    "server_name",
+    "datacenter",
+    "request_headers",
+    "response_headers",
+]
+
+REQUIRED_FIELDS = [
+    "event_id",
+    "event_ts",
+    "client_ip",
+    "method",
+    "path",
+    "status",
+    "bytes_sent",
+    "response_time_ms",
+    "user_id",
+]
+
+# silver_transforms.enrichment_columns, without the partition columns
+ENRICHMENT_FIELDS = [
+    "processing_timestamp",
+    "is_client_error",
+    "is_server_error",
+    "is_success",
+    "is_redirect",
+    "is_slow",
+    "is_fast",
+    "is_large_response",
+    "is_small_response",
+    "event_date",
+    "user_session",
+    "session_date",
+    "session_hour",
+]
+
+INT32_MIN = -(2**31)
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+# Silver column types as written by the Glue job; anything else is a string
+SILVER_TYPES = {
+    "status": "int32",
+    "bytes_sent": "int64",
+    "response_time_ms": "int32",
+    "db_query_time_ms": "int32",
+    "processing_timestamp": "timestamp",
+    "is_client_error": "int32",
+    "is_server_error": "int32",
+    "is_success": "int32",
+    "is_redirect": "int32",
+    "is_slow": "int32",
+    "is_fast": "int32",
+    "is_large_response": "int32",
+    "is_small_response": "int32",
+    "event_date": "date",
+    "user_session": "string",
+    "session_date": "date",
+    "session_hour": "int32",
+}
+
+PARTITION_COLUMNS = ("year", "month", "day")
+
+# Entries here are folded into the Bronze -> Silver processed-file manifest,
+# so the Glue job does not pick the same object up again
+MANIFEST_INBOX_PREFIX = "_manifests/bronze_silver/external/"
+# The manifest shards the Glue job commits, one per logs_YYYYMMDD day
+MANIFEST_SHARD_PREFIX = "_manifests/bronze_silver/days/"
+BRONZE_FILE_PREFIX = "bronze/logs_"
+# The fast path backs off quickly: objects it cannot take go to Glue
+LEASE_POLL_SECONDS = 0.5
+# event_id dedup index of the Glue job: event_date partitions of
+# (event_id_hash, event_id), the hash being Spark's xxhash64 with its seed
+DEDUP_INDEX_PREFIX = "_dedup/event_ids/"
+XXHASH64_SEED = 42
+
+MASK64 = (1 << 64) - 1
+PRIME64_1 = 0x9E3779B185EBCA87
+PRIME64_2 = 0xC2B2AE3D27D4EB4F
+PRIME64_3 = 0x165667B19E3779F9
+PRIME64_4 = 0x85EBCA77C2B2AE63
+PRIME64_5 = 0x27D4EB2F165667C5
+
+
+def is_available():
+    # pyarrow itself is only imported once an object is written
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def silver_columns(spec="default"):
+    # silver_transforms.silver_columns: "default", "all" or an allowlist
+    if spec == "all":
+        return list(BRONZE_FIELDS)
+    names = set(REQUIRED_FIELDS)
+    if spec != "default":
+        names.update(name.strip() for name in spec.split(",") if name.strip())
+    unknown = names - set(BRONZE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown silver columns: {sorted(unknown)}")
+    return [name for name in BRONZE_FIELDS if name in names]
+
+
+def silver_file_columns(columns):
+    # Columns of a silver file, in the order the Glue job writes them
+    return [name for name in columns if name != "client_ip"] + ENRICHMENT_FIELDS
+
+
+def _read_long(value):
+    # The JSON reader's declared LongType: integer literals only; decimals,
+    # strings and out-of-range numbers are null
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value if INT64_MIN <= value <= INT64_MAX else None
+
+
+def _long_to_int(value):
+    # cast("int") of a long, which keeps the low 32 bits (ANSI mode off)
+    if value is None:
+        return None
+    return (value - INT32_MIN) % 2**32 + INT32_MIN
+
+
+def _parse_ts(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        # Glue sessions run in UTC
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _flag(condition):
+    return 1 if condition else 0
+
+
+def cast_record(record, columns):
+    # The bronze read schema pruned to columns, then cast_data_types
+    record = {name: record.get(name) for name in columns}
+
+    record["status"] = _long_to_int(_read_long(record["status"]))
+    record["bytes_sent"] = _read_long(record["bytes_sent"])
+    record["response_time_ms"] = _long_to_int(_read_long(record["response_time_ms"]))
+    if "db_query_time_ms" in record:
+        record["db_query_time_ms"] = _long_to_int(
+            _read_long(record["db_query_time_ms"])
+        )
+    if "referrer" in record and record["referrer"] is None:
+        record["referrer"] = "direct"
+    return record
+
+
+def is_valid(record):
+    # validation_rules, in the same order
+    status = record["status"]
+    response_time_ms = record["response_time_ms"]
+    bytes_sent = record["bytes_sent"]
+    path = record["path"]
+    client_ip = record.get("client_ip")
+
+    return (
+        status is not None
+        and 100 <= status <= 599
+        and record["method"] in VALID_METHODS
+        and response_time_ms is not None
+        and 0 < response_time_ms <= 30000
+        and bytes_sent is not None
+        and 0 <= bytes_sent <= 10000000
+        and record["event_ts"] is not None
+        and path not in (None, "", "//")
+        and client_ip not in (None, "")
+    )
+
+
+def enrich_record(record, processing_time):
+    # processing_timestamp + add_enrichment_fields
+    status = record["status"]
+    response_time_ms = record["response_time_ms"]
+    bytes_sent = record["bytes_sent"]
+    event_dt = _parse_ts(record["event_ts"])
+    event_date = event_dt.date() if event_dt else None
+
+    record["processing_timestamp"] = processing_time
+    record["is_client_error"] = _flag(400 <= status <= 499)
+    record["is_server_error"] = _flag(500 <= status <= 599)
+    record["is_success"] = _flag(200 <= status <= 299)
+    record["is_redirect"] = _flag(300 <= status <= 399)
+    record["is_slow"] = _flag(response_time_ms > 1000)
+    record["is_fast"] = _flag(response_time_ms < 100)
+    record["is_large_response"] = _flag(bytes_sent > 100000)
+    record["is_small_response"] = _flag(bytes_sent < 1000)
+    record["event_date"] = event_date
+    record["year"] = event_date.year if event_date else None
+    record["month"] = event_date.month if event_date else None
+    record["day"] = event_date.day if event_date else None
+    user_id = "anonymous" if record["user_id"] is None else record["user_id"]
+    record["user_session"] = (
+        f"{user_id}_{event_dt.strftime('%Y-%m-%d-%H')}" if event_dt else None
+    )
+    record["session_date"] = event_date
+    record["session_hour"] = event_dt.hour if event_dt else None
+    return record
+
+
+def transform_lines(lines, processing_time, columns=None):
+    # Returns (silver rows, {"records_in", "rejected", "duplicates"}), where
+    # duplicates are valid records whose event_id came earlier in lines;
+    # columns: the silver allowlist
+    columns = columns or silver_columns()
+    rows = []
+    seen_event_ids = set()
+    counts = {"records_in": 0, "rejected": 0, "duplicates": 0}
+
+    for line in lines:
+        if not line.strip():
+            continue
+        counts["records_in"] += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        # Lines that are not JSON objects are read as all-null rows
+        record = cast_record(record if isinstance(record, dict) else {}, columns)
+        if not is_valid(record):
+            counts["rejected"] += 1
+            continue
+
+        # Deduplication (the null event_id counts as one key, like dropDuplicates)
+        if record["event_id"] in seen_event_ids:
+            counts["duplicates"] += 1
+            continue
+        seen_event_ids.add(record["event_id"])
+
+        # PII removal
+        record.pop("client_ip", None)
+
+        rows.append(enrich_record(record, processing_time))
+
+    return rows, counts
+
+
+def _partition_path(row):
+    return "/".join(
+        f"{column}="
+        + ("__HIVE_DEFAULT_PARTITION__" if row[column] is None else str(row[column]))
+        for column in PARTITION_COLUMNS
+    )
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    arrow_types = {
+        "int32": pa.int32(),
+        "int64": pa.int64(),
+        "string": pa.string(),
+        "date": pa.date32(),
+        # Naive UTC values, stored as UTC instants like Spark timestamps
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema(
+        [
+            pa.field(name, arrow_types[SILVER_TYPES.get(name, "string")])
+            for name in columns
+        ]
+    )
+
+
+def _stringify(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def to_parquet_bytes(rows, columns):
+    # columns: the silver file columns
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    string_columns = [f.name for f in schema if pa.types.is_string(f.type)]
+    columns = {}
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if field.name in string_columns:
+            values = [_stringify(value) for value in values]
+        columns[field.name] = values
+
+    buffer = io.BytesIO()
+    pq.write_table(
+        pa.Table.from_pydict(columns, schema=schema), buffer, compression="snappy"
+    )
+    return buffer.getvalue()
+
+
+def _inbox_key(key):
+    return f"{MANIFEST_INBOX_PREFIX}{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+
+def record_processed(s3_client, bucket, key, etag, size):
+    entry = {
+        "key": key,
+        "etag": etag.strip('"'),
+        "size": size,
+        "run_id": "lambda-fast-path",
+        "processed_at": datetime.utcnow().isoformat(),
+    }
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=_inbox_key(key),
+        Body=json.dumps(entry).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def _read_json(s3_client, bucket, key):
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(body)
+
+
+def _manifest_day(key):
+    # bronze_silver.manifest_day
+    day = key[len(BRONZE_FILE_PREFIX) :][:8]
+    if key.startswith(BRONZE_FILE_PREFIX) and len(day) == 8 and day.isdigit():
+        return day
+    return "other"
+
+
+def already_processed(s3_client, bucket, key, etag):
+    # By an earlier attempt (inbox entry) or by the Glue job (manifest shard)
+    entry = _read_json(s3_client, bucket, _inbox_key(key))
+    if entry and entry["etag"] == etag:
+        return True
+    shard = _read_json(
+        s3_client, bucket, f"{MANIFEST_SHARD_PREFIX}{_manifest_day(key)}.json"
+    )
+    return bool(shard) and shard["files"].get(key, {}).get("etag") == etag
+
+
+def _rotl64(value, bits):
+    return ((value << bits) | (value >> (64 - bits))) & MASK64
+
+
+def _xxh64_round(acc, lane):
+    return _rotl64((acc + lane * PRIME64_2) & MASK64, 31) * PRIME64_1 & MASK64
+
+
+def _xxh64(data, seed):
+    # XXH64 of bytes as a signed 64-bit integer, as Spark returns it
+    length = len(data)
+    offset = 0
+    if length >= 32:
+        lanes = [
+            (seed + PRIME64_1 + PRIME64_2) & MASK64,
+            (seed + PRIME64_2) & MASK64,
+            seed & MASK64,
+            (seed - PRIME64_1) & MASK64,
+        ]
+        while offset + 32 <= length:
+            for i in range(4):
+                lane = struct.unpack_from("<Q", data, offset + 8 * i)[0]
+                lanes[i] = _xxh64_round(lanes[i], lane)
+            offset += 32
+        digest = (
+            _rotl64(lanes[0], 1)
+            + _rotl64(lanes[1], 7)
+            + _rotl64(lanes[2], 12)
+            + _rotl64(lanes[3], 18)
+        ) & MASK64
+        for lane in lanes:
+            digest = ((digest ^ _xxh64_round(0, lane)) * PRIME64_1 + PRIME64_4) & MASK64
+    else:
+        digest = (seed + PRIME64_5) & MASK64
+
+    digest = (digest + length) & MASK64
+    while offset + 8 <= length:
+        lane = struct.unpack_from("<Q", data, offset)[0]
+        digest ^= _xxh64_round(0, lane)
+        digest = (_rotl64(digest, 27) * PRIME64_1 + PRIME64_4) & MASK64
+        offset += 8
+    if offset + 4 <= length:
+        digest ^= struct.unpack_from("<I", data, offset)[0] * PRIME64_1 & MASK64
+        digest = (_rotl64(digest, 23) * PRIME64_2 + PRIME64_3) & MASK64
+        offset += 4
+    while offset < length:
+        digest ^= data[offset] * PRIME64_5 & MASK64
+        digest = _rotl64(digest, 11) * PRIME64_1 & MASK64
+        offset += 1
+
+    digest ^= digest >> 33
+    digest = digest * PRIME64_2 & MASK64
+    digest ^= digest >> 29
+    digest = digest * PRIME64_3 & MASK64
+    digest ^= digest >> 32
+    return digest - (1 << 64) if digest >= 1 << 63 else digest
+
+
+def xxhash64(value):
+    # Spark's xxhash64 of a string column
+    return _xxh64(value.encode("utf-8"), XXHASH64_SEED)
+
+
+def _indexed_rows(rows):
+    # event_date -> {event_id_hash: event_id} of the rows the index covers
+    by_date = {}
+    for row in rows:
+        if row["event_id"] is not None and row["event_date"] is not None:
+            by_date.setdefault(row["event_date"], {})[xxhash64(row["event_id"])] = row[
+                "event_id"
+            ]
+    return by_date
+
+
+def previously_seen(s3_client, bucket, rows, batch_id, today):
+    # (event_date, event_id) of rows in the dedup index of the last
+    # DEDUP_WINDOW_DAYS, as drop_previously_seen finds them in the Glue job.
+    # Index files of this batch (an earlier attempt) do not count.
+    import pyarrow.parquet as pq
+
+    window_days = int(os.environ.get("DEDUP_WINDOW_DAYS", "7"))
+    max_bytes = int(os.environ.get("FAST_PATH_MAX_INDEX_BYTES", str(64 * 1024 * 1024)))
+    if window_days <= 0:
+        return set()
+
+    first_date = today - timedelta(days=window_days)
+    by_date = {
+        event_date: ids
+        for event_date, ids in _indexed_rows(rows).items()
+        if event_date >= first_date
+    }
+
+    index_files = []
+    for event_date in sorted(by_date):
+        directory = f"{DEDUP_INDEX_PREFIX}event_date={event_date}/"
+        for obj in iter_objects(s3_client, bucket, directory):
+            name = obj["Key"][len(directory) :]
+            if (
+                name.endswith(".parquet")
+                and not name.startswith(("_", "."))
+                and "/" not in name
+                and not name.startswith(f"{BATCH_FILE_PREFIX}{batch_id}-")
+            ):
+                index_files.append((event_date, obj))
+    index_bytes = sum(obj["Size"] for _, obj in index_files)
+    if index_bytes > max_bytes:
+        raise RuntimeError(
+            f"Dedup index of {index_bytes:,} bytes is too large for the fast path"
+        )
+
+    seen = set()
+    for event_date, obj in index_files:
+        ids = by_date[event_date]
+        body = s3_client.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()
+        matches = pq.read_table(
+            io.BytesIO(body),
+            columns=["event_id"],
+            filters=[("event_id_hash", "in", list(ids))],
+        )
+        # Hash hits are confirmed against the exact ids
+        wanted = set(ids.values())
+        seen.update(
+            (event_date, event_id)
+            for event_id in matches.column("event_id").to_pylist()
+            if event_id in wanted
+        )
+    return seen
+
+
+def write_dedup_index(s3_client, bucket, rows, batch_id):
+    # update_dedup_index: one file per event_date, sorted by hash
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    for event_date, ids in sorted(_indexed_rows(rows).items()):
+        hashes = sorted(ids)
+        table = pa.table(
+            {
+                "event_id_hash": pa.array(hashes, pa.int64()),
+                "event_id": pa.array([ids[h] for h in hashes], pa.string()),
+            }
+        )
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, compression="snappy")
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=_dedup_index_key(event_date, batch_id),
+            Body=buffer.getvalue(),
+        )
+
+
+def _dedup_index_key(event_date, batch_id):
+    return (
+        f"{DEDUP_INDEX_PREFIX}event_date={event_date}/"
+        f"{BATCH_FILE_PREFIX}{batch_id}-00000.snappy.parquet"
+    )
+
+
+def record_silver_rows(s3_client, bucket, batch_id, rows):
+    # Without a stats file there is no total to add to; the next Glue run
+    # recounts the table
+    if read_layer_stats(s3_client, bucket, "silver") is None:
+        return None
+    return record_batch_rows(s3_client, bucket, "silver", batch_id, rows)
+
+
+def _delete_keys(s3_client, bucket, keys):
+    for key in keys:
+        s3_client.delete_object(Bucket=bucket, Key=key)
+
+
+def decode_body(key, body):
+    # NDJSON as stored in bronze; zstd objects are left to the Glue job
+    if key.endswith(".gz"):
+        body = gzip.decompress(body)
+    elif key.endswith(".bz2"):
+        body = bz2.decompress(body)
+    elif not key.endswith(".json"):
+        raise ValueError(f"Unsupported bronze object: {key}")
+    return body.decode("utf-8")
+
+
+def process_object(s3_client, bucket, key, silver_prefix="silver/"):
+    # Raises when another Bronze -> Silver writer is running: Glue takes the key
+    lease_key = acquire_lease(
+        s3_client,
+        bucket,
+        "fastpath",
+        int(os.environ.get("FAST_PATH_LEASE_SECONDS", "300")),
+        int(os.environ.get("FAST_PATH_LEASE_WAIT_SECONDS", "5")),
+        poll_seconds=LEASE_POLL_SECONDS,
+    )
+    try:
+        return _process_object(s3_client, bucket, key, silver_prefix)
+    finally:
+        release_lease(s3_client, bucket, lease_key)
+
+
+def _process_object(s3_client, bucket, key, silver_prefix):
+    processing_time = datetime.utcnow()
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    etag = response["ETag"].strip('"')
+    if already_processed(s3_client, bucket, key, etag):
+        logger.info("Fast path: %s was already processed", key)
+        return {
+            "key": key,
+            "records_in": 0,
+            "records_out": 0,
+            "rejected": 0,
+            "duplicates": 0,
+            "files": [],
+        }
+
+    # Same object version, same batch id, as in the Glue job
+    batch_id = batch_id_for("fastpath", key, etag)
+    body = response["Body"].read()
+    # The Glue job's silver_columns allowlist
+    columns = silver_columns(os.environ.get("SILVER_COLUMNS", "default"))
+    rows, counts = transform_lines(
+        decode_body(key, body).splitlines(), processing_time, columns
+    )
+    batch_unique = len(rows)
+
+    # Cross-run dedup against the event_id index
+    seen = previously_seen(s3_client, bucket, rows, batch_id, processing_time.date())
+    rows = [row for row in rows if (row["event_date"], row["event_id"]) not in seen]
+
+    partitions = {}
+    for row in rows:
+        partitions.setdefault(_partition_path(row), []).append(row)
+    # A compaction folded the files of an earlier attempt in: the rows are there
+    for partition in list(partitions):
+        directory = f"{silver_prefix}{partition}"
+        if batch_id in read_compacted_batches(s3_client, bucket, directory):
+            del partitions[partition]
+
+    # Named by batch id, like the Glue job's committed files, so a retry
+    # overwrites the files of the attempt before it
+    files = [
+        f"{silver_prefix}{partition}/{BATCH_FILE_PREFIX}{batch_id}-00000.snappy.parquet"
+        for partition in sorted(partitions)
+    ]
+    try:
+        for partition, silver_key in zip(sorted(partitions), files):
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=silver_key,
+                Body=to_parquet_bytes(
+                    partitions[partition], silver_file_columns(columns)
+                ),
+            )
+
+        # Log the partitions for Silver -> Gold and index the written event_ids
+        if partitions:
+            record_changed_partitions(
+                s3_client, bucket, "silver", batch_id, partitions, processing_time
+            )
+        write_dedup_index(s3_client, bucket, rows, batch_id)
+    except Exception:
+        # The object goes to Glue, which would add the rows of silver files
+        # left here a second time, or drop rows already indexed as seen
+        _delete_keys(
+            s3_client,
+            bucket,
+            files
+            + [_dedup_index_key(d, batch_id) for d in sorted(_indexed_rows(rows))],
+        )
+        raise
+
+    # Then count the rows into the silver total and mark the object processed
+    if rows:
+        record_silver_rows(s3_client, bucket, batch_id, len(rows))
+    record_processed(s3_client, bucket, key, etag, len(body))
+
+    logger.info(
+        "Fast path: %s -> %d partitions, %d -> %d records "
+        "(%d rejected, %d duplicates in the object, %d seen in earlier runs)",
+        key,
+        len(files),
+        counts["records_in"],
+        len(rows),
+        counts["rejected"],
+        counts["duplicates"],
+        batch_unique - len(rows),
+    )
+    return {
+        "key": key,
+        "records_in": counts["records_in"],
+        "records_out": len(rows),
+        "rejected": counts["rejected"],
+        "duplicates": counts["duplicates"],
+        "files": files,
+    }
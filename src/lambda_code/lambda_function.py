@@ -1,12 +1,40 @@
+import hashlib
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime
+from urllib.parse import unquote_plus
 
-import boto3
+from emf import MetricsLogger
 
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+
+DATA_LAYERS = ("bronze", "silver", "gold")
+
+DEFAULT_METRICS_NAMESPACE = "ServerlessDataPipeline/Trigger"
+
+# Coalescing mode releases a batch once its window or byte threshold is reached
+DEFAULT_COALESCE_MAX_BYTES = 128 * 1024 * 1024
+
+# Redelivered S3 events are suppressed for this long after the first delivery
+DEFAULT_DEDUPE_TTL_SECONDS = 3600
+MAX_SEEN_EVENTS = 10000
+
+# Concurrent messages per SQS batch in sqs_handler
+DEFAULT_SQS_MAX_WORKERS = "8"
+
+# boto3 clients cached across warm invocations, created on first use
+_CLIENTS = {}
+_CLIENT_LOCK = threading.RLock()
+_STATE_STORE = None
+
+# Warm-container dedupe cache: event token -> expiry (epoch seconds)
+_SEEN_EVENTS = {}
+_SEEN_LOCK = threading.Lock()
 
 
 def _json_safe(obj):
@@ -16,31 +44,78 @@ def _json_safe(obj):
     raise TypeError(f"Type not serializable: {type(obj).__name__}")
 
 
-def lambda_handler(event, context):
+def _get_client(service_name):
+    client = _CLIENTS.get(service_name)
+    if client is None:
+        with _CLIENT_LOCK:
+            client = _CLIENTS.get(service_name)
+            if client is None:
+                # Deferred so cold starts and rejected events skip the boto3 import
+                import boto3
+
+                client = boto3.client(service_name)
+                _CLIENTS[service_name] = client
+    return client
+
+
+def _new_metrics(trigger_mode):
+    return MetricsLogger(
+        os.environ.get("METRICS_NAMESPACE", DEFAULT_METRICS_NAMESPACE),
+        {
+            "Environment": os.environ.get("ENVIRONMENT", "unknown"),
+            "TriggerMode": trigger_mode,
+        },
+        enabled=os.environ.get("METRICS_ENABLED", "true").lower() == "true",
+    )
+
+
+def _event_lag_ms(event_time, now):
+    # S3 eventTime looks like 2025-01-01T12:00:00.123Z
     try:
-        logger.info("DATA PIPELINE TRIGGER STARTED")
-        logger.info("Event: %s", json.dumps(event))
+        event_dt = datetime.strptime(event_time, "%Y-%m-%dT%H:%M:%S.%fZ")
+    except (TypeError, ValueError):
+        try:
+            event_dt = datetime.strptime(event_time, "%Y-%m-%dT%H:%M:%SZ")
+        except (TypeError, ValueError):
+            return None
+    return (now - event_dt).total_seconds() * 1000.0
 
-        # apt Validation
-        if not event or "Records" not in event:
-            logger.error("Invalid event structure: missing Records")
-            return {"statusCode": 400, "body": "Invalid event structure"}
 
-        # Extract S3
-        s3_record = event["Records"][0]
-        s3_bucket = s3_record["s3"]["bucket"]["name"]
-        s3_key = s3_record["s3"]["object"]["key"]
-        s3_size = s3_record["s3"]["object"].get("size", 0)
-
-        # Data layer
-        if s3_key.startswith("bronze/"):
-            data_layer = "bronze"
-        elif s3_key.startswith("silver/"):
-            data_layer = "silver"
-        elif s3_key.startswith("gold/"):
-            data_layer = "gold"
-        else:
-            data_layer = "unknown"
+def _data_layer(key):
+    for layer in DATA_LAYERS:
+        if key.startswith(f"{layer}/"):
+            return layer
+    return "unknown"
+
+
+def _collect_batches(records, metrics):
+    # Group every S3 record of the event by (bucket, data layer)
+    batches = {}
+    received_at = datetime.utcnow()
+    for record in records:
+        s3_info = record.get("s3") if isinstance(record, dict) else None
+        if not s3_info:
+            logger.warning("Skipping non-S3 record: %s", record)
+            continue
+
+        try:
+            s3_bucket = s3_info["bucket"]["name"]
+            # S3 URL-encodes object keys in event notifications
+            s3_key = unquote_plus(s3_info["object"]["key"])
+            s3_size = int(s3_info["object"].get("size", 0))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warning("Skipping malformed S3 record: %s", e)
+            continue
+        data_layer = _data_layer(s3_key)
+        # Redeliveries of the same event share ETag and sequencer
+        event_token = "|".join(
+            [
+                s3_bucket,
+                s3_key,
+                s3_info["object"].get("eTag", ""),
+                s3_info["object"].get("sequencer", ""),
+            ]
+        )
 
         logger.info(
             "S3 Event: bucket=%s, key=%s, size=%s, layer=%s",
@@ -49,56 +124,549 @@ def lambda_handler(event, context):
             s3_size,
             data_layer,
         )
+        metrics.put("ObjectSize", s3_size, "Bytes")
+        lag_ms = _event_lag_ms(record.get("eventTime"), received_at)
+        if lag_ms is not None:
+            metrics.put("TriggerLag", lag_ms, "Milliseconds")
+
+        batch = batches.setdefault(
+            (s3_bucket, data_layer),
+            {"keys": [], "sizes": [], "tokens": [], "total_bytes": 0},
+        )
+        if event_token in batch["tokens"]:
+            continue
+        batch["keys"].append(s3_key)
+        batch["sizes"].append(s3_size)
+        batch["tokens"].append(event_token)
+        batch["total_bytes"] += s3_size
+
+    return batches
+
+
+def _dedupe_settings():
+    return {
+        "ttl_seconds": float(
+            os.environ.get("DEDUPE_TTL_SECONDS", str(DEFAULT_DEDUPE_TTL_SECONDS))
+        ),
+        # Shared store catches redeliveries that land on a different container
+        "shared": os.environ.get("DEDUPE_STATE_ENABLED", "false").lower() == "true",
+    }
+
+
+def _mark_seen(token, settings, now):
+    with _SEEN_LOCK:
+        expires_at = _SEEN_EVENTS.get(token)
+        if expires_at is not None and expires_at > now:
+            return False
+        _SEEN_EVENTS[token] = now + settings["ttl_seconds"]
+        if len(_SEEN_EVENTS) > MAX_SEEN_EVENTS:
+            for stale in [t for t, exp in _SEEN_EVENTS.items() if exp <= now]:
+                del _SEEN_EVENTS[stale]
+
+    if settings["shared"] and not _get_state_store().mark_seen(
+        token, settings["ttl_seconds"], now
+    ):
+        return False
+    return True
+
 
-        # State machine ARN
-        state_machine_arn = os.environ.get("STATE_MACHINE_ARN")
-        if not state_machine_arn:
-            logger.error("STATE_MACHINE_ARN environment variable not set")
-            return {"statusCode": 500, "body": "Missing environment variable"}
+def _release_seen(tokens, settings):
+    # Forget tokens of a batch that was not handed on, so a redelivery of the
+    # event (the SQS retry of its message) is processed instead of suppressed.
+    # A direct S3 invocation is not retried: lambda_handler returns the 500.
+    with _SEEN_LOCK:
+        for token in tokens:
+            _SEEN_EVENTS.pop(token, None)
+    if settings["shared"]:
+        store = _get_state_store()
+        for token in tokens:
+            store.release_seen(token)
 
-        logger.info("Step Functions ARN: %s", state_machine_arn)
 
+def _drop_duplicates(batches, settings, now):
+    fresh = {}
+    duplicates = []
+    for batch_key, batch in batches.items():
+        kept = {"keys": [], "sizes": [], "tokens": [], "total_bytes": 0}
+        for key, size, token in zip(batch["keys"], batch["sizes"], batch["tokens"]):
+            if not _mark_seen(token, settings, now):
+                logger.info("Duplicate S3 event suppressed: %s", key)
+                duplicates.append(key)
+                continue
+            kept["keys"].append(key)
+            kept["sizes"].append(size)
+            kept["tokens"].append(token)
+            kept["total_bytes"] += size
+        if kept["keys"]:
+            fresh[batch_key] = kept
+    return fresh, duplicates
+
+
+def _route_small_files(batches, max_bytes):
+    # Bronze objects up to max_bytes are transformed here instead of in Glue
+    import fast_path
+
+    if not fast_path.is_available():
+        logger.warning("pyarrow not available, small-file fast path disabled")
+        return batches, []
+
+    s3_client = _get_client("s3")
+    routed = {}
+    results = []
+    for (s3_bucket, data_layer), batch in batches.items():
+        if data_layer != "bronze":
+            routed[(s3_bucket, data_layer)] = batch
+            continue
+
+        kept = {"keys": [], "sizes": [], "tokens": [], "total_bytes": 0}
+        for key, size, token in zip(batch["keys"], batch["sizes"], batch["tokens"]):
+            if size <= max_bytes:
+                try:
+                    results.append(fast_path.process_object(s3_client, s3_bucket, key))
+                    continue
+                except Exception as e:
+                    logger.warning("Fast path failed for %s, using Glue: %s", key, e)
+            kept["keys"].append(key)
+            kept["sizes"].append(size)
+            kept["tokens"].append(token)
+            kept["total_bytes"] += size
+        if kept["keys"]:
+            routed[(s3_bucket, data_layer)] = kept
+
+    return routed, results
+
+
+def _execution_name(data_layer, batch):
+    # Deterministic per batch, so a retried start maps onto the same execution
+    parts = batch.get("tokens") or sorted(batch["keys"])
+    digest = hashlib.sha256("\n".join(parts).encode("utf-8"))
+    if "first_seen" in batch:
+        digest.update(repr(batch["first_seen"]).encode("utf-8"))
+    return f"pipeline-{data_layer}-{digest.hexdigest()[:40]}"
+
+
+def _is_already_started(error):
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code == "ExecutionAlreadyExists"
+
+
+def _build_execution_input(s3_bucket, data_layer, batch):
+    manifest = {
+        "keys": batch["keys"],
+        "object_count": len(batch["keys"]),
+        "total_bytes": batch["total_bytes"],
+    }
+    if "first_seen" in batch:
+        # Batch was released by the coalescing window
+        manifest["window_start"] = datetime.utcfromtimestamp(
+            batch["first_seen"]
+        ).isoformat()
+
+    return {
+        "bucket": s3_bucket,
+        # First key/total size keep the state machine context fields populated
+        "key": batch["keys"][0],
+        "size": batch["total_bytes"],
+        "data_layer": data_layer,
+        "manifest": manifest,
+        "trigger_time": datetime.utcnow().isoformat(),
+        "environment": os.environ.get("ENVIRONMENT", "unknown"),
+    }
+
+
+def _coalesce_settings():
+    return {
+        "enabled": os.environ.get("COALESCE_ENABLED", "false").lower() == "true",
+        "window_seconds": float(os.environ.get("COALESCE_WINDOW_SECONDS", "60")),
+        "max_bytes": int(
+            os.environ.get("COALESCE_MAX_BYTES", str(DEFAULT_COALESCE_MAX_BYTES))
+        ),
+    }
+
+
+def _get_state_store():
+    global _STATE_STORE
+    if _STATE_STORE is None:
+        with _CLIENT_LOCK:
+            if _STATE_STORE is None:
+                from trigger_state import build_state_store
+
+                _STATE_STORE = build_state_store(
+                    os.environ.get("TRIGGER_STATE_BACKEND", "dynamodb"), _get_client
+                )
+    return _STATE_STORE
+
+
+def _window_closed(state, settings, now):
+    return (
+        now - state["first_seen"] >= settings["window_seconds"]
+        or state["total_bytes"] >= settings["max_bytes"]
+    )
+
+
+def _coalesce_batches(store, batches, settings, now):
+    # Record keys as pending and only release batches whose window has closed
+    ready = {}
+    pending = []
+    for (s3_bucket, data_layer), batch in batches.items():
+        state = store.add_pending(
+            s3_bucket, data_layer, batch["keys"], batch["total_bytes"], now
+        )
+        if _window_closed(state, settings, now):
+            claimed = store.claim(s3_bucket, data_layer)
+            if claimed:
+                ready[(s3_bucket, data_layer)] = claimed
+            continue
+
+        logger.info(
+            "Coalescing %s/%s: %d keys, %d bytes pending",
+            s3_bucket,
+            data_layer,
+            len(state["keys"]),
+            state["total_bytes"],
+        )
+        pending.append(
+            {
+                "bucket": s3_bucket,
+                "data_layer": data_layer,
+                "object_count": len(state["keys"]),
+                "total_bytes": state["total_bytes"],
+            }
+        )
+    return ready, pending
+
+
+def _flush_expired(store, settings, now):
+    ready = {}
+    for state in store.pending():
+        if not _window_closed(state, settings, now):
+            continue
+        claimed = store.claim(state["bucket"], state["data_layer"])
+        if claimed:
+            ready[(claimed["bucket"], claimed["data_layer"])] = claimed
+    return ready
+
+
+def _start_executions(state_machine_arn, batches, dedupe_settings, metrics, store=None):
+    sfn = _get_client("stepfunctions")
+    executions = []
+    failures = []
+
+    for (s3_bucket, data_layer), batch in sorted(batches.items()):
         # Prepare execution input
-        execution_input = {
-            "bucket": s3_bucket,
-            "key": s3_key,
-            "size": int(s3_size),
-            "data_layer": data_layer,
-            "trigger_time": datetime.utcnow().isoformat(),
-            "environment": os.environ.get("ENVIRONMENT", "unknown"),
-        }
-        logger.info("Execution input: %s", json.dumps(execution_input))
+        execution_input = _build_execution_input(s3_bucket, data_layer, batch)
+        execution_name = _execution_name(data_layer, batch)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Execution input: %s", json.dumps(execution_input))
 
         # Start execution
-        sfn = boto3.client("stepfunctions")
-        response = sfn.start_execution(
-            stateMachineArn=state_machine_arn,
-            name=f"pipeline-{int(datetime.utcnow().timestamp())}",
-            input=json.dumps(execution_input),
+        try:
+            with metrics.timer("StartExecutionTime"):
+                response = sfn.start_execution(
+                    stateMachineArn=state_machine_arn,
+                    name=execution_name,
+                    input=json.dumps(execution_input),
+                )
+        except Exception as e:
+            if _is_already_started(e):
+                logger.info("Execution %s already exists, skipping", execution_name)
+                executions.append(
+                    {
+                        "execution_name": execution_name,
+                        "bucket": s3_bucket,
+                        "data_layer": data_layer,
+                        "object_count": len(batch["keys"]),
+                        "total_bytes": batch["total_bytes"],
+                        "duplicate": True,
+                    }
+                )
+                continue
+
+            logger.error(
+                "Failed to start execution for %s/%s: %s",
+                s3_bucket,
+                data_layer,
+                str(e),
+            )
+            if "tokens" in batch:
+                _release_seen(batch["tokens"], dedupe_settings)
+            elif store is not None:
+                # Put the claimed keys back so the next window picks them up
+                store.add_pending(
+                    s3_bucket,
+                    data_layer,
+                    batch["keys"],
+                    batch["total_bytes"],
+                    time.time(),
+                )
+            failures.append(
+                {"bucket": s3_bucket, "data_layer": data_layer, "error": str(e)}
+            )
+            continue
+
+        logger.info("Step Functions execution started: %s", execution_name)
+        if logger.isEnabledFor(logging.DEBUG):
+            # Log response safely
+            logger.debug(
+                "Step Functions response: %s",
+                json.dumps(response, default=_json_safe),
+            )
+
+        start_dt = response.get("startDate")  # this is a datetime
+        executions.append(
+            {
+                "execution_arn": response.get("executionArn"),
+                "execution_name": execution_name,
+                "start_date": (
+                    start_dt.isoformat() if isinstance(start_dt, datetime) else None
+                ),
+                "bucket": s3_bucket,
+                "data_layer": data_layer,
+                "object_count": len(batch["keys"]),
+                "total_bytes": batch["total_bytes"],
+                "duplicate": False,
+            }
         )
 
-        # Log response safely
+    return executions, failures
+
+
+def _process_event(event, metrics):
+    settings = _coalesce_settings()
+    dedupe_settings = _dedupe_settings()
+    # EventBridge schedule that releases coalescing windows nobody closed
+    scheduled_flush = bool(event) and event.get("source") == "aws.events"
+
+    # apt Validation
+    if not scheduled_flush and (
+        not event or not isinstance(event.get("Records"), list)
+    ):
+        logger.error("Invalid event structure: missing Records")
+        return {"statusCode": 400, "body": "Invalid event structure"}
+
+    if scheduled_flush:
+        if not settings["enabled"]:
+            logger.info("Coalescing disabled, nothing to flush")
+            return {"statusCode": 200, "body": "Coalescing disabled"}
+        batches = {}
+    else:
+        # Extract S3 records, one batch per bucket and data layer
+        with metrics.timer("EventParseTime"):
+            batches = _collect_batches(event["Records"], metrics)
+        if not batches:
+            logger.error("Invalid event structure: no S3 records")
+            return {"statusCode": 400, "body": "Invalid event structure"}
+
         logger.info(
-            "Step Functions execution started: %s",
-            json.dumps(response, default=_json_safe),
+            "Collected %d S3 records into %d batches",
+            sum(len(b["keys"]) for b in batches.values()),
+            len(batches),
         )
 
-        exec_arn = response.get("executionArn")
-        start_dt = response.get("startDate")  # this is a datetime
-        logger.info("DATA PIPELINE TRIGGER COMPLETED SUCCESSFULLY")
+    # State machine ARN
+    state_machine_arn = os.environ.get("STATE_MACHINE_ARN")
+    if not state_machine_arn:
+        logger.error("STATE_MACHINE_ARN environment variable not set")
+        return {"statusCode": 500, "body": "Missing environment variable"}
+
+    logger.info("Step Functions ARN: %s", state_machine_arn)
+
+    duplicates = []
+    now = time.time()
+    if scheduled_flush:
+        return _dispatch_batches(
+            batches, duplicates, True, state_machine_arn, dedupe_settings, metrics, now
+        )
 
+    batches, duplicates = _drop_duplicates(batches, dedupe_settings, now)
+    metrics.put("DuplicateEvents", len(duplicates))
+    if not batches:
+        logger.info("DATA PIPELINE TRIGGER SKIPPED: duplicate event")
         return {
             "statusCode": 200,
-            "body": "Data pipeline execution started successfully",
-            "execution_arn": exec_arn,
-            "start_date": (
-                start_dt.isoformat() if isinstance(start_dt, datetime) else None
-            ),
+            "body": "Duplicate event ignored",
+            "duplicate": True,
+            "duplicates": duplicates,
+            "executions": [],
+            "pending": [],
+            "fast_path": [],
+        }
+
+    # From here on the tokens are marked seen: any failure has to release them
+    tokens = [token for batch in batches.values() for token in batch["tokens"]]
+    try:
+        return _dispatch_batches(
+            batches, duplicates, False, state_machine_arn, dedupe_settings, metrics, now
+        )
+    except Exception:
+        _release_seen(tokens, dedupe_settings)
+        raise
+
+
+def _dispatch_batches(
+    batches,
+    duplicates,
+    scheduled_flush,
+    state_machine_arn,
+    dedupe_settings,
+    metrics,
+    now,
+):
+    # Fast path, coalescing window and Step Functions starts for the batches
+    settings = _coalesce_settings()
+    store = None
+    pending = []
+    fast_path_results = []
+    if not scheduled_flush:
+        small_file_max_bytes = int(os.environ.get("SMALL_FILE_MAX_BYTES", "0"))
+        if small_file_max_bytes > 0:
+            with metrics.timer("FastPathTime"):
+                batches, fast_path_results = _route_small_files(
+                    batches, small_file_max_bytes
+                )
+            metrics.put("FastPathObjects", len(fast_path_results))
+
+    if settings["enabled"]:
+        store = _get_state_store()
+        if scheduled_flush:
+            batches = _flush_expired(store, settings, now)
+        else:
+            batches, pending = _coalesce_batches(store, batches, settings, now)
+
+    executions, failures = _start_executions(
+        state_machine_arn, batches, dedupe_settings, metrics, store
+    )
+    metrics.put("ExecutionsStarted", len(executions))
+    metrics.put("ExecutionsFailed", len(failures))
+    metrics.put("PendingBatches", len(pending))
+
+    if failures:
+        logger.error("DATA PIPELINE TRIGGER FAILED for %d batches", len(failures))
+        return {
+            "statusCode": 500,
+            "body": f"Failed to start {len(failures)} of {len(batches)} executions",
+            "duplicate": False,
+            "duplicates": duplicates,
+            "executions": executions,
+            "failures": failures,
+            "pending": pending,
+            "fast_path": fast_path_results,
         }
 
+    logger.info("DATA PIPELINE TRIGGER COMPLETED SUCCESSFULLY")
+
+    if executions:
+        body = "Data pipeline execution started successfully"
+    elif pending:
+        body = "No execution started, keys pending in coalescing window"
+    else:
+        body = "Small objects written to silver by the fast path"
+
+    return {
+        "statusCode": 200,
+        "body": body,
+        # Every batch mapped onto an execution that already existed
+        "duplicate": bool(executions)
+        and all(execution["duplicate"] for execution in executions),
+        "duplicates": duplicates,
+        "executions": executions,
+        "pending": pending,
+        "fast_path": fast_path_results,
+    }
+
+
+def lambda_handler(event, context):
+    try:
+        logger.info("DATA PIPELINE TRIGGER STARTED")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Event: %s", json.dumps(event))
+
+        metrics = _new_metrics("s3")
+        try:
+            return _process_event(event, metrics)
+        finally:
+            metrics.flush()
+
     except Exception as e:
         logger.error("ERROR: %s", str(e))
         import traceback
 
         logger.error("Traceback: %s", traceback.format_exc())
         return {"statusCode": 500, "body": f"Error: {str(e)}"}
+
+
+def _parse_sqs_body(record):
+    # The S3 notification in an SQS message, ValueError when it is not one
+    try:
+        body = json.loads(record["body"])
+        # S3 -> SNS -> SQS fan-out wraps the notification once more
+        if isinstance(body, dict) and "Records" not in body and "Message" in body:
+            body = json.loads(body["Message"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"unreadable body: {e}") from e
+    if not isinstance(body, dict):
+        raise ValueError(f"body is a {type(body).__name__}, not an object")
+    return body
+
+
+def _process_sqs_message(record):
+    try:
+        body = _parse_sqs_body(record)
+    except ValueError as e:
+        # Poison message: it would fail the same way on every retry
+        logger.error("Dropping malformed message %s: %s", record["messageId"], e)
+        return {"statusCode": 400, "body": f"Malformed message: {e}"}
+    if body.get("Event") == "s3:TestEvent":
+        logger.info("Skipping S3 test event in message %s", record["messageId"])
+        return {"statusCode": 200, "body": "S3 test event ignored"}
+
+    metrics = _new_metrics("sqs")
+    try:
+        return _process_event(body, metrics)
+    finally:
+        metrics.flush()
+
+
+def sqs_handler(event, context):
+    # S3 notifications delivered through SQS; only failed messages are retried
+    logger.info("SQS PIPELINE TRIGGER STARTED")
+    records = (event or {}).get("Records", [])
+    if not records:
+        return {"batchItemFailures": []}
+
+    # Clients are created up front, boto3 client creation is not thread-safe
+    _get_client("stepfunctions")
+    if _coalesce_settings()["enabled"] or _dedupe_settings()["shared"]:
+        _get_state_store()
+    if int(os.environ.get("SMALL_FILE_MAX_BYTES", "0")) > 0:
+        _get_client("s3")
+
+    max_workers = min(
+        len(records), int(os.environ.get("SQS_MAX_WORKERS", DEFAULT_SQS_MAX_WORKERS))
+    )
+    batch_item_failures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_process_sqs_message, record): record["messageId"]
+            for record in records
+        }
+        for future in as_completed(futures):
+            message_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error("ERROR in message %s: %s", message_id, str(e))
+                result = {"statusCode": 500, "body": f"Error: {str(e)}"}
+
+            # 4xx: malformed bodies and events, acknowledged (logged above) since
+            # they would fail again; 5xx and exceptions are retried
+            if result["statusCode"] >= 500:
+                logger.error("Message %s failed: %s", message_id, result["body"])
+                batch_item_failures.append({"itemIdentifier": message_id})
+
+    logger.info(
+        "SQS PIPELINE TRIGGER COMPLETED: %d messages, %d failed",
+        len(records),
+        len(batch_item_failures),
+    )
+    return {"batchItemFailures": batch_item_failures}
@@ -0,0 +1,227 @@
+import fcntl
+import json
+import os
+import threading
+
+# Pending-key state for the coalescing trigger. Every backend exposes the same
+# three calls: add_pending() records keys for a (bucket, layer) batch and returns
+# the accumulated state, claim() atomically removes and returns it, pending()
+# lists every open batch so a scheduled invocation can flush expired windows.
+# mark_seen()/release_seen() back the duplicate-event cache with a TTL.
+
+PENDING_PREFIX = "pending#"
+SEEN_PREFIX = "seen#"
+
+
+def _batch_id(bucket, data_layer):
+    return f"{PENDING_PREFIX}{bucket}#{data_layer}"
+
+
+def _merge_pending(state, bucket, data_layer, keys, total_bytes, now):
+    if state is None:
+        state = {
+            "bucket": bucket,
+            "data_layer": data_layer,
+            "keys": [],
+            "total_bytes": 0,
+            "first_seen": now,
+        }
+    known = set(state["keys"])
+    state["keys"].extend(key for key in keys if key not in known)
+    state["total_bytes"] += int(total_bytes)
+    return state
+
+
+def _mark_seen(items, token, ttl_seconds, now):
+    # Returns True when the token is new (or its previous entry expired)
+    expires_at = items.get(SEEN_PREFIX + token)
+    if expires_at is not None and expires_at > now:
+        return False
+    items[SEEN_PREFIX + token] = now + ttl_seconds
+    return True
+
+
+class MemoryStateStore:
+    # Process-local backend for tests and local runs
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def add_pending(self, bucket, data_layer, keys, total_bytes, now):
+        batch_id = _batch_id(bucket, data_layer)
+        with self._lock:
+            state = _merge_pending(
+                self._items.get(batch_id), bucket, data_layer, keys, total_bytes, now
+            )
+            self._items[batch_id] = state
+            return json.loads(json.dumps(state))
+
+    def claim(self, bucket, data_layer):
+        with self._lock:
+            return self._items.pop(_batch_id(bucket, data_layer), None)
+
+    def pending(self):
+        with self._lock:
+            return [
+                json.loads(json.dumps(state))
+                for batch_id, state in self._items.items()
+                if batch_id.startswith(PENDING_PREFIX)
+            ]
+
+    def mark_seen(self, token, ttl_seconds, now):
+        with self._lock:
+            return _mark_seen(self._items, token, ttl_seconds, now)
+
+    def release_seen(self, token):
+        with self._lock:
+            self._items.pop(SEEN_PREFIX + token, None)
+
+
+class FileStateStore:
+    # JSON file backend guarded by flock, shared by local processes
+
+    def __init__(self, path):
+        self.path = path
+
+    def _transact(self, update):
+        with open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                items = json.loads(content) if content.strip() else {}
+                result = update(items)
+                f.seek(0)
+                f.truncate()
+                json.dump(items, f)
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def add_pending(self, bucket, data_layer, keys, total_bytes, now):
+        batch_id = _batch_id(bucket, data_layer)
+
+        def update(items):
+            items[batch_id] = _merge_pending(
+                items.get(batch_id), bucket, data_layer, keys, total_bytes, now
+            )
+            return items[batch_id]
+
+        return self._transact(update)
+
+    def claim(self, bucket, data_layer):
+        batch_id = _batch_id(bucket, data_layer)
+        return self._transact(lambda items: items.pop(batch_id, None))
+
+    def pending(self):
+        return self._transact(
+            lambda items: [
+                state
+                for batch_id, state in items.items()
+                if batch_id.startswith(PENDING_PREFIX)
+            ]
+        )
+
+    def mark_seen(self, token, ttl_seconds, now):
+        return self._transact(lambda items: _mark_seen(items, token, ttl_seconds, now))
+
+    def release_seen(self, token):
+        self._transact(lambda items: items.pop(SEEN_PREFIX + token, None))
+
+
+class DynamoDBStateStore:
+    # One item per open batch; ADD/if_not_exists keep concurrent updates atomic
+
+    def __init__(self, table_name, client):
+        self.table_name = table_name
+        self.client = client
+
+    @staticmethod
+    def _from_item(item):
+        return {
+            "bucket": item["bucket"]["S"],
+            "data_layer": item["data_layer"]["S"],
+            "keys": sorted(item.get("object_keys", {}).get("SS", [])),
+            "total_bytes": int(item.get("total_bytes", {}).get("N", "0")),
+            "first_seen": float(item["first_seen"]["N"]),
+        }
+
+    def add_pending(self, bucket, data_layer, keys, total_bytes, now):
+        response = self.client.update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": _batch_id(bucket, data_layer)}},
+            UpdateExpression=(
+                "SET #bucket = if_not_exists(#bucket, :bucket), "
+                "data_layer = if_not_exists(data_layer, :layer), "
+                "first_seen = if_not_exists(first_seen, :now) "
+                "ADD object_keys :keys, total_bytes :bytes"
+            ),
+            ExpressionAttributeNames={"#bucket": "bucket"},
+            ExpressionAttributeValues={
+                ":bucket": {"S": bucket},
+                ":layer": {"S": data_layer},
+                ":now": {"N": str(now)},
+                ":keys": {"SS": list(keys)},
+                ":bytes": {"N": str(int(total_bytes))},
+            },
+            ReturnValues="ALL_NEW",
+        )
+        return self._from_item(response["Attributes"])
+
+    def claim(self, bucket, data_layer):
+        response = self.client.delete_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": _batch_id(bucket, data_layer)}},
+            ReturnValues="ALL_OLD",
+        )
+        item = response.get("Attributes")
+        return self._from_item(item) if item else None
+
+    def pending(self):
+        states = []
+        paginator = self.client.get_paginator("scan")
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            FilterExpression="begins_with(pk, :prefix)",
+            ExpressionAttributeValues={":prefix": {"S": PENDING_PREFIX}},
+        ):
+            states.extend(self._from_item(item) for item in page.get("Items", []))
+        return states
+
+    def mark_seen(self, token, ttl_seconds, now):
+        # expires_at doubles as the table TTL attribute, so old tokens age out
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "pk": {"S": SEEN_PREFIX + token},
+                    "expires_at": {"N": str(int(now + ttl_seconds))},
+                },
+                ConditionExpression="attribute_not_exists(pk) OR expires_at < :now",
+                ExpressionAttributeValues={":now": {"N": str(int(now))}},
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def release_seen(self, token):
+        self.client.delete_item(
+            TableName=self.table_name, Key={"pk": {"S": SEEN_PREFIX + token}}
+        )
+
+
+def build_state_store(backend, get_client):
+    if backend == "dynamodb":
+        table_name = os.environ.get("TRIGGER_STATE_TABLE")
+        if not table_name:
+            raise ValueError("TRIGGER_STATE_TABLE must be set for the dynamodb backend")
+        return DynamoDBStateStore(table_name, get_client("dynamodb"))
+    if backend == "file":
+        return FileStateStore(
+            os.environ.get("TRIGGER_STATE_PATH", "/tmp/trigger_state.json")
+        )
+    if backend == "memory":
+        return MemoryStateStore()
+    raise ValueError(f"Unknown trigger state backend: {backend}")
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 
+import json
 import os
 import sys
 import time
@@ -8,6 +9,10 @@ from datetime import datetime, timedelta
 
 import boto3
 
+# Summaries the Glue jobs keep up to date, read instead of listing the layers
+SILVER_STATS_KEY = "_stats/silver.json"
+BRONZE_MANIFEST_KEY = "_manifests/bronze_silver/manifest.json"
+
 
 class PipelineMonitor:
     def __init__(self):
@@ -126,16 +131,31 @@ class PipelineMonitor:
         except Exception as e:
             return {"status": "ERROR", "error": str(e)}
 
-    def get_s3_recent_uploads(self):
-        """Get recent S3 uploads to raw folder"""
+    def iter_objects(self, prefix):
+        """Yield every object under prefix, page by page"""
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+    def read_json(self, key):
+        """Read a JSON object from the data lake, None if it does not exist"""
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name, Prefix="raw/", MaxKeys=10
-            )
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response["Body"].read())
 
-            objects = response.get("Contents", [])
-            # Filter out the folder marker and sort by last modified
-            files = [obj for obj in objects if not obj["Key"].endswith("/")]
+    def get_s3_recent_uploads(self):
+        """Get recent S3 uploads to bronze folder (today and yesterday)"""
+        try:
+            today = datetime.utcnow().date()
+            files = [
+                obj
+                for offset in (1, 0)
+                for obj in self.iter_objects(
+                    f"bronze/logs_{(today - timedelta(days=offset)).strftime('%Y%m%d')}"
+                )
+            ]
             files.sort(key=lambda x: x["LastModified"], reverse=True)
 
             return files[:5]  # Return last 5 files
@@ -144,26 +164,28 @@ class PipelineMonitor:
             return []
 
     def get_processed_data_status(self):
-        """Check processed data folder"""
+        """Read the silver row totals and the bronze manifest summary"""
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name, Prefix="processed/", MaxKeys=10
-            )
-
-            objects = response.get("Contents", [])
-            files = [obj for obj in objects if not obj["Key"].endswith("/")]
-            files.sort(key=lambda x: x["LastModified"], reverse=True)
-
-            total_size = sum(obj["Size"] for obj in files)
+            stats = self.read_json(SILVER_STATS_KEY) or {}
+            manifest = self.read_json(BRONZE_MANIFEST_KEY) or {}
+            days = manifest.get("days", {})
 
             return {
-                "file_count": len(files),
-                "total_size": total_size,
-                "latest_file": files[0] if files else None,
+                "total_rows": stats.get("total_rows"),
+                "updated_at": stats.get("updated_at"),
+                "last_batch": (stats.get("batches") or [None])[-1],
+                "processed_files": sum(day.get("files", 0) for day in days.values()),
+                "processed_days": len(days),
             }
 
         except Exception as e:
-            return {"file_count": 0, "total_size": 0, "latest_file": None}
+            return {
+                "total_rows": None,
+                "updated_at": None,
+                "last_batch": None,
+                "processed_files": 0,
+                "processed_days": 0,
+            }
 
     def format_timestamp(self, timestamp):
         """Format timestamp for display"""
@@ -277,7 +299,7 @@ class PipelineMonitor:
         # S3 Data Status
         print("S3 DATA STATUS")
 
-        print("Recent Uploads to raw/:")
+        print("Recent Uploads to bronze/:")
         if s3_uploads:
             for i, obj in enumerate(s3_uploads[:3]):
                 filename = obj["Key"].split("/")[-1]
@@ -288,18 +310,20 @@ class PipelineMonitor:
             print("  No recent uploads")
 
         print(f"\nProcessed Data:")
-        print(f"  Files: {processed_status['file_count']}")
-        print(f"  Total Size: {self.format_size(processed_status['total_size'])}")
-
-        if processed_status["latest_file"]:
-            latest = processed_status["latest_file"]
-            filename = (
-                latest["Key"].split("/")[-1][:30] + "..."
-                if len(latest["Key"].split("/")[-1]) > 30
-                else latest["Key"].split("/")[-1]
-            )
+        total_rows = processed_status["total_rows"]
+        print(
+            f"  Silver Rows: {'Unknown' if total_rows is None else f'{total_rows:,}'}"
+        )
+        print(
+            f"  Bronze Files Processed: {processed_status['processed_files']:,} "
+            f"over {processed_status['processed_days']} days"
+        )
+
+        if processed_status["last_batch"]:
+            latest = processed_status["last_batch"]
             print(
-                f"  Latest: {filename} - {self.format_timestamp(latest['LastModified'])}"
+                f"  Latest Batch: {latest['batch_id']} ({latest['rows']:,} rows) - "
+                f"{self.format_timestamp(processed_status['updated_at'])}"
             )
 
         print()
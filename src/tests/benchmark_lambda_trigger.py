@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmark_utils import report
+
+# Local benchmark for the trigger Lambda: cold import time and warm per-invocation
+# overhead with a stubbed Step Functions client (no AWS calls are made)
+
+LAMBDA_CODE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "lambda_code")
+)
+
+COLD_IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import lambda_function
+print(time.perf_counter() - start)
+"""
+
+
+class StubStepFunctionsClient:
+    def __init__(self):
+        self.calls = 0
+
+    def start_execution(self, stateMachineArn, name, input):
+        self.calls += 1
+        return {
+            "executionArn": f"{stateMachineArn}:{name}",
+            "startDate": datetime.utcnow(),
+        }
+
+
+def sample_event(record_count, batch=0):
+    records = []
+    for i in range(record_count):
+        records.append(
+            {
+                "eventSource": "aws:s3",
+                "eventTime": datetime.utcnow().isoformat() + "Z",
+                "s3": {
+                    "bucket": {"name": "assignment5-data-lake"},
+                    "object": {
+                        "key": f"bronze/logs_20250101_{i:06d}.json",
+                        "size": 1024 * (i + 1),
+                        "eTag": f"etag{i:08d}",
+                        "sequencer": f"{batch:08X}{i:08X}",
+                    },
+                },
+            }
+        )
+    return {"Records": records}
+
+
+def measure_cold_import(runs):
+    # Each run is a fresh interpreter so nothing is cached in sys.modules
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_IMPORT_SNIPPET],
+            cwd=LAMBDA_CODE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def measure_invocations(iterations, record_count):
+    sys.path.insert(0, LAMBDA_CODE_DIR)
+    import lambda_function
+
+    os.environ.setdefault(
+        "STATE_MACHINE_ARN",
+        "arn:aws:states:us-east-2:000000000000:stateMachine:benchmark",
+    )
+    stub = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = stub
+
+    # Unique sequencers per iteration so the duplicate-event cache never hits
+    events = [sample_event(record_count, batch) for batch in range(iterations)]
+    timings = []
+    # EMF metric lines go to stdout, as in Lambda, but are discarded here
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for event in events:
+            start = time.perf_counter()
+            result = lambda_function.lambda_handler(event, None)
+            timings.append(time.perf_counter() - start)
+            if result["statusCode"] != 200:
+                raise RuntimeError(f"Unexpected handler result: {json.dumps(result)}")
+
+    return timings, stub.calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trigger Lambda benchmark")
+    parser.add_argument("--cold-runs", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--records", type=int, default=1)
+    cli_args = parser.parse_args()
+
+    print("Trigger Lambda Benchmark")
+    print(f"Lambda code: {LAMBDA_CODE_DIR}")
+
+    report("Cold import", measure_cold_import(cli_args.cold_runs))
+
+    invocation_timings, calls = measure_invocations(
+        cli_args.iterations, cli_args.records
+    )
+    report(
+        f"Warm invocation ({cli_args.records} records)",
+        invocation_timings,
+        unit="us",
+        scale=1e6,
+    )
+    print(f"Stubbed start_execution calls: {calls:,}")
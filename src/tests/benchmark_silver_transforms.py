@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from pyspark.sql import SparkSession
+from pyspark.sql.functions import (
+    coalesce,
+    col,
+    concat,
+    current_timestamp,
+    date_format,
+    dayofmonth,
+    hour,
+    lit,
+    month,
+    to_date,
+    when,
+    year,
+)
+
+# Local benchmark for the Bronze -> Silver casts and enrichment: Catalyst
+# analysis/planning time and end-to-end throughput of the previous withColumn
+# chain against the single-select column specs in glue_scripts/silver_transforms.py
+# (local SparkSession, no AWS calls are made)
+
+GLUE_SCRIPTS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "glue_scripts")
+)
+sys.path.insert(0, GLUE_SCRIPTS_DIR)
+
+import silver_transforms  # noqa: E402
+from benchmark_utils import report  # noqa: E402
+from sample_data_generator import generate_event  # noqa: E402
+
+
+def legacy_cast_data_types(df):
+    df = df.withColumn("status", col("status").cast("int"))
+    df = df.withColumn("bytes_sent", col("bytes_sent").cast("long"))
+    df = df.withColumn("response_time_ms", col("response_time_ms").cast("int"))
+    df = df.withColumn("db_query_time_ms", col("db_query_time_ms").cast("int"))
+    df = df.withColumn(
+        "user_id", when(col("user_id").isNull(), lit(None)).otherwise(col("user_id"))
+    )
+    df = df.withColumn(
+        "referrer",
+        when(col("referrer").isNull(), lit("direct")).otherwise(col("referrer")),
+    )
+    return df
+
+
+def legacy_add_enrichment_fields(df):
+    df = df.withColumn(
+        "is_client_error", when(col("status").between(400, 499), 1).otherwise(0)
+    )
+    df = df.withColumn(
+        "is_server_error", when(col("status").between(500, 599), 1).otherwise(0)
+    )
+    df = df.withColumn(
+        "is_success", when(col("status").between(200, 299), 1).otherwise(0)
+    )
+    df = df.withColumn(
+        "is_redirect", when(col("status").between(300, 399), 1).otherwise(0)
+    )
+    df = df.withColumn("is_slow", when(col("response_time_ms") > 1000, 1).otherwise(0))
+    df = df.withColumn("is_fast", when(col("response_time_ms") < 100, 1).otherwise(0))
+    df = df.withColumn(
+        "is_large_response", when(col("bytes_sent") > 100000, 1).otherwise(0)
+    )
+    df = df.withColumn(
+        "is_small_response", when(col("bytes_sent") < 1000, 1).otherwise(0)
+    )
+    df = df.withColumn("event_date", to_date(col("event_ts")))
+    df = df.withColumn("year", year(col("event_date")))
+    df = df.withColumn("month", month(col("event_date")))
+    df = df.withColumn("day", dayofmonth(col("event_date")))
+    df = df.withColumn(
+        "user_session",
+        concat(
+            coalesce(col("user_id"), lit("anonymous")),
+            lit("_"),
+            date_format(col("event_ts"), "yyyy-MM-dd-HH"),
+        ),
+    )
+    df = df.withColumn("session_date", to_date(col("event_ts")))
+    df = df.withColumn("session_hour", hour(col("event_ts")))
+    return df
+
+
+def withcolumn_chain(df):
+    df = legacy_cast_data_types(df)
+    df = df.withColumn("processing_timestamp", current_timestamp())
+    return legacy_add_enrichment_fields(df)
+
+
+def single_projection(df):
+    df = silver_transforms.cast_data_types(df)
+    return silver_transforms.add_enrichment_fields(df)
+
+
+TRANSFORMS = [
+    ("withColumn chain", withcolumn_chain),
+    ("single select", single_projection),
+]
+
+
+def write_sample(path, record_count):
+    start = datetime(2025, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(record_count):
+            f.write(json.dumps(generate_event(start + timedelta(seconds=i))) + "\n")
+
+
+def measure_planning(transform, df, runs):
+    # Building the frame runs analysis; executedPlan adds optimization and planning
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        transform(df)._jdf.queryExecution().executedPlan()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def measure_throughput(transform, df, runs):
+    # The noop sink runs the whole plan without writing anything
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        transform(df).write.format("noop").mode("overwrite").save()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Silver transforms benchmark")
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--planning-runs", type=int, default=50)
+    parser.add_argument("--throughput-runs", type=int, default=5)
+    cli_args = parser.parse_args()
+
+    spark = (
+        SparkSession.builder.master("local[*]")
+        .appName("silver-transforms-benchmark")
+        .config("spark.sql.session.timeZone", "UTC")
+        .getOrCreate()
+    )
+    spark.sparkContext.setLogLevel("WARN")
+
+    work_dir = tempfile.mkdtemp(prefix="silver_benchmark_")
+    try:
+        sample_path = os.path.join(work_dir, "logs.json")
+        write_sample(sample_path, cli_args.records)
+
+        # Cached input so the throughput runs measure the transforms, not JSON parsing
+        bronze_df = (
+            spark.read.schema(silver_transforms.BRONZE_SCHEMA).json(sample_path).cache()
+        )
+        record_count = bronze_df.count()
+
+        print("Silver Transforms Benchmark")
+        print(f"Records: {record_count:,}")
+
+        for label, transform in TRANSFORMS:
+            # Warm-up, so JIT and codegen caches do not favour the second transform
+            transform(bronze_df).write.format("noop").mode("overwrite").save()
+
+            report(
+                f"{label} planning",
+                measure_planning(transform, bronze_df, cli_args.planning_runs),
+            )
+            throughput = measure_throughput(
+                transform, bronze_df, cli_args.throughput_runs
+            )
+            report(f"{label} end-to-end", throughput)
+            print(
+                f"{label} throughput: "
+                f"{record_count / statistics.median(throughput):,.0f} records/s"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        spark.stop()
@@ -0,0 +1,17 @@
+import statistics
+
+# Timing summaries shared by the local benchmarks (benchmark_*.py)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, timings, unit="ms", scale=1000.0):
+    print(
+        f"{label}: median={statistics.median(timings) * scale:.3f}{unit} "
+        f"p95={percentile(timings, 95) * scale:.3f}{unit} "
+        f"min={min(timings) * scale:.3f}{unit} runs={len(timings)}"
+    )
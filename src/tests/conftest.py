@@ -0,0 +1,72 @@
+import contextlib
+import importlib
+import os
+import shutil
+import sys
+import types
+
+import pytest
+
+# The Lambda and Glue code is deployed as flat modules, import it the same way
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for code_dir in ("lambda_code", "glue_scripts"):
+    sys.path.insert(0, os.path.join(SRC_DIR, code_dir))
+
+# moto and boto3 need a region and credentials, never real ones
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+
+def get_resolved_options(argv, names):
+    # awsglue.utils.getResolvedOptions, for `--name value` pairs
+    return {name: argv[argv.index(f"--{name}") + 1] for name in names}
+
+
+@contextlib.contextmanager
+def import_glue_job(name, argv):
+    # A Glue job script imported on a local SparkContext, with stand-ins for
+    # awsglue (only available on Glue) and argv as the job arguments
+    pytest.importorskip("pyspark")
+    if shutil.which("java") is None:
+        pytest.skip("a local SparkContext needs Java")
+    from pyspark.sql import SparkSession
+
+    sessions = []
+
+    def glue_context(sc):
+        sessions.append(SparkSession(sc))
+        return types.SimpleNamespace(spark_session=sessions[-1])
+
+    glue = {
+        module: types.ModuleType(module)
+        for module in (
+            "awsglue",
+            "awsglue.context",
+            "awsglue.dynamicframe",
+            "awsglue.job",
+            "awsglue.utils",
+        )
+    }
+    glue["awsglue.context"].GlueContext = glue_context
+    glue["awsglue.dynamicframe"].DynamicFrame = object
+    glue["awsglue.job"].Job = lambda glue_context: None
+    glue["awsglue.utils"].getResolvedOptions = get_resolved_options
+
+    with pytest.MonkeyPatch.context() as mp:
+        for module_name, module in glue.items():
+            mp.setitem(sys.modules, module_name, module)
+        mp.setattr(sys, "argv", [f"{name}.py", *argv])
+        mp.setenv("PYSPARK_SUBMIT_ARGS", "--master local[1] pyspark-shell")
+        mp.delitem(sys.modules, name, raising=False)
+        try:
+            yield importlib.import_module(name)
+        finally:
+            sys.modules.pop(name, None)
+            for session in sessions:
+                session.stop()
+
+
+@pytest.fixture(scope="session")
+def glue_job():
+    return import_glue_job
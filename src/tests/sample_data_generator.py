@@ -1,3 +1,5 @@
+import bz2
+import gzip
 import json
 import os
 import random
@@ -28,6 +30,11 @@ DATA_GENERATION_CONFIG = {
 GENERATION_MODE_1 = "production_simulation"
 GENERATION_MODE_2 = "testing"
 
+# Output compression: "none", "gzip", "bzip2" (splittable in Spark) or "zstd"
+# (needs the zstandard package). Bronze keys get the matching .json suffix.
+OUTPUT_COMPRESSION = "none"
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "bzip2": ".bz2", "zstd": ".zst"}
+
 s3_bucket_name = "assignment5-data-lake"
 local_file = "web_logs.json"
 region = "us-east-2"
@@ -411,7 +418,24 @@ def generate_realistic_traffic_pattern(config):
     return sorted(events_schedule)
 
 
-def write_json(filepath, config_mode="testing"):
+def open_output(filepath, compression="none"):
+    # Text-mode writer for the selected codec
+    if compression == "gzip":
+        return gzip.open(filepath, "wt", encoding="utf-8", compresslevel=6)
+    if compression == "bzip2":
+        return bz2.open(filepath, "wt", encoding="utf-8")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd output needs the zstandard package")
+        return zstandard.open(
+            filepath, "wt", cctx=zstandard.ZstdCompressor(level=3), encoding="utf-8"
+        )
+    return open(filepath, "w", encoding="utf-8")
+
+
+def write_json(filepath, config_mode="testing", compression="none"):
 
     config = DATA_GENERATION_CONFIG[config_mode]
     target_size_bytes = config["target_size_mb"] * 1024 * 1024
@@ -434,7 +458,7 @@ def write_json(filepath, config_mode="testing"):
     session_event_count = 0
     max_session_events = random.randint(3, 15)
 
-    with open(filepath, "w", encoding="utf-8") as f:
+    with open_output(filepath, compression) as f:
         for event_dt in events_schedule:
             # Check if we've reached target size
             if size >= target_size_bytes:
@@ -476,20 +500,26 @@ def write_json(filepath, config_mode="testing"):
     print(f"\n Generation Complete")
     print(f"Records generated: {count:,}")
     print(f"File size: {actual_size_mb:.2f} MB")
+    if compression != "none":
+        stored_size = os.path.getsize(filepath)
+        print(
+            f"Compressed ({compression}): {stored_size / 1e6:.2f} MB, "
+            f"ratio {size / stored_size:.1f}x"
+        )
     print(f"Average record size: {size/count:.0f} bytes")
     print(f"File written to: {filepath}")
 
     return filepath
 
 
-def upload_to_s3(filepath, bucket, key, region):
+def upload_to_s3(filepath, bucket, key, region, compression="none"):
     try:
         s3_client = boto3.client("s3", region_name=region)
 
         from datetime import datetime
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        flat_key = f"bronze/logs_{timestamp}.json"
+        flat_key = f"bronze/logs_{timestamp}.json{COMPRESSION_SUFFIXES[compression]}"
 
         s3_client.upload_file(filepath, bucket, flat_key)
         print(f"Successfully uploaded to: s3://{bucket}/{flat_key}")
@@ -515,23 +545,31 @@ if __name__ == "__main__":
     # Creates a timestamped filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     mode_suffix = "test" if GENERATION_MODE_2 == "testing" else "prod"
-    local_file_timestamped = f"web_logs_{mode_suffix}_{timestamp}.json"
+    local_file_timestamped = (
+        f"web_logs_{mode_suffix}_{timestamp}.json"
+        f"{COMPRESSION_SUFFIXES[OUTPUT_COMPRESSION]}"
+    )
 
     # S3 key will be automatically partitioned
     # The key here is just a fallback if partitioning fails
     s3_key_fallback = f"bronze/logs_{mode_suffix}_{timestamp}.json"
 
     print(f"Output file: {local_file_timestamped}")
+    print(f"Compression: {OUTPUT_COMPRESSION}")
     print(f"S3 destination: Will be written to flat bronze structure")
     print(f"Fallback path: s3://{s3_bucket_name}/{s3_key_fallback}")
 
     try:
         # Generates a realistic JSON data
-        json_path = write_json(local_file_timestamped, GENERATION_MODE_1)
+        json_path = write_json(
+            local_file_timestamped, GENERATION_MODE_1, OUTPUT_COMPRESSION
+        )
 
         # Upload to S3 (flat structure for real-world scenario)
         print(f"\n S3 Upload ")
-        success = upload_to_s3(json_path, s3_bucket_name, s3_key_fallback, region)
+        success = upload_to_s3(
+            json_path, s3_bucket_name, s3_key_fallback, region, OUTPUT_COMPRESSION
+        )
 
         if success:
             print(f"\nSuccess! Data generation and upload completed.")
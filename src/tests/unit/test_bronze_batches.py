@@ -0,0 +1,61 @@
+import bronze_batches
+import pytest
+
+MB = 1024 * 1024
+
+
+def bronze_file(name, size):
+    return {"key": f"bronze/{name}", "etag": name, "size": size}
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("logs_20250101_120000.json", 10),
+        ("logs_20250101_120000.json.gz", 80),
+        ("logs_20250101_120000.json.bz2", 100),
+        ("logs_20250101_120000.json.zst", 80),
+        ("logs_20250101_120000.txt", 10),
+    ],
+)
+def test_input_bytes_scales_compressed_files(name, expected):
+    assert bronze_batches.input_bytes(bronze_file(name, 10)) == expected
+
+
+def test_batches_are_consecutive_and_of_about_equal_size():
+    files = [bronze_file(f"logs_20250101_12{i:02d}00.json", 30 * MB) for i in range(6)]
+
+    batches = bronze_batches.plan_batches(files, 100 * MB)
+
+    # 180 MB in two batches of 90 MB, in key order
+    assert batches == [files[:3], files[3:]]
+
+
+def test_batches_are_cut_by_input_bytes_not_stored_bytes():
+    # 20 MB stored, about 160 MB to read
+    files = [
+        bronze_file("logs_20250101_120000.json.gz", 10 * MB),
+        bronze_file("logs_20250101_120100.json.gz", 10 * MB),
+    ]
+
+    assert bronze_batches.plan_batches(files, 100 * MB) == [files[:1], files[1:]]
+
+
+def test_file_larger_than_a_batch_is_a_batch_of_its_own():
+    files = [
+        bronze_file("logs_20250101_120000.json", 1 * MB),
+        bronze_file("logs_20250101_120100.json", 500 * MB),
+        bronze_file("logs_20250101_120200.json", 1 * MB),
+    ]
+
+    batches = bronze_batches.plan_batches(files, 100 * MB)
+
+    assert files[1:2] in batches
+    assert [f for batch in batches for f in batch] == files
+
+
+def test_everything_under_the_limit_is_one_batch():
+    files = [bronze_file(f"logs_20250101_12{i:02d}00.json", MB) for i in range(3)]
+
+    assert bronze_batches.plan_batches(files, 100 * MB) == [files]
+    assert bronze_batches.plan_batches([], 100 * MB) == []
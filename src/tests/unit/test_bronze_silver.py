@@ -0,0 +1,101 @@
+import json
+
+import boto3
+import pytest
+import writer_lease
+from moto import mock_aws
+
+BUCKET = "assignment5-data-lake"
+ARGV = [
+    "--JOB_NAME",
+    "test-bronze-silver",
+    "--writer_lease_minutes",
+    "1",
+    "--writer_lease_wait_seconds",
+    "0",
+]
+
+
+@pytest.fixture(scope="module")
+def bronze_silver(glue_job):
+    with glue_job("bronze_silver", ARGV) as module:
+        yield module
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(
+            Bucket=BUCKET,
+            CreateBucketConfiguration={"LocationConstraint": "us-east-2"},
+        )
+        yield client
+
+
+def lease_keys(s3):
+    return list(writer_lease.iter_keys(s3, BUCKET, writer_lease.LEASE_PREFIX))
+
+
+def test_lease_arguments_are_read_from_the_job_arguments(bronze_silver):
+    assert bronze_silver.writer_lease_minutes == 1
+    assert bronze_silver.writer_lease_wait_seconds == 0
+
+
+def test_process_data_releases_its_lease(bronze_silver, s3):
+    assert bronze_silver.process_data() is True
+    assert lease_keys(s3) == []
+
+
+def test_process_data_gives_up_while_another_writer_holds_the_lease(bronze_silver, s3):
+    held = writer_lease.acquire_lease(s3, BUCKET, "compaction", 60, 0)
+
+    with pytest.raises(RuntimeError):
+        bronze_silver.process_data()
+    assert lease_keys(s3) == [held]
+
+
+def put_bronze(s3, *keys):
+    for key in keys:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"{}")
+
+
+def test_listing_starts_at_the_low_water_mark(bronze_silver, s3):
+    put_bronze(
+        s3,
+        "bronze/logs_20241230_120000.json",
+        "bronze/logs_20241231_120000.json",
+        "bronze/logs_20250105_120000.json",
+    )
+    # A fast-path inbox entry of a newer day does not move the listing start
+    manifest = {"version": 3, "days": {"20250105": {}}, "low_water_day": "20250101"}
+
+    listed = bronze_silver.list_bronze_files(s3, manifest)
+
+    assert [f["key"] for f in listed] == [
+        "bronze/logs_20241231_120000.json",
+        "bronze/logs_20250105_120000.json",
+    ]
+
+    # Manifests without a low-water mark are listed in full once
+    listed = bronze_silver.list_bronze_files(s3, {"version": 3, "days": {}})
+    assert len(listed) == 3
+
+
+def test_low_water_mark_moves_to_the_newest_listed_day(bronze_silver, s3):
+    key = "bronze/logs_20250102_120000.json"
+    put_bronze(s3, key)
+    etag = s3.head_object(Bucket=BUCKET, Key=key)["ETag"].strip('"')
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=f"{bronze_silver.manifest_inbox_prefix}entry.json",
+        Body=json.dumps({"key": key, "etag": etag, "size": 2}),
+    )
+
+    assert bronze_silver.process_new_files(s3, "run1") is True
+
+    manifest = json.loads(
+        s3.get_object(Bucket=BUCKET, Key=bronze_silver.manifest_key)["Body"].read()
+    )
+    assert manifest["low_water_day"] == "20250102"
+    assert manifest["days"]["20250102"]["files"] == 1
@@ -0,0 +1,93 @@
+import json
+import shutil
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyspark")
+
+import bronze_silver_streaming  # noqa: E402
+from pyspark.sql import SparkSession  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def spark():
+    if shutil.which("java") is None:
+        pytest.skip("a local SparkSession needs Java")
+    session = (
+        SparkSession.builder.master("local[1]")
+        .appName("test-bronze-silver-streaming")
+        .config("spark.sql.session.timeZone", "UTC")
+        .config("spark.sql.shuffle.partitions", "1")
+        .getOrCreate()
+    )
+    yield session
+    session.stop()
+
+
+@pytest.fixture
+def lake(tmp_path):
+    options = dict(bronze_silver_streaming.DEFAULT_OPTIONS)
+    for name in ("bronze", "silver", "quarantine", "checkpoint", "dedup_index"):
+        options[f"{name}_path"] = str(tmp_path / name)
+    (tmp_path / "bronze").mkdir()
+    return options
+
+
+def bronze_record(event_id, days_ago=0, **fields):
+    event_ts = datetime.utcnow().replace(microsecond=0) - timedelta(days=days_ago)
+    record = {
+        "event_id": event_id,
+        "event_ts": event_ts.isoformat() + "Z",
+        "client_ip": "10.0.0.1",
+        "method": "GET",
+        "path": "/index.html",
+        "status": 200,
+        "bytes_sent": 512,
+        "response_time_ms": 40,
+        "user_id": "u1",
+    }
+    record.update(fields)
+    return record
+
+
+def put_bronze(lake, name, records):
+    with open(f"{lake['bronze_path']}/{name}", "w") as f:
+        f.write("\n".join(json.dumps(record) for record in records))
+
+
+def event_ids(spark, path):
+    return sorted(row.event_id for row in spark.read.parquet(path).collect())
+
+
+def test_micro_batches_dedupe_on_event_id(spark, lake):
+    put_bronze(
+        lake,
+        "logs_20250101_120000.json",
+        [
+            bronze_record("e1"),
+            bronze_record("e1", path="/retried.html"),
+            bronze_record("e2", event_ts=None),
+            bronze_record("e3", days_ago=30),
+        ],
+    )
+    bronze_silver_streaming.run(spark, lake)
+
+    # Rows dated before the dedup window are written, as by the batch job
+    assert event_ids(spark, lake["silver_path"]) == ["e1", "e3"]
+    quarantined = {
+        row.event_id: row.failed_rules
+        for row in spark.read.parquet(lake["quarantine_path"]).collect()
+    }
+    assert quarantined == {"e2": ["missing_event_ts"]}
+
+    # A later micro-batch is checked against the event_id index
+    put_bronze(
+        lake,
+        "logs_20250101_120100.json",
+        [bronze_record("e1"), bronze_record("e4")],
+    )
+    bronze_silver_streaming.run(spark, lake)
+
+    assert event_ids(spark, lake["silver_path"]) == ["e1", "e3", "e4"]
+    assert event_ids(spark, lake["dedup_index_path"]) == ["e1", "e3", "e4"]
@@ -0,0 +1,87 @@
+import json
+
+import emf
+import pytest
+
+DIMENSIONS = {"Environment": "dev", "TriggerMode": "sqs"}
+
+
+@pytest.fixture
+def metrics():
+    return emf.MetricsLogger("DataPipeline", DIMENSIONS)
+
+
+def flushed(metrics, capsys):
+    metrics.flush()
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_flush_writes_one_emf_document(metrics, capsys, monkeypatch):
+    monkeypatch.setattr(emf.time, "time", lambda: 1735732800.123)
+    metrics.put("ExecutionsStarted", 3)
+    metrics.put("ObjectSize", 100, "Bytes")
+    metrics.put("ObjectSize", 200, "Bytes")
+
+    [document] = flushed(metrics, capsys)
+
+    assert document == {
+        "_aws": {
+            "Timestamp": 1735732800123,
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": "DataPipeline",
+                    "Dimensions": [["Environment", "TriggerMode"]],
+                    "Metrics": [
+                        {"Name": "ExecutionsStarted", "Unit": "Count"},
+                        {"Name": "ObjectSize", "Unit": "Bytes"},
+                    ],
+                }
+            ],
+        },
+        "Environment": "dev",
+        "TriggerMode": "sqs",
+        "ExecutionsStarted": 3,
+        "ObjectSize": [100, 200],
+    }
+    # Flushed values are not written again
+    assert flushed(metrics, capsys) == []
+
+
+def test_flush_splits_value_arrays_over_the_emf_limit(metrics, capsys):
+    limit = emf.MAX_VALUES_PER_METRIC
+    for value in range(limit + 5):
+        metrics.put("ObjectSize", value, "Bytes")
+    metrics.put("ExecutionsStarted", 1)
+
+    first, second = flushed(metrics, capsys)
+
+    assert first["ObjectSize"] == list(range(limit))
+    assert first["ExecutionsStarted"] == 1
+    # Metrics without values left are dropped from the later documents
+    assert second["ObjectSize"] == list(range(limit, limit + 5))
+    assert "ExecutionsStarted" not in second
+    assert second["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+        {"Name": "ObjectSize", "Unit": "Bytes"}
+    ]
+    assert first["_aws"]["Timestamp"] == second["_aws"]["Timestamp"]
+
+
+def test_timer_records_milliseconds(metrics, capsys, monkeypatch):
+    clock = iter([10.0, 10.25])
+    monkeypatch.setattr(emf.time, "perf_counter", lambda: next(clock))
+
+    with metrics.timer("StartExecutionTime"):
+        pass
+    [document] = flushed(metrics, capsys)
+
+    assert document["StartExecutionTime"] == 250.0
+    assert document["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+        {"Name": "StartExecutionTime", "Unit": "Milliseconds"}
+    ]
+
+
+def test_disabled_logger_writes_nothing(capsys):
+    metrics = emf.MetricsLogger("DataPipeline", DIMENSIONS, enabled=False)
+    metrics.put("ExecutionsStarted", 1)
+
+    assert flushed(metrics, capsys) == []
@@ -0,0 +1,388 @@
+import io
+import json
+import struct
+from datetime import datetime
+
+import boto3
+import fast_path
+import layer_stats
+import partition_commit
+import pyarrow.parquet as pq
+import pytest
+import writer_lease
+from moto import mock_aws
+
+BUCKET = "bucket-x"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("FAST_PATH_LEASE_WAIT_SECONDS", "0")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(
+            Bucket=BUCKET,
+            CreateBucketConfiguration={"LocationConstraint": "us-east-2"},
+        )
+        yield client
+
+
+def bronze_record(event_id, **fields):
+    record = {
+        "event_id": event_id,
+        "event_ts": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+        "method": "GET",
+        "path": "/index.html",
+        "status": 200,
+        "bytes_sent": 512,
+        "response_time_ms": 40,
+        "client_ip": "10.0.0.1",
+        "user_id": "u1",
+    }
+    record.update(fields)
+    return record
+
+
+def put_bronze(s3, key, records):
+    body = "\n".join(json.dumps(record) for record in records).encode("utf-8")
+    s3.put_object(Bucket=BUCKET, Key=key, Body=body)
+
+
+def keys_under(s3, prefix):
+    response = s3.list_objects_v2(Bucket=BUCKET, Prefix=prefix)
+    return sorted(obj["Key"] for obj in response.get("Contents", []))
+
+
+def silver_event_ids(s3):
+    event_ids = []
+    for key in keys_under(s3, "silver/"):
+        if not key.endswith(".parquet"):
+            continue
+        body = s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+        event_ids += pq.read_table(io.BytesIO(body)).column("event_id").to_pylist()
+    return sorted(event_ids)
+
+
+def test_xxhash64_matches_spark():
+    # SELECT xxhash64('Spark', array(123), 2) -> 5602566077635097486: each
+    # value is hashed with the previous hash as seed, ints as 4 bytes
+    digest = fast_path.xxhash64("Spark")
+    digest = fast_path._xxh64(struct.pack("<i", 123), digest & fast_path.MASK64)
+    digest = fast_path._xxh64(struct.pack("<i", 2), digest & fast_path.MASK64)
+    assert digest == 5602566077635097486
+
+    # Reference XXH64 vectors, the second one longer than a 32-byte stripe
+    assert fast_path._xxh64(b"", 0) & fast_path.MASK64 == 0xEF46DB3751D8E999
+    assert (
+        fast_path._xxh64(b"Nobody inspects the spammish repetition", 0)
+        & fast_path.MASK64
+        == 0xFBCEA83C8A378BF1
+    )
+
+
+def test_event_ids_seen_in_earlier_objects_are_dropped(s3):
+    put_bronze(s3, "bronze/logs_20250101_120000.json", [bronze_record("e1")])
+    put_bronze(
+        s3,
+        "bronze/logs_20250101_120100.json",
+        [bronze_record("e1"), bronze_record("e2")],
+    )
+
+    first = fast_path.process_object(s3, BUCKET, "bronze/logs_20250101_120000.json")
+    second = fast_path.process_object(s3, BUCKET, "bronze/logs_20250101_120100.json")
+
+    assert first["records_out"] == 1
+    assert second["records_in"] == 2 and second["records_out"] == 1
+    assert silver_event_ids(s3) == ["e1", "e2"]
+
+    # The index files have the layout of the Glue job's index
+    indexed = []
+    for key in keys_under(s3, fast_path.DEDUP_INDEX_PREFIX):
+        body = s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+        table = pq.read_table(io.BytesIO(body))
+        assert table.column_names == ["event_id_hash", "event_id"]
+        indexed += zip(*table.to_pydict().values())
+    assert sorted(indexed) == sorted(
+        (fast_path.xxhash64(event_id), event_id) for event_id in ("e1", "e2")
+    )
+
+
+def test_rejected_rows_and_duplicates_are_counted_apart(s3):
+    key = "bronze/logs_20250101_120000.json"
+    lines = [
+        json.dumps(bronze_record("e1")),
+        json.dumps(bronze_record("e1", path="/retried.html")),
+        json.dumps(bronze_record("e2", response_time_ms=12.5)),
+        json.dumps(bronze_record("e3", status="200")),
+        "not json",
+    ]
+    s3.put_object(Bucket=BUCKET, Key=key, Body="\n".join(lines).encode("utf-8"))
+
+    result = fast_path.process_object(s3, BUCKET, key)
+
+    assert result["records_in"] == 5
+    assert result["records_out"] == 1
+    assert result["rejected"] == 3
+    assert result["duplicates"] == 1
+
+
+def test_object_in_the_glue_manifest_is_skipped(s3):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(s3, key, [bronze_record("e1")])
+    etag = s3.head_object(Bucket=BUCKET, Key=key)["ETag"].strip('"')
+    s3.put_object(
+        Bucket=BUCKET,
+        Key="_manifests/bronze_silver/days/20250101.json",
+        Body=json.dumps({"files": {key: {"etag": etag, "size": 1}}}),
+    )
+
+    result = fast_path.process_object(s3, BUCKET, key)
+
+    assert result["records_out"] == 0
+    assert keys_under(s3, "silver/") == []
+
+
+def test_processed_object_is_skipped_on_redelivery(s3):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(s3, key, [bronze_record("e1")])
+
+    fast_path.process_object(s3, BUCKET, key)
+    files = keys_under(s3, "silver/")
+    again = fast_path.process_object(s3, BUCKET, key)
+
+    assert again["files"] == []
+    assert keys_under(s3, "silver/") == files
+
+
+def test_glue_lease_sends_the_object_to_glue(s3):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(s3, key, [bronze_record("e1")])
+    glue_lease = writer_lease.acquire_lease(s3, BUCKET, "glue", 600, 0)
+
+    with pytest.raises(RuntimeError):
+        fast_path.process_object(s3, BUCKET, key)
+
+    assert keys_under(s3, "silver/") == []
+    assert keys_under(s3, fast_path.MANIFEST_INBOX_PREFIX) == []
+    assert keys_under(s3, writer_lease.LEASE_PREFIX) == [glue_lease]
+
+
+def test_glue_waits_for_a_fast_path_lease(s3):
+    fast_path_lease = writer_lease.acquire_lease(s3, BUCKET, "fastpath", 300, 0)
+
+    with pytest.raises(RuntimeError):
+        writer_lease.acquire_lease(s3, BUCKET, "glue", 600, 0, waits_for=("fastpath",))
+    assert keys_under(s3, writer_lease.LEASE_PREFIX) == [fast_path_lease]
+
+    writer_lease.release_lease(s3, BUCKET, fast_path_lease)
+    glue_lease = writer_lease.acquire_lease(
+        s3, BUCKET, "glue", 600, 0, waits_for=("fastpath",)
+    )
+    assert keys_under(s3, writer_lease.LEASE_PREFIX) == [glue_lease]
+
+
+def test_expired_leases_do_not_count(s3):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(s3, key, [bronze_record("e1")])
+    s3.put_object(
+        Bucket=BUCKET, Key=f"{writer_lease.LEASE_PREFIX}{1:012d}-glue-dead", Body=b"{}"
+    )
+
+    assert fast_path.process_object(s3, BUCKET, key)["records_out"] == 1
+    # Removed on the way, like the Glue job does
+    assert keys_under(s3, writer_lease.LEASE_PREFIX) == []
+
+
+def test_large_index_sends_the_object_to_glue(s3, monkeypatch):
+    put_bronze(s3, "bronze/logs_20250101_120000.json", [bronze_record("e1")])
+    put_bronze(s3, "bronze/logs_20250101_120100.json", [bronze_record("e2")])
+    fast_path.process_object(s3, BUCKET, "bronze/logs_20250101_120000.json")
+    monkeypatch.setenv("FAST_PATH_MAX_INDEX_BYTES", "1")
+
+    with pytest.raises(RuntimeError):
+        fast_path.process_object(s3, BUCKET, "bronze/logs_20250101_120100.json")
+    assert silver_event_ids(s3) == ["e1"]
+
+
+def test_retry_overwrites_the_files_of_the_failed_attempt(s3, monkeypatch):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(s3, key, [bronze_record("e1"), bronze_record("e2")])
+
+    def fail(*args):
+        raise RuntimeError("manifest inbox unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(fast_path, "record_processed", fail)
+        with pytest.raises(RuntimeError):
+            fast_path.process_object(s3, BUCKET, key)
+    files = keys_under(s3, "silver/")
+    result = fast_path.process_object(s3, BUCKET, key)
+
+    assert result["files"] == files
+    assert keys_under(s3, "silver/") == files
+    assert files[0].rpartition("/")[2].startswith(fast_path.BATCH_FILE_PREFIX)
+    assert silver_event_ids(s3) == ["e1", "e2"]
+
+
+@pytest.mark.parametrize("failing_prefix", ["silver/", fast_path.DEDUP_INDEX_PREFIX])
+def test_failed_attempt_leaves_nothing_for_glue_to_duplicate(
+    s3, monkeypatch, failing_prefix
+):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(
+        s3,
+        key,
+        [
+            bronze_record("e1", event_ts="2025-01-01T12:00:00Z"),
+            bronze_record("e2", event_ts="2025-01-02T12:00:00Z"),
+        ],
+    )
+    put_object = s3.put_object
+    puts = []
+
+    def fail_second_put(**kwargs):
+        if kwargs["Key"].startswith(failing_prefix):
+            puts.append(kwargs["Key"])
+            if len(puts) == 2:
+                raise RuntimeError("S3 unavailable")
+        return put_object(**kwargs)
+
+    monkeypatch.setattr(s3, "put_object", fail_second_put)
+    with pytest.raises(RuntimeError):
+        fast_path.process_object(s3, BUCKET, key)
+
+    assert keys_under(s3, "silver/") == []
+    assert keys_under(s3, fast_path.DEDUP_INDEX_PREFIX) == []
+    assert keys_under(s3, fast_path.MANIFEST_INBOX_PREFIX) == []
+
+
+def test_retry_after_compaction_does_not_add_the_rows_again(s3, monkeypatch):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(s3, key, [bronze_record("e1")])
+
+    def fail(*args):
+        raise RuntimeError("manifest inbox unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(fast_path, "record_processed", fail)
+        with pytest.raises(RuntimeError):
+            fast_path.process_object(s3, BUCKET, key)
+    # A compaction folds the attempt's file in
+    [silver_key] = keys_under(s3, "silver/")
+    directory, _, name = silver_key.rpartition("/")
+    partition_commit.record_compacted_batches(
+        s3, BUCKET, directory, partition_commit.batch_ids_of([name])
+    )
+    s3.copy_object(
+        Bucket=BUCKET,
+        Key=f"{directory}/compacted-run1-00000.snappy.parquet",
+        CopySource={"Bucket": BUCKET, "Key": silver_key},
+    )
+    s3.delete_object(Bucket=BUCKET, Key=silver_key)
+
+    result = fast_path.process_object(s3, BUCKET, key)
+
+    assert result["files"] == []
+    assert silver_event_ids(s3) == ["e1"]
+    assert keys_under(s3, fast_path.MANIFEST_INBOX_PREFIX) != []
+
+
+def test_written_rows_are_added_to_the_silver_stats(s3):
+    put_bronze(s3, "bronze/logs_20250101_120000.json", [bronze_record("e1")])
+    put_bronze(
+        s3,
+        "bronze/logs_20250101_120100.json",
+        [bronze_record("e1"), bronze_record("e2"), bronze_record("e3")],
+    )
+
+    # No stats file: nothing to add to, the next Glue run recounts
+    fast_path.process_object(s3, BUCKET, "bronze/logs_20250101_120000.json")
+    assert keys_under(s3, "_stats/") == []
+
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=layer_stats.stats_key("silver"),
+        Body=json.dumps({"table": "silver", "total_rows": 10, "batches": []}),
+    )
+    fast_path.process_object(s3, BUCKET, "bronze/logs_20250101_120100.json")
+    # A second count of the same batch replaces the first
+    batch_id = partition_commit.batch_id_for(
+        "fastpath",
+        "bronze/logs_20250101_120100.json",
+        s3.head_object(Bucket=BUCKET, Key="bronze/logs_20250101_120100.json")[
+            "ETag"
+        ].strip('"'),
+    )
+    fast_path.record_silver_rows(s3, BUCKET, batch_id, 2)
+
+    body = s3.get_object(Bucket=BUCKET, Key=layer_stats.stats_key("silver"))[
+        "Body"
+    ].read()
+    stats = json.loads(body)
+    assert stats["total_rows"] == 12
+    assert stats["batches"] == [{"batch_id": batch_id, "rows": 2}]
+
+
+def test_silver_files_hold_the_silver_allowlist_only(s3, monkeypatch):
+    key = "bronze/logs_20250101_120000.json"
+    padding = {
+        "log_level": "INFO",
+        "log_message": "ok",
+        "request_headers": {"accept": "*/*"},
+        "response_headers": {"server": "nginx"},
+        "server_name": "web-1",
+        "datacenter": "us-east-2a",
+        "referrer": None,
+        "cdn_edge": "fra1",
+    }
+    put_bronze(s3, key, [bronze_record("e1", **padding)])
+
+    fast_path.process_object(s3, BUCKET, key)
+    [silver_key] = keys_under(s3, "silver/")
+    body = s3.get_object(Bucket=BUCKET, Key=silver_key)["Body"].read()
+    columns = pq.read_schema(io.BytesIO(body)).names
+
+    assert columns == fast_path.silver_file_columns(fast_path.REQUIRED_FIELDS)
+    assert "client_ip" not in columns and "log_level" not in columns
+
+    # A wider allowlist, as for the Glue job
+    monkeypatch.setenv("SILVER_COLUMNS", "cdn_edge")
+    key = "bronze/logs_20250101_120100.json"
+    put_bronze(s3, key, [bronze_record("e2", **padding)])
+    result = fast_path.process_object(s3, BUCKET, key)
+    body = s3.get_object(Bucket=BUCKET, Key=result["files"][0])["Body"].read()
+    assert "cdn_edge" in pq.read_schema(io.BytesIO(body)).names
+
+
+def test_silver_gold_picks_up_fast_path_files(s3):
+    key = "bronze/logs_20250101_120000.json"
+    put_bronze(s3, key, [bronze_record("e1")])
+    watermark = datetime.utcnow()
+    # The change log reaches back to the watermark
+    partition_commit.record_changed_partitions(
+        s3, BUCKET, "silver", "glue-batch", [], watermark
+    )
+
+    result = fast_path.process_object(s3, BUCKET, key)
+    [silver_key] = result["files"]
+    partition = silver_key[len("silver/") :].rpartition("/")[0]
+
+    # Same entry format as the Glue writers
+    [entry] = [
+        json.loads(s3.get_object(Bucket=BUCKET, Key=k)["Body"].read())
+        for k in keys_under(s3, "_changes/silver/")
+        if not k.endswith("-glue-batch.json")
+    ]
+    assert sorted(entry) == ["batch_id", "committed_at", "partitions", "started_at"]
+    assert entry["partitions"] == [partition]
+
+    # What silver_gold.list_silver_files reads
+    changed = partition_commit.changed_partitions_since(s3, BUCKET, "silver", watermark)
+    assert changed == [partition]
+    live = [
+        obj["Key"]
+        for obj in partition_commit.iter_live_objects(
+            s3, BUCKET, f"silver/{partition}/"
+        )
+    ]
+    assert live == [silver_key]
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import boto3
+import gold_checkpoint
+import pytest
+from moto import mock_aws
+
+BUCKET = "bucket-x"
+WATERMARK = datetime(2025, 1, 1, 12)
+POSITION = {"key": "_changes/silver/20250101T120000000000-a.json", "recent": []}
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(
+            Bucket=BUCKET,
+            CreateBucketConfiguration={"LocationConstraint": "us-east-2"},
+        )
+        yield client
+
+
+def test_first_commit_writes_version_one(s3):
+    assert gold_checkpoint.read_checkpoint(s3, BUCKET) is None
+
+    committed = gold_checkpoint.commit_checkpoint(
+        s3, BUCKET, None, WATERMARK, "run1", "gold1", POSITION
+    )
+
+    checkpoint = gold_checkpoint.read_checkpoint(s3, BUCKET)
+    assert committed["version"] == checkpoint["version"] == 1
+    assert checkpoint["watermark"] == WATERMARK
+    assert checkpoint["change_log"] == POSITION
+    assert (checkpoint["run_id"], checkpoint["batch_id"]) == ("run1", "gold1")
+
+
+def test_commits_move_the_version_on(s3):
+    first = gold_checkpoint.commit_checkpoint(
+        s3, BUCKET, None, WATERMARK, "run1", "gold1", None
+    )
+    second = gold_checkpoint.commit_checkpoint(
+        s3, BUCKET, first, None, "run2", "gold2", POSITION
+    )
+
+    assert second["version"] == 2
+    assert gold_checkpoint.read_checkpoint(s3, BUCKET)["watermark"] is None
+
+
+@pytest.mark.parametrize("started_from", [None, 1])
+def test_run_that_started_from_an_older_version_cannot_commit(s3, started_from):
+    first = gold_checkpoint.commit_checkpoint(
+        s3, BUCKET, None, WATERMARK, "run1", "gold1", None
+    )
+    gold_checkpoint.commit_checkpoint(
+        s3, BUCKET, first, WATERMARK, "run2", "gold2", None
+    )
+    stale = {"version": started_from} if started_from else None
+
+    with pytest.raises(RuntimeError):
+        gold_checkpoint.commit_checkpoint(
+            s3, BUCKET, stale, WATERMARK, "run3", "gold3", None
+        )
+    assert gold_checkpoint.read_checkpoint(s3, BUCKET)["run_id"] == "run2"
+
+
+def test_checkpoint_key_can_be_moved(s3):
+    key = "_checkpoints/other/watermark.json"
+    gold_checkpoint.write_checkpoint(s3, BUCKET, 4, WATERMARK, "run1", None, key=key)
+
+    assert gold_checkpoint.read_checkpoint(s3, BUCKET) is None
+    assert gold_checkpoint.read_checkpoint(s3, BUCKET, key)["version"] == 4
@@ -0,0 +1,310 @@
+import json
+
+import fast_path
+import lambda_function
+import pytest
+from trigger_state import MemoryStateStore
+
+STATE_MACHINE_ARN = "arn:aws:states:us-east-2:123456789012:stateMachine:pipeline"
+
+
+class StubStepFunctionsClient:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.started = []
+
+    def start_execution(self, stateMachineArn, name, input):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Step Functions unavailable")
+        self.started.append({"name": name, "input": json.loads(input)})
+        return {"executionArn": f"{stateMachineArn}:{name}"}
+
+
+class FlakyStateStore(MemoryStateStore):
+    # add_pending fails the first `failures` calls
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def add_pending(self, *args):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("DynamoDB unavailable")
+        return super().add_pending(*args)
+
+
+@pytest.fixture(autouse=True)
+def trigger_env(monkeypatch):
+    monkeypatch.setenv("STATE_MACHINE_ARN", STATE_MACHINE_ARN)
+    monkeypatch.setenv("METRICS_ENABLED", "false")
+    monkeypatch.setenv("SMALL_FILE_MAX_BYTES", "0")
+    monkeypatch.setattr(lambda_function, "_CLIENTS", {})
+    monkeypatch.setattr(lambda_function, "_SEEN_EVENTS", {})
+    monkeypatch.setattr(lambda_function, "_STATE_STORE", None)
+
+
+def s3_record(key, size=100, etag="etag-1", bucket="bucket-x"):
+    return {
+        "eventSource": "aws:s3",
+        "eventTime": "2025-01-01T12:00:00.000Z",
+        "s3": {
+            "bucket": {"name": bucket},
+            "object": {"key": key, "size": size, "eTag": etag, "sequencer": "01"},
+        },
+    }
+
+
+def sqs_event(*bodies):
+    return {
+        "Records": [
+            {"messageId": f"m{i}", "body": body} for i, body in enumerate(bodies)
+        ]
+    }
+
+
+def s3_body(*keys):
+    return json.dumps({"Records": [s3_record(key) for key in keys]})
+
+
+class FastPathRecorder:
+    # Stands in for fast_path.process_object; keys in `failing` raise
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.keys = []
+
+    def __call__(self, s3_client, bucket, key):
+        self.keys.append(key)
+        if key in self.failing:
+            raise RuntimeError("fast path failed")
+        return {"key": key}
+
+
+@pytest.fixture
+def fast_path_stub(monkeypatch):
+    recorder = FastPathRecorder()
+    monkeypatch.setattr(fast_path, "process_object", recorder)
+    monkeypatch.setattr(fast_path, "is_available", lambda: True)
+    monkeypatch.setenv("SMALL_FILE_MAX_BYTES", "100")
+    lambda_function._CLIENTS["s3"] = object()
+    return recorder
+
+
+def sized_event(*keys_and_sizes):
+    return {
+        "Records": [
+            s3_record(key, size=size, etag=f"etag-{i}")
+            for i, (key, size) in enumerate(keys_and_sizes)
+        ]
+    }
+
+
+def test_failed_start_is_retried_by_sqs():
+    sfn = StubStepFunctionsClient(failures=1)
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sqs_event(s3_body("bronze/logs_20250101_120000.json"))
+
+    first = lambda_function.sqs_handler(event, None)
+    retry = lambda_function.sqs_handler(event, None)
+
+    assert first == {"batchItemFailures": [{"itemIdentifier": "m0"}]}
+    assert retry == {"batchItemFailures": []}
+    assert len(sfn.started) == 1
+    assert sfn.started[0]["input"]["key"] == "bronze/logs_20250101_120000.json"
+
+
+@pytest.mark.parametrize("shared_dedupe", ["false", "true"])
+def test_failure_after_dedupe_releases_the_event(monkeypatch, shared_dedupe):
+    # add_pending fails on the first delivery: the redelivery must not be
+    # suppressed as a duplicate, and its keys must end up pending
+    monkeypatch.setenv("COALESCE_ENABLED", "true")
+    monkeypatch.setenv("COALESCE_WINDOW_SECONDS", "3600")
+    monkeypatch.setenv("DEDUPE_STATE_ENABLED", shared_dedupe)
+    store = FlakyStateStore(failures=1)
+    monkeypatch.setattr(lambda_function, "_STATE_STORE", store)
+    lambda_function._CLIENTS["stepfunctions"] = StubStepFunctionsClient()
+    event = sqs_event(s3_body("bronze/logs_20250101_120000.json"))
+
+    first = lambda_function.sqs_handler(event, None)
+    retry = lambda_function.sqs_handler(event, None)
+    again = lambda_function.sqs_handler(event, None)
+
+    assert first == {"batchItemFailures": [{"itemIdentifier": "m0"}]}
+    assert retry == {"batchItemFailures": []}
+    assert again == {"batchItemFailures": []}
+    [pending] = store.pending()
+    assert pending["keys"] == ["bronze/logs_20250101_120000.json"]
+    assert pending["total_bytes"] == 100
+
+
+def test_records_are_batched_per_bucket_and_layer():
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    bronze_keys = [f"bronze/logs_20250101_12{i:02d}00.json" for i in range(3)]
+    event = {
+        "Records": [
+            s3_record(key, size=100 * (i + 1), etag=f"etag-{i}")
+            for i, key in enumerate(bronze_keys)
+        ]
+        + [
+            s3_record("silver/year=2025/month=1/day=1/part-0.parquet", size=50),
+            s3_record(bronze_keys[0], size=70, bucket="bucket-y"),
+        ]
+    }
+
+    result = lambda_function.lambda_handler(event, None)
+
+    assert result["statusCode"] == 200
+    started = {
+        (execution["input"]["bucket"], execution["input"]["data_layer"]): execution
+        for execution in sfn.started
+    }
+    assert sorted(started) == [
+        ("bucket-x", "bronze"),
+        ("bucket-x", "silver"),
+        ("bucket-y", "bronze"),
+    ]
+    bronze = started["bucket-x", "bronze"]["input"]
+    assert bronze["manifest"] == {
+        "keys": bronze_keys,
+        "object_count": 3,
+        "total_bytes": 600,
+    }
+    assert bronze["key"] == bronze_keys[0] and bronze["size"] == 600
+    assert started["bucket-x", "silver"]["input"]["manifest"]["total_bytes"] == 50
+    other = started["bucket-y", "bronze"]["input"]["manifest"]
+    assert other["keys"] == [bronze_keys[0]] and other["total_bytes"] == 70
+
+
+def test_redelivered_event_is_suppressed():
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = {"Records": [s3_record("bronze/logs_20250101_120000.json")]}
+
+    first = lambda_function.lambda_handler(event, None)
+    second = lambda_function.lambda_handler(event, None)
+
+    assert first["statusCode"] == 200 and not first["duplicate"]
+    assert second["statusCode"] == 200 and second["duplicate"]
+    assert len(sfn.started) == 1
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "not json",
+        json.dumps(["a", "list"]),
+        json.dumps({"Message": "not json either"}),
+        json.dumps({"Records": "no records list"}),
+        json.dumps({"unrelated": True}),
+    ],
+)
+def test_poison_message_is_acknowledged(body):
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sqs_event(body, s3_body("bronze/logs_20250101_120000.json"))
+
+    result = lambda_function.sqs_handler(event, None)
+
+    assert result == {"batchItemFailures": []}
+    assert len(sfn.started) == 1
+
+
+def test_retryable_error_is_reported_for_its_message_only():
+    sfn = StubStepFunctionsClient(failures=1)
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sqs_event("not json", s3_body("bronze/logs_20250101_120000.json"))
+
+    result = lambda_function.sqs_handler(event, None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
+
+
+def test_sns_wrapped_notification_is_unwrapped():
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sqs_event(json.dumps({"Message": s3_body("bronze/a.json")}))
+
+    assert lambda_function.sqs_handler(event, None) == {"batchItemFailures": []}
+    assert sfn.started[0]["input"]["key"] == "bronze/a.json"
+
+
+def test_fast_path_takes_bronze_objects_up_to_the_cutoff(fast_path_stub):
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sized_event(
+        ("bronze/logs_20250101_120000.json", 99),
+        ("bronze/logs_20250101_120100.json", 100),
+        ("bronze/logs_20250101_120200.json", 101),
+    )
+
+    result = lambda_function.lambda_handler(event, None)
+
+    assert result["statusCode"] == 200
+    assert fast_path_stub.keys == [
+        "bronze/logs_20250101_120000.json",
+        "bronze/logs_20250101_120100.json",
+    ]
+    [started] = sfn.started
+    assert started["input"]["manifest"]["keys"] == ["bronze/logs_20250101_120200.json"]
+    assert started["input"]["size"] == 101
+
+
+def test_fast_path_only_handles_bronze(fast_path_stub):
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sized_event(("silver/year=2025/month=1/day=1/part-0.parquet", 10))
+
+    lambda_function.lambda_handler(event, None)
+
+    assert fast_path_stub.keys == []
+    assert sfn.started[0]["input"]["data_layer"] == "silver"
+
+
+def test_everything_on_the_fast_path_starts_no_execution(fast_path_stub):
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sized_event(("bronze/logs_20250101_120000.json", 10))
+
+    result = lambda_function.lambda_handler(event, None)
+
+    assert result["statusCode"] == 200
+    assert result["fast_path"] == [{"key": "bronze/logs_20250101_120000.json"}]
+    assert sfn.started == []
+
+
+def test_fast_path_failure_falls_back_to_glue(fast_path_stub):
+    fast_path_stub.failing.add("bronze/logs_20250101_120000.json")
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sized_event(
+        ("bronze/logs_20250101_120000.json", 10),
+        ("bronze/logs_20250101_120100.json", 10),
+    )
+
+    lambda_function.lambda_handler(event, None)
+
+    [started] = sfn.started
+    assert started["input"]["manifest"]["keys"] == ["bronze/logs_20250101_120000.json"]
+    assert started["input"]["size"] == 10
+
+
+@pytest.mark.parametrize("max_bytes, available", [("0", True), ("100", False)])
+def test_fast_path_disabled_routes_everything_to_glue(
+    fast_path_stub, monkeypatch, max_bytes, available
+):
+    monkeypatch.setenv("SMALL_FILE_MAX_BYTES", max_bytes)
+    monkeypatch.setattr(fast_path, "is_available", lambda: available)
+    sfn = StubStepFunctionsClient()
+    lambda_function._CLIENTS["stepfunctions"] = sfn
+    event = sized_event(("bronze/logs_20250101_120000.json", 10))
+
+    lambda_function.lambda_handler(event, None)
+
+    assert fast_path_stub.keys == []
+    assert sfn.started[0]["input"]["key"] == "bronze/logs_20250101_120000.json"
+
+
+def test_is_available_follows_pyarrow(monkeypatch):
+    monkeypatch.setattr(fast_path.importlib.util, "find_spec", lambda name: None)
+    assert fast_path.is_available() is False
@@ -0,0 +1,168 @@
+import json
+from datetime import datetime, timedelta
+
+import boto3
+import partition_commit
+import pytest
+from moto import mock_aws
+
+BUCKET = "bucket-x"
+DIRECTORY = "silver/year=2025/month=1/day=1"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(
+            Bucket=BUCKET,
+            CreateBucketConfiguration={"LocationConstraint": "us-east-2"},
+        )
+        yield client
+
+
+def put(s3, key):
+    s3.put_object(Bucket=BUCKET, Key=key, Body=key.encode("utf-8"))
+
+
+def live_keys(s3, prefix="silver/"):
+    return sorted(
+        obj["Key"] for obj in partition_commit.iter_live_objects(s3, BUCKET, prefix)
+    )
+
+
+def test_partition_values():
+    assert partition_commit.partition_values("silver/", DIRECTORY) == ["2025", "1", "1"]
+
+
+def test_readers_never_see_both_sides_of_a_compaction(s3):
+    originals = [f"{DIRECTORY}/batch-a-0000{i}.snappy.parquet" for i in range(2)]
+    for key in originals:
+        put(s3, key)
+    put(s3, f"{DIRECTORY}/_staging-run1/part-0.snappy.parquet")
+    assert live_keys(s3) == originals
+
+    # Compacted files in the hidden location stay unseen until the marker
+    location = f"{partition_commit.COMPACTED_DIRECTORY_PREFIX}run1/"
+    name = f"{partition_commit.COMPACTED_FILE_PREFIX}run1-00000.snappy.parquet"
+    put(s3, f"{DIRECTORY}/{location}{name}")
+    assert live_keys(s3) == originals
+
+    marker = {
+        "run_id": "run1",
+        "location": location,
+        "files": [name],
+        "replaced": [key.rpartition("/")[2] for key in originals],
+    }
+    partition_commit.write_compaction_marker(s3, BUCKET, DIRECTORY, marker)
+    assert live_keys(s3) == [f"{DIRECTORY}/{location}{name}"]
+
+    # A batch committed during the swap is live; the directory being
+    # rewritten is not
+    appended = f"{DIRECTORY}/batch-b-00000.snappy.parquet"
+    put(s3, appended)
+    partition_commit.restore_compacted_directory(s3, BUCKET, DIRECTORY, marker)
+    assert live_keys(s3) == [f"{DIRECTORY}/{location}{name}", appended]
+    assert live_keys(s3, f"{DIRECTORY}/") == live_keys(s3)
+
+    partition_commit.clear_compaction_marker(s3, BUCKET, DIRECTORY, marker)
+    assert live_keys(s3) == [appended, f"{DIRECTORY}/{name}"]
+    assert partition_commit.read_compaction_marker(s3, BUCKET, DIRECTORY) is None
+    response = s3.list_objects_v2(Bucket=BUCKET, Prefix=f"{DIRECTORY}/{location}")
+    assert response["KeyCount"] == 0
+
+
+def test_marker_without_location_covers_files_in_the_directory(s3):
+    # Markers from before compacted files got their own location
+    put(s3, f"{DIRECTORY}/batch-a-00000.snappy.parquet")
+    put(s3, f"{DIRECTORY}/compacted-run0-00000.snappy.parquet")
+    partition_commit.write_compaction_marker(
+        s3,
+        BUCKET,
+        DIRECTORY,
+        {
+            "run_id": "run0",
+            "files": ["compacted-run0-00000.snappy.parquet"],
+            "replaced": ["batch-a-00000.snappy.parquet"],
+        },
+    )
+
+    assert live_keys(s3) == [f"{DIRECTORY}/compacted-run0-00000.snappy.parquet"]
+
+
+def stage(s3, batch_id, count=1):
+    for i in range(count):
+        put(s3, f"silver/_staging/{batch_id}/year=2025/month=1/day=1/part-{i}.parquet")
+
+
+def test_batch_retried_after_compaction_is_not_added_again(s3):
+    stage(s3, "a")
+    partition_commit.commit_batch(s3, BUCKET, "silver/", "a")
+    [committed] = live_keys(s3)
+    assert partition_commit.batch_ids_of([committed.rpartition("/")[2]]) == {"a"}
+
+    # A compaction folds batch a in
+    partition_commit.record_compacted_batches(s3, BUCKET, DIRECTORY, {"a"})
+    s3.delete_object(Bucket=BUCKET, Key=committed)
+    put(s3, f"{DIRECTORY}/compacted-run1-00000.snappy.parquet")
+
+    stage(s3, "a", count=2)
+    stage(s3, "b")
+    partition_commit.commit_batch(s3, BUCKET, "silver/", "a")
+    partition_commit.commit_batch(s3, BUCKET, "silver/", "b")
+
+    assert live_keys(s3) == [
+        f"{DIRECTORY}/batch-b-00000.snappy.parquet",
+        f"{DIRECTORY}/compacted-run1-00000.snappy.parquet",
+    ]
+    assert live_keys(s3, "silver/_staging/") == []
+    # Later compactions add to the record
+    partition_commit.record_compacted_batches(s3, BUCKET, DIRECTORY, {"b"})
+    assert partition_commit.read_compacted_batches(s3, BUCKET, DIRECTORY) == {"a", "b"}
+
+
+def log_change(s3, committed_at, batch_id, partition):
+    key = (
+        f"{partition_commit.change_log_prefix('silver')}"
+        f"{committed_at.strftime(partition_commit.CHANGE_TIME_FORMAT)}-{batch_id}.json"
+    )
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=key,
+        Body=json.dumps({"batch_id": batch_id, "partitions": [partition]}),
+    )
+    return key
+
+
+def test_reader_position_catches_entries_of_a_lagging_writer(s3):
+    now = datetime(2025, 1, 2, 12)
+    first = log_change(s3, now, "a", "year=2025/month=1/day=1")
+    second = log_change(s3, now + timedelta(minutes=1), "b", "year=2025/month=1/day=2")
+    position = partition_commit.position_after(None, [first, second])
+    assert position == {"key": second, "recent": [first]}
+    assert partition_commit.unread_changes(s3, BUCKET, "silver", position) == []
+
+    # Committed after the reader's run by a writer whose clock is behind
+    lagging = log_change(s3, now - timedelta(minutes=5), "c", "year=2025/month=1/day=2")
+    later = log_change(s3, now + timedelta(minutes=2), "d", "year=2025/month=1/day=2")
+    changes = partition_commit.unread_changes(s3, BUCKET, "silver", position)
+    assert [key for key, _ in changes] == [lagging, later]
+    assert [entry["batch_id"] for _, entry in changes] == ["c", "d"]
+
+    position = partition_commit.position_after(position, [lagging, later])
+    assert position["key"] == later
+    assert partition_commit.unread_changes(s3, BUCKET, "silver", position) == []
+
+    # Entries older than the margin drop out of the position
+    newest = log_change(s3, now + timedelta(hours=2), "e", "year=2025/month=1/day=3")
+    assert partition_commit.position_after(position, [newest]) == {
+        "key": newest,
+        "recent": [],
+    }
+
+
+def test_position_before_the_log_means_reading_everything(s3):
+    log_change(s3, datetime(2025, 1, 2, 12), "a", "year=2025/month=1/day=1")
+    position = {"key": "_changes/silver/20250101T000000000000-z.json", "recent": []}
+
+    assert partition_commit.unread_changes(s3, BUCKET, "silver", position) is None
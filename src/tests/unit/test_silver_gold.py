@@ -0,0 +1,134 @@
+import json
+from datetime import datetime, timedelta
+
+import boto3
+import gold_checkpoint
+import partition_commit
+import pytest
+from moto import mock_aws
+
+BUCKET = "bucket-x"
+ARGV = ["--JOB_NAME", "test-silver-gold", "--bucket", BUCKET, "--database", "db"]
+DAY_1 = "year=2025/month=1/day=1"
+DAY_2 = "year=2025/month=1/day=2"
+
+
+@pytest.fixture(scope="module")
+def silver_gold(glue_job):
+    with glue_job("silver_gold", ARGV) as module:
+        yield module
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(
+            Bucket=BUCKET,
+            CreateBucketConfiguration={"LocationConstraint": "us-east-2"},
+        )
+        yield client
+
+
+def log_batch(s3, batch_id, partition, committed_at):
+    # A silver writer: batch file, then its change log entry
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=f"silver/{partition}/batch-{batch_id}-00000.snappy.parquet",
+        Body=b"",
+    )
+    key = (
+        f"{partition_commit.change_log_prefix('silver')}"
+        f"{committed_at.strftime(partition_commit.CHANGE_TIME_FORMAT)}-{batch_id}.json"
+    )
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=key,
+        Body=json.dumps({"batch_id": batch_id, "partitions": [partition]}),
+    )
+    return key
+
+
+def commit_gold_run(s3, key, watermark):
+    # A gold run that read the change log up to key
+    return gold_checkpoint.commit_checkpoint(
+        s3,
+        BUCKET,
+        None,
+        watermark,
+        "run1",
+        "gold1",
+        partition_commit.position_after(None, [key]),
+    )
+
+
+def names(paths):
+    return sorted(path.rpartition("/")[2] for path in paths)
+
+
+def test_batches_are_read_by_change_log_entry_not_by_timestamp(silver_gold, s3):
+    now = datetime.utcnow()
+    first = log_batch(s3, "a", DAY_1, now)
+    checkpoint = commit_gold_run(s3, first, now)
+
+    # A batch that started before the watermark commits after the gold run
+    log_batch(s3, "b", DAY_1, now + timedelta(seconds=1))
+    log_batch(s3, "c", DAY_2, now + timedelta(seconds=2))
+
+    plan = silver_gold.plan_increment(s3, checkpoint)
+    later_ids = silver_gold.later_batch_ids(s3, plan)
+    files, rebuild_days = silver_gold.silver_increment_files(s3, plan, later_ids)
+
+    assert not plan["full"] and later_ids == set()
+    assert names(files) == [
+        "batch-b-00000.snappy.parquet",
+        "batch-c-00000.snappy.parquet",
+    ]
+    assert rebuild_days == []
+
+
+def test_retry_reads_the_planned_batches(silver_gold, s3):
+    now = datetime.utcnow()
+    first = log_batch(s3, "a", DAY_1, now)
+    checkpoint = commit_gold_run(s3, first, now)
+    planned = log_batch(s3, "b", DAY_1, now + timedelta(seconds=1))
+    plan = silver_gold.plan_increment(s3, checkpoint)
+
+    # The attempt fails; another batch commits before the retry
+    log_batch(s3, "c", DAY_1, now + timedelta(seconds=2))
+    retry = silver_gold.plan_increment(s3, checkpoint)
+    later_ids = silver_gold.later_batch_ids(s3, retry)
+    files, _ = silver_gold.silver_increment_files(s3, retry, later_ids)
+
+    assert retry == plan and retry["keys"] == [planned]
+    assert later_ids == {"c"}
+    assert names(files) == ["batch-b-00000.snappy.parquet"]
+
+
+def test_compacted_batches_send_their_day_to_a_rebuild(silver_gold, s3):
+    now = datetime.utcnow()
+    first = log_batch(s3, "a", DAY_1, now)
+    checkpoint = commit_gold_run(s3, first, now)
+    log_batch(s3, "b", DAY_2, now + timedelta(seconds=1))
+    directory = f"silver/{DAY_2}"
+    partition_commit.record_compacted_batches(s3, BUCKET, directory, {"b"})
+    s3.delete_object(Bucket=BUCKET, Key=f"{directory}/batch-b-00000.snappy.parquet")
+
+    plan = silver_gold.plan_increment(s3, checkpoint)
+    files, rebuild_days = silver_gold.silver_increment_files(s3, plan, set())
+
+    assert files == []
+    assert rebuild_days == [datetime(2025, 1, 2).date()]
+
+
+def test_first_run_reads_all_of_silver_but_later_batches(silver_gold, s3):
+    now = datetime.utcnow()
+    log_batch(s3, "a", DAY_1, now)
+    plan = silver_gold.plan_increment(s3, None)
+    log_batch(s3, "b", DAY_2, now + timedelta(seconds=1))
+
+    later_ids = silver_gold.later_batch_ids(s3, plan)
+    files, _ = silver_gold.silver_increment_files(s3, plan, later_ids)
+
+    assert plan["full"] and later_ids == {"b"}
+    assert names(files) == ["batch-a-00000.snappy.parquet"]
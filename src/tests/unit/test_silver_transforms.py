@@ -0,0 +1,211 @@
+import json
+import shutil
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyspark")
+
+import fast_path  # noqa: E402
+import silver_transforms  # noqa: E402
+from pyspark.sql import SparkSession  # noqa: E402
+from pyspark.sql.types import IntegerType, LongType, StringType  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def spark():
+    if shutil.which("java") is None:
+        pytest.skip("a local SparkSession needs Java")
+    session = (
+        SparkSession.builder.master("local[1]")
+        .appName("test-silver-transforms")
+        .config("spark.sql.session.timeZone", "UTC")
+        .config("spark.sql.shuffle.partitions", "1")
+        .getOrCreate()
+    )
+    yield session
+    session.stop()
+
+
+def valid_row(**fields):
+    row = {
+        "event_id": "e1",
+        "event_ts": "2025-01-01T12:00:00Z",
+        "client_ip": "10.0.0.1",
+        "method": "GET",
+        "path": "/index.html",
+        "status": 200,
+        "bytes_sent": 512,
+        "response_time_ms": 40,
+        "user_id": "u1",
+    }
+    row.update(fields)
+    return row
+
+
+def bronze_df(spark, rows, columns=silver_transforms.REQUIRED_FIELDS):
+    schema = silver_transforms.bronze_read_schema(columns)
+    return spark.createDataFrame(
+        [tuple(row.get(name) for name in schema.fieldNames()) for row in rows],
+        schema,
+    )
+
+
+def test_silver_columns_default_is_the_required_fields_in_bronze_order():
+    columns = silver_transforms.silver_columns("default")
+
+    assert set(columns) == set(silver_transforms.REQUIRED_FIELDS)
+    bronze_order = silver_transforms.BRONZE_SCHEMA.fieldNames()
+    assert columns == [name for name in bronze_order if name in columns]
+
+
+def test_silver_columns_allowlist_and_all():
+    assert "cdn_edge" in silver_transforms.silver_columns("cdn_edge, referrer")
+    assert (
+        silver_transforms.silver_columns("all")
+        == silver_transforms.BRONZE_SCHEMA.fieldNames()
+    )
+    with pytest.raises(ValueError):
+        silver_transforms.silver_columns("no_such_field")
+
+
+def test_bronze_read_schema_prunes_to_the_columns():
+    schema = silver_transforms.bronze_read_schema(["status", "event_id", "unknown"])
+
+    assert schema.fieldNames() == ["event_id", "status"]
+    assert schema["status"].dataType == LongType()
+
+
+def test_cast_columns_narrows_types_and_adds_missing_fields(spark):
+    df = bronze_df(
+        spark,
+        [valid_row(status=404, referrer=None)],
+        ["event_id", "status", "bytes_sent", "referrer"],
+    )
+
+    cast = df.select(*silver_transforms.cast_columns(df.columns))
+
+    assert cast.columns[:4] == ["event_id", "status", "bytes_sent", "referrer"]
+    assert set(cast.columns) == set(df.columns) | set(silver_transforms.EXPECTED_FIELDS)
+    assert cast.schema["status"].dataType == IntegerType()
+    assert cast.schema["bytes_sent"].dataType == LongType()
+    assert cast.schema["response_time_ms"].dataType == IntegerType()
+    assert cast.schema["user_agent"].dataType == StringType()
+
+    [row] = cast.collect()
+    assert row["status"] == 404
+    assert row["referrer"] == "direct"
+    assert row["response_time_ms"] is None
+
+
+def test_cast_columns_honours_the_expected_fields_subset(spark):
+    df = bronze_df(spark, [valid_row()], ["event_id"])
+
+    cast = df.select(*silver_transforms.cast_columns(df.columns, ["event_id", "path"]))
+
+    assert cast.columns == ["event_id", "path"]
+
+
+@pytest.mark.parametrize(
+    "fields, failed_rules",
+    [
+        ({}, []),
+        ({"status": 99}, ["invalid_status"]),
+        ({"status": None}, ["invalid_status"]),
+        ({"method": "FETCH"}, ["invalid_method"]),
+        ({"response_time_ms": 0}, ["invalid_response_time"]),
+        ({"bytes_sent": -1}, ["invalid_bytes_sent"]),
+        ({"event_ts": None}, ["missing_event_ts"]),
+        ({"path": "//"}, ["invalid_path"]),
+        ({"path": None}, ["invalid_path"]),
+        ({"client_ip": ""}, ["missing_client_ip"]),
+        ({"status": 700, "client_ip": None}, ["invalid_status", "missing_client_ip"]),
+    ],
+)
+def test_tag_validation_failures(spark, fields, failed_rules):
+    df = bronze_df(spark, [valid_row(**fields)])
+    df = df.select(
+        *silver_transforms.cast_columns(
+            df.columns,
+            [
+                name
+                for name in silver_transforms.EXPECTED_FIELDS
+                if name in silver_transforms.REQUIRED_FIELDS
+            ],
+        )
+    )
+
+    [row] = silver_transforms.tag_validation_failures(df).collect()
+
+    assert row["failed_rules"] == failed_rules
+
+
+def glue_silver_schema(spark, columns):
+    # Columns and types of the silver files the batch job writes (the
+    # partition columns are directories)
+    df = bronze_df(spark, [valid_row()], columns)
+    df = df.select(
+        *silver_transforms.cast_columns(
+            df.columns,
+            [name for name in silver_transforms.EXPECTED_FIELDS if name in columns],
+        )
+    )
+    df = silver_transforms.tag_validation_failures(df).drop("failed_rules", "client_ip")
+    return silver_transforms.add_enrichment_fields(df).drop("year", "month", "day")
+
+
+@pytest.mark.parametrize("spec", ["default", "cdn_edge,db_query_time_ms", "all"])
+def test_fast_path_writes_the_glue_silver_schema(spark, tmp_path, spec):
+    columns = silver_transforms.silver_columns(spec)
+    assert fast_path.silver_columns(spec) == columns
+
+    record = valid_row(log_level="INFO", request_headers={"accept": "*/*"})
+    rows, _ = fast_path.transform_lines(
+        [json.dumps(record)], datetime.utcnow(), columns
+    )
+    path = tmp_path / "fast_path.parquet"
+    path.write_bytes(
+        fast_path.to_parquet_bytes(rows, fast_path.silver_file_columns(columns))
+    )
+
+    fast_path_schema = spark.read.parquet(str(path)).schema
+    glue_schema = glue_silver_schema(spark, columns).schema
+    assert [(f.name, f.dataType) for f in fast_path_schema] == [
+        (f.name, f.dataType) for f in glue_schema
+    ]
+
+
+def test_fast_path_casts_like_the_glue_json_reader(spark, tmp_path):
+    # Integer columns are declared LongType: decimals, numeric strings and
+    # out-of-range numbers read as null, and the row is rejected
+    lines = [
+        json.dumps(valid_row(event_id="ok")),
+        json.dumps(valid_row(event_id="decimal", status=200.0)),
+        json.dumps(valid_row(event_id="fraction", response_time_ms=12.5)),
+        json.dumps(valid_row(event_id="string", status="200")),
+        json.dumps(valid_row(event_id="huge", bytes_sent=2**63)),
+        json.dumps(valid_row(event_id="wraps", status=2**32 + 200)),
+        json.dumps(valid_row(event_id="bool", status=True)),
+    ]
+    path = tmp_path / "logs_20250101_120000.json"
+    path.write_text("\n".join(lines))
+
+    columns = silver_transforms.REQUIRED_FIELDS
+    df = spark.read.schema(silver_transforms.bronze_read_schema(columns)).json(
+        str(path)
+    )
+    df = df.select(
+        *silver_transforms.cast_columns(
+            df.columns,
+            [name for name in silver_transforms.EXPECTED_FIELDS if name in columns],
+        )
+    )
+    glue_valid = sorted(
+        row.event_id
+        for row in silver_transforms.tag_validation_failures(df).collect()
+        if not row.failed_rules
+    )
+    rows, counts = fast_path.transform_lines(lines, datetime.utcnow(), columns)
+
+    assert sorted(row["event_id"] for row in rows) == glue_valid == ["ok", "wraps"]
+    assert counts["rejected"] == len(lines) - 2
@@ -0,0 +1,99 @@
+import boto3
+import pytest
+from moto import mock_aws
+from trigger_state import (
+    DynamoDBStateStore,
+    FileStateStore,
+    MemoryStateStore,
+    build_state_store,
+)
+
+TABLE_NAME = "pipeline-trigger-state"
+
+
+@pytest.fixture(params=["memory", "file", "dynamodb"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStateStore()
+    elif request.param == "file":
+        yield FileStateStore(str(tmp_path / "trigger_state.json"))
+    else:
+        with mock_aws():
+            client = boto3.client("dynamodb")
+            client.create_table(
+                TableName=TABLE_NAME,
+                KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            yield DynamoDBStateStore(TABLE_NAME, client)
+
+
+def test_add_pending_accumulates_keys_and_bytes(store):
+    store.add_pending("bucket-x", "bronze", ["bronze/a.json"], 10, 100.0)
+    state = store.add_pending(
+        "bucket-x", "bronze", ["bronze/a.json", "bronze/b.json"], 5, 130.0
+    )
+
+    assert sorted(state["keys"]) == ["bronze/a.json", "bronze/b.json"]
+    assert state["total_bytes"] == 15
+    assert state["first_seen"] == 100.0
+    assert state["bucket"] == "bucket-x"
+    assert state["data_layer"] == "bronze"
+
+
+def test_claim_removes_the_batch(store):
+    store.add_pending("bucket-x", "bronze", ["bronze/a.json"], 10, 100.0)
+
+    claimed = store.claim("bucket-x", "bronze")
+
+    assert claimed["keys"] == ["bronze/a.json"]
+    assert store.claim("bucket-x", "bronze") is None
+    assert store.pending() == []
+
+
+def test_claim_of_unknown_batch_returns_none(store):
+    assert store.claim("bucket-x", "silver") is None
+
+
+def test_pending_lists_every_open_batch_for_flush(store):
+    store.add_pending("bucket-x", "bronze", ["bronze/a.json"], 10, 100.0)
+    store.add_pending("bucket-x", "silver", ["silver/b.parquet"], 20, 110.0)
+    store.mark_seen("token-1", 60, 100.0)
+
+    pending = sorted(store.pending(), key=lambda state: state["data_layer"])
+
+    assert [state["data_layer"] for state in pending] == ["bronze", "silver"]
+    assert pending[1]["keys"] == ["silver/b.parquet"]
+
+    # Flushing claims them one by one
+    for state in pending:
+        assert store.claim(state["bucket"], state["data_layer"]) is not None
+    assert store.pending() == []
+
+
+def test_mark_seen_suppresses_until_released(store):
+    assert store.mark_seen("token-1", 60, 100.0) is True
+    assert store.mark_seen("token-1", 60, 110.0) is False
+
+    store.release_seen("token-1")
+
+    assert store.mark_seen("token-1", 60, 120.0) is True
+
+
+def test_mark_seen_accepts_expired_tokens(store):
+    assert store.mark_seen("token-1", 60, 100.0) is True
+    assert store.mark_seen("token-1", 60, 200.0) is True
+
+
+def test_build_state_store_backends(tmp_path, monkeypatch):
+    assert isinstance(build_state_store("memory", None), MemoryStateStore)
+
+    monkeypatch.setenv("TRIGGER_STATE_PATH", str(tmp_path / "state.json"))
+    assert isinstance(build_state_store("file", None), FileStateStore)
+
+    monkeypatch.delenv("TRIGGER_STATE_TABLE", raising=False)
+    with pytest.raises(ValueError):
+        build_state_store("dynamodb", None)
+    with pytest.raises(ValueError):
+        build_state_store("redis", None)
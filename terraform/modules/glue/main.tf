@@ -1,3 +1,28 @@
+locals {
+  # Modules shared by the Glue job scripts, shipped with --extra-py-files
+  shared_modules = [
+    "bronze_batches.py",
+    "gold_checkpoint.py",
+    "hll_sketch.py",
+    "job_args.py",
+    "layer_stats.py",
+    "partition_commit.py",
+    "s3_listing.py",
+    "silver_transforms.py",
+    "writer_lease.py",
+  ]
+  extra_py_files = join(",", [
+    for module in local.shared_modules : "s3://${var.data_lake_bucket_name}/glue_scripts/${module}"
+  ])
+
+  # Bronze to Silver holds the writer lease for at most its own timeout
+  bronze_silver_timeout_minutes = 30
+
+  # vCPUs per worker type; one worker runs the driver
+  worker_cores   = { "G.1X" = 4, "G.2X" = 8, "G.4X" = 16, "G.8X" = 32 }
+  executor_cores = max(1, var.number_of_workers - 1) * lookup(local.worker_cores, var.worker_type, 4)
+}
+
 # Glue Database
 resource "aws_glue_catalog_database" "data_database" {
   name = "${var.db_prefix}-${var.environment}-${var.database_name}"
@@ -18,6 +43,8 @@ resource "aws_glue_crawler" "silver_crawler" {
 
   s3_target {
     path = "s3://${var.data_lake_bucket_name}/silver/"
+    # Staging output, compaction markers and compacted files mid-swap
+    exclusions = ["**/_*", "**/_*/**"]
   }
 
   schema_change_policy {
@@ -81,6 +108,19 @@ resource "aws_glue_job" "bronze_to_silver_job" {
     "--project"                          = var.project
     "--bucket"                           = var.data_lake_bucket_name
     "--database"                         = aws_glue_catalog_database.data_database.name
+    "--extra-py-files"                   = local.extra_py_files
+    "--schema_drift_mode"                = var.bronze_schema_drift_mode
+    "--metrics_namespace"                = "${var.project}/DataQuality"
+    "--diagnostic_counts"                = tostring(var.enable_diagnostic_counts)
+    "--dedup_window_days"                = tostring(var.dedup_window_days)
+    "--executor_cores"                   = tostring(local.executor_cores)
+    "--batch_mb_per_core"                = tostring(var.bronze_batch_mb_per_core)
+    "--bronze_lookback_days"             = tostring(var.bronze_lookback_days)
+    "--writer_lease_minutes"             = tostring(local.bronze_silver_timeout_minutes)
+    "--silver_columns"                   = var.silver_columns
+    "--silver_raw"                       = tostring(var.enable_silver_raw)
+    "--silver_sort_key"                  = var.silver_sort_key
+    "--silver_bloom_columns"             = var.silver_bloom_columns
     "--enable-continuous-cloudwatch-log" = "true"
     "--enable-metrics"                   = "true"
     "--enable-spark-ui"                  = "true"
@@ -94,7 +134,7 @@ resource "aws_glue_job" "bronze_to_silver_job" {
   number_of_workers = var.number_of_workers
   worker_type       = var.worker_type
   max_retries       = 1
-  timeout           = 30
+  timeout           = local.bronze_silver_timeout_minutes
 
 
 
@@ -105,6 +145,46 @@ resource "aws_glue_job" "bronze_to_silver_job" {
   }
 }
 
+# Bronze to Silver Structured Streaming Job (alternative to the batch job)
+resource "aws_glue_job" "bronze_to_silver_streaming_job" {
+  count    = var.enable_bronze_streaming ? 1 : 0
+  name     = "${var.project}-bronze-to-silver-streaming-job"
+  role_arn = var.glue_role_arn
+
+  command {
+    script_location = "s3://${var.data_lake_bucket_name}/glue_scripts/bronze_silver_streaming.py"
+    python_version  = "3"
+  }
+
+  default_arguments = {
+    "--job-language"                     = "python"
+    "--project"                          = var.project
+    "--bucket"                           = var.data_lake_bucket_name
+    "--extra-py-files"                   = local.extra_py_files
+    "--trigger"                          = var.bronze_streaming_trigger
+    "--dedup_window_days"                = tostring(var.dedup_window_days)
+    "--silver_columns"                   = var.silver_columns
+    "--silver_sort_key"                  = var.silver_sort_key
+    "--silver_bloom_columns"             = var.silver_bloom_columns
+    "--enable-continuous-cloudwatch-log" = "true"
+    "--enable-metrics"                   = "true"
+    "--enable-continuous-log-filter"     = "true"
+    "--continuous-log-logGroup"          = aws_cloudwatch_log_group.bronze_silver_log_group.name
+    "--continuous-log-logStreamPrefix"   = "bronze-silver-streaming-"
+  }
+
+  glue_version      = var.glue_version
+  number_of_workers = var.number_of_workers
+  worker_type       = var.worker_type
+  max_retries       = 1
+  timeout           = 30
+
+  tags = {
+    Name  = "${var.project}-bronze-to-silver-streaming"
+    Layer = "medallion-silver"
+  }
+}
+
 # Silver to Gold Job  
 resource "aws_glue_job" "silver_to_gold_job" {
   name     = "${var.project}-silver-to-gold-job"
@@ -121,6 +201,7 @@ resource "aws_glue_job" "silver_to_gold_job" {
     "--project"                          = var.project
     "--bucket"                           = var.data_lake_bucket_name
     "--database"                         = aws_glue_catalog_database.data_database.name
+    "--extra-py-files"                   = local.extra_py_files
     "--enable-continuous-cloudwatch-log" = "true"
     "--enable-metrics"                   = "true"
     "--enable-spark-ui"                  = "true"
@@ -142,6 +223,65 @@ resource "aws_glue_job" "silver_to_gold_job" {
   }
 }
 
+# Silver Compaction Job
+resource "aws_glue_job" "silver_compaction_job" {
+  name     = "${var.project}-silver-compaction-job"
+  role_arn = var.glue_role_arn
+
+  command {
+    script_location = "s3://${var.data_lake_bucket_name}/glue_scripts/silver_compaction.py"
+    python_version  = "3"
+  }
+
+  default_arguments = {
+    "--job-language"                     = "python"
+    "--project"                          = var.project
+    "--bucket"                           = var.data_lake_bucket_name
+    "--extra-py-files"                   = local.extra_py_files
+    "--target_file_mb"                   = tostring(var.compaction_target_file_mb)
+    "--sort_key"                         = var.compaction_sort_key
+    "--lookback_days"                    = tostring(var.compaction_lookback_days)
+    "--bloom_columns"                    = var.silver_bloom_columns
+    "--database"                         = aws_glue_catalog_database.data_database.name
+    "--catalog_table"                    = "silver_silver"
+    "--crawler_name"                     = try(aws_glue_crawler.silver_crawler[0].name, "")
+    "--enable-continuous-cloudwatch-log" = "true"
+    "--enable-metrics"                   = "true"
+    "--enable-continuous-log-filter"     = "true"
+    "--continuous-log-logGroup"          = aws_cloudwatch_log_group.silver_compaction_log_group.name
+    "--continuous-log-logStreamPrefix"   = "silver-compaction-"
+  }
+
+  glue_version      = var.glue_version
+  number_of_workers = var.number_of_workers
+  worker_type       = var.worker_type
+  max_retries       = 0
+  timeout           = 60
+
+  tags = {
+    Name  = "${var.project}-silver-compaction"
+    Layer = "medallion-silver"
+  }
+}
+
+resource "aws_glue_trigger" "silver_compaction_schedule" {
+  count    = var.compaction_schedule_cron != "" ? 1 : 0
+  name     = "${var.project}-${var.environment}-silver-compaction-schedule"
+  type     = "SCHEDULED"
+  schedule = var.compaction_schedule_cron
+
+  actions {
+    job_name = aws_glue_job.silver_compaction_job.name
+  }
+
+  tags = {
+    Name        = "${var.project}-${var.environment}-silver-compaction-schedule"
+    Environment = var.environment
+    Project     = var.project
+    ManagedBy   = "Terraform"
+  }
+}
+
 
 
 # Upload Bronze→Silver script
@@ -158,6 +298,20 @@ resource "aws_s3_object" "bronze_to_silver_script" {
   }
 }
 
+# Upload Bronze→Silver streaming script
+resource "aws_s3_object" "bronze_to_silver_streaming_script" {
+  count  = var.upload_scripts && var.enable_bronze_streaming ? 1 : 0
+  bucket = var.data_lake_bucket_name
+  key    = "glue_scripts/bronze_silver_streaming.py"
+  source = "${path.root}/${var.local_glue_scripts_root}/bronze_silver_streaming.py"
+  etag   = filemd5("${path.root}/${var.local_glue_scripts_root}/bronze_silver_streaming.py")
+
+  tags = {
+    Name  = "bronze-to-silver-streaming-script"
+    Layer = "medallion-silver"
+  }
+}
+
 # Upload Silver→Gold script
 resource "aws_s3_object" "silver_to_gold_script" {
   count  = var.upload_scripts ? 1 : 0
@@ -172,6 +326,34 @@ resource "aws_s3_object" "silver_to_gold_script" {
   }
 }
 
+# Upload silver compaction script
+resource "aws_s3_object" "silver_compaction_script" {
+  count  = var.upload_scripts ? 1 : 0
+  bucket = var.data_lake_bucket_name
+  key    = "glue_scripts/silver_compaction.py"
+  source = "${path.root}/${var.local_glue_scripts_root}/silver_compaction.py"
+  etag   = filemd5("${path.root}/${var.local_glue_scripts_root}/silver_compaction.py")
+
+  tags = {
+    Name  = "silver-compaction-script"
+    Layer = "medallion-silver"
+  }
+}
+
+# Upload shared modules imported by the job scripts (--extra-py-files)
+resource "aws_s3_object" "shared_modules" {
+  for_each = var.upload_scripts ? toset(local.shared_modules) : toset([])
+  bucket   = var.data_lake_bucket_name
+  key      = "glue_scripts/${each.value}"
+  source   = "${path.root}/${var.local_glue_scripts_root}/${each.value}"
+  etag     = filemd5("${path.root}/${var.local_glue_scripts_root}/${each.value}")
+
+  tags = {
+    Name  = replace(trimsuffix(each.value, ".py"), "_", "-")
+    Layer = "medallion-shared"
+  }
+}
+
 # Professional Glue Job Log Groups
 resource "aws_cloudwatch_log_group" "bronze_silver_log_group" {
   name              = "/aws-glue/jobs/${var.project}-${var.environment}-bronze-silver"
@@ -199,6 +381,19 @@ resource "aws_cloudwatch_log_group" "silver_gold_log_group" {
 }
 
 
+resource "aws_cloudwatch_log_group" "silver_compaction_log_group" {
+  name              = "/aws-glue/jobs/${var.project}-${var.environment}-silver-compaction"
+  retention_in_days = var.log_retention_days
+
+  tags = {
+    Name        = "${var.project}-${var.environment}-silver-compaction-logs"
+    Environment = var.environment
+    Project     = var.project
+    ManagedBy   = "Terraform"
+  }
+}
+
+
 
 # Data Quality Alarms
 resource "aws_cloudwatch_metric_alarm" "data_quality_bronze_silver" {
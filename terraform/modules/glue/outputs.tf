@@ -9,6 +9,11 @@ output "bronze_to_silver_job_arn" {
   value       = aws_glue_job.bronze_to_silver_job.arn
 }
 
+output "bronze_to_silver_streaming_job_name" {
+  description = "Name of the streaming Bronze→Silver Glue job"
+  value       = try(aws_glue_job.bronze_to_silver_streaming_job[0].name, null)
+}
+
 # Silver→Gold Job Outputs
 output "silver_to_gold_job_name" {
   description = "Name of the Silver→Gold Glue job"
@@ -20,6 +25,12 @@ output "silver_to_gold_job_arn" {
   value       = aws_glue_job.silver_to_gold_job.arn
 }
 
+# Silver Compaction Job Outputs
+output "silver_compaction_job_name" {
+  description = "Name of the silver compaction Glue job"
+  value       = aws_glue_job.silver_compaction_job.name
+}
+
 output "silver_crawler_name" {
   description = "Name of the Silver layer Glue crawler"
   value       = try(aws_glue_crawler.silver_crawler[0].name, null)
@@ -81,6 +81,96 @@ variable "dq_threshold_silver_gold" {
   default     = 50
 }
 
+variable "bronze_schema_drift_mode" {
+  description = "Bronze->Silver handling of unknown bronze columns: off, warn or fail"
+  type        = string
+  default     = "warn"
+}
+
+variable "enable_diagnostic_counts" {
+  description = "Run extra debugging actions in Bronze->Silver (schema print)"
+  type        = bool
+  default     = false
+}
+
+variable "dedup_window_days" {
+  description = "Days of event_id history Bronze->Silver deduplicates against (0 disables; the index under _dedup/ expires after 30 days)"
+  type        = number
+  default     = 7
+}
+
+variable "bronze_lookback_days" {
+  description = "Days before the oldest bronze day that may hold unprocessed files (the manifest low-water mark) that Bronze->Silver lists again for late files (run with --full_bronze_listing true to list everything)"
+  type        = number
+  default     = 1
+}
+
+variable "bronze_batch_mb_per_core" {
+  description = "Bronze->Silver batch size per executor core in MB; a backlog is split into batches of about this times the executor cores"
+  type        = number
+  default     = 128
+}
+
+variable "silver_columns" {
+  description = "Bronze fields carried into silver: default (fields validation, enrichment and gold use), all, or a comma-separated allowlist"
+  type        = string
+  default     = "default"
+}
+
+variable "silver_sort_key" {
+  description = "Comma-separated silver columns rows are sorted by within each file, for row group min/max skipping"
+  type        = string
+  default     = "event_ts"
+}
+
+variable "silver_bloom_columns" {
+  description = "Comma-separated silver columns written with Parquet bloom filters, for point lookups"
+  type        = string
+  default     = "event_id,user_id"
+}
+
+variable "enable_silver_raw" {
+  description = "Keep the bronze fields left out of silver in the cold silver_raw/ table"
+  type        = bool
+  default     = false
+}
+
+variable "enable_bronze_streaming" {
+  description = "Create the Structured Streaming Bronze->Silver job (use instead of the batch job, not alongside it)"
+  type        = bool
+  default     = false
+}
+
+variable "bronze_streaming_trigger" {
+  description = "Streaming Bronze->Silver trigger: available_now, once or processing_time"
+  type        = string
+  default     = "available_now"
+}
+
+variable "compaction_target_file_mb" {
+  description = "Target size of compacted silver Parquet files in MB"
+  type        = number
+  default     = 128
+}
+
+variable "compaction_sort_key" {
+  description = "Comma-separated columns compacted silver files are sorted by"
+  type        = string
+  default     = "event_ts"
+}
+
+variable "compaction_lookback_days" {
+  description = "Days of silver partitions (before today) each compaction run covers"
+  type        = number
+  default     = 2
+}
+
+variable "compaction_schedule_cron" {
+  description = "Cron for the silver compaction job (empty disables the schedule)"
+  type        = string
+  default     = ""
+}
+
 variable "glue_role_arn" {
   description = "ARN of the Glue execution role"
   type        = string
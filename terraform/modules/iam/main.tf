@@ -34,6 +34,49 @@ resource "aws_iam_role_policy" "lambda_execution_policy" {
           "arn:aws:s3:::${var.data_lake_bucket_name}",
           "arn:aws:s3:::${var.data_lake_bucket_name}/*"
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:Scan"
+        ]
+        Resource = "arn:aws:dynamodb:*:*:table/${var.project}-trigger-state"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = "arn:aws:sqs:*:*:${var.project}-trigger-queue"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject"
+        ]
+        Resource = [
+          "arn:aws:s3:::${var.data_lake_bucket_name}/silver/*",
+          "arn:aws:s3:::${var.data_lake_bucket_name}/_manifests/*",
+          "arn:aws:s3:::${var.data_lake_bucket_name}/_dedup/*",
+          "arn:aws:s3:::${var.data_lake_bucket_name}/_stats/*",
+          "arn:aws:s3:::${var.data_lake_bucket_name}/_changes/*"
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:DeleteObject"
+        ]
+        Resource = [
+          "arn:aws:s3:::${var.data_lake_bucket_name}/_manifests/bronze_silver/leases/*",
+          "arn:aws:s3:::${var.data_lake_bucket_name}/silver/*",
+          "arn:aws:s3:::${var.data_lake_bucket_name}/_dedup/*"
+        ]
       }
     ]
   })
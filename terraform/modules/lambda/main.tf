@@ -1,3 +1,19 @@
+locals {
+  # Pending coalescing windows and the shared duplicate-event cache share a table
+  create_trigger_state = var.enable_coalescing || var.enable_event_dedupe
+
+  lambda_code_dir  = "${path.root}/../src/lambda_code"
+  glue_scripts_dir = "${path.root}/../src/glue_scripts"
+  # Glue job modules the fast path imports (standard library and s3_listing
+  # only), packaged next to the Lambda code
+  glue_shared_modules = [
+    "layer_stats.py",
+    "partition_commit.py",
+    "s3_listing.py",
+    "writer_lease.py",
+  ]
+}
+
 # Lambda function
 resource "aws_lambda_function" "data_pipeline_lambda" {
   filename      = data.archive_file.lambda_zip.output_path
@@ -6,7 +22,9 @@ resource "aws_lambda_function" "data_pipeline_lambda" {
   handler       = "lambda_function.lambda_handler"
   runtime       = "python3.9"
   timeout       = 300 # 5 minutes
-  memory_size   = 128
+  # The small-file fast path parses and writes Parquet in-process
+  memory_size = var.small_file_max_bytes > 0 ? 1024 : 128
+  layers      = var.small_file_max_bytes > 0 ? var.fast_path_layer_arns : []
 
   #  logging configuration to use custom log group
   logging_config {
@@ -22,6 +40,18 @@ resource "aws_lambda_function" "data_pipeline_lambda" {
       SILVER_TO_GOLD_JOB_NAME   = var.silver_to_gold_job_name
       STATE_MACHINE_ARN         = var.state_machine_arn
       LOG_GROUP_NAME            = aws_cloudwatch_log_group.lambda_log_group.name
+      COALESCE_ENABLED          = var.enable_coalescing ? "true" : "false"
+      COALESCE_WINDOW_SECONDS   = tostring(var.coalesce_window_seconds)
+      COALESCE_MAX_BYTES        = tostring(var.coalesce_max_bytes)
+      TRIGGER_STATE_BACKEND     = "dynamodb"
+      TRIGGER_STATE_TABLE       = local.create_trigger_state ? aws_dynamodb_table.trigger_state[0].name : ""
+      DEDUPE_STATE_ENABLED      = var.enable_event_dedupe ? "true" : "false"
+      DEDUPE_TTL_SECONDS        = tostring(var.dedupe_ttl_seconds)
+      SMALL_FILE_MAX_BYTES      = tostring(var.small_file_max_bytes)
+      DEDUP_WINDOW_DAYS         = tostring(var.dedup_window_days)
+      SILVER_COLUMNS            = var.silver_columns
+      LOG_LEVEL                 = var.log_level
+      METRICS_NAMESPACE         = "${var.project}/Trigger"
     }
   }
 
@@ -33,11 +63,118 @@ resource "aws_lambda_function" "data_pipeline_lambda" {
   }
 }
 
-#  ZIP file from Lambda code
+#  ZIP file from Lambda code and the shared Glue modules
 data "archive_file" "lambda_zip" {
   type        = "zip"
-  source_dir  = "${path.root}/../src/lambda_code"
   output_path = "${path.root}/../src/lambda_function.zip"
+
+  dynamic "source" {
+    for_each = fileset(local.lambda_code_dir, "*.py")
+    content {
+      content  = file("${local.lambda_code_dir}/${source.value}")
+      filename = source.value
+    }
+  }
+
+  dynamic "source" {
+    for_each = toset(local.glue_shared_modules)
+    content {
+      content  = file("${local.glue_scripts_dir}/${source.value}")
+      filename = source.value
+    }
+  }
+}
+
+# SQS-batched trigger: S3 -> queue -> sqs_handler with partial batch failures
+resource "aws_sqs_queue" "trigger_dlq" {
+  count                     = var.enable_sqs_trigger ? 1 : 0
+  name                      = "${var.project}-trigger-dlq"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = {
+    Name        = "${var.project}-trigger-dlq"
+    Environment = var.environment
+    Project     = var.project
+    Purpose     = "data-pipeline-trigger-dlq"
+  }
+}
+
+resource "aws_sqs_queue" "trigger_queue" {
+  count                      = var.enable_sqs_trigger ? 1 : 0
+  name                       = "${var.project}-trigger-queue"
+  visibility_timeout_seconds = 6 * aws_lambda_function.data_pipeline_lambda.timeout
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.trigger_dlq[0].arn
+    maxReceiveCount     = 5
+  })
+
+  tags = {
+    Name        = "${var.project}-trigger-queue"
+    Environment = var.environment
+    Project     = var.project
+    Purpose     = "data-pipeline-trigger-queue"
+  }
+}
+
+resource "aws_sqs_queue_policy" "trigger_queue_policy" {
+  count     = var.enable_sqs_trigger ? 1 : 0
+  queue_url = aws_sqs_queue.trigger_queue[0].id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect    = "Allow"
+        Principal = { Service = "s3.amazonaws.com" }
+        Action    = "sqs:SendMessage"
+        Resource  = aws_sqs_queue.trigger_queue[0].arn
+        Condition = {
+          ArnLike = { "aws:SourceArn" = "arn:aws:s3:::${var.data_lake_bucket_name}" }
+        }
+      }
+    ]
+  })
+}
+
+# Same package as the S3 trigger, SQS entry point
+resource "aws_lambda_function" "sqs_trigger_lambda" {
+  count         = var.enable_sqs_trigger ? 1 : 0
+  filename      = data.archive_file.lambda_zip.output_path
+  function_name = "${var.project}-data-pipeline-sqs-lambda"
+  role          = var.lambda_execution_role_arn
+  handler       = "lambda_function.sqs_handler"
+  runtime       = "python3.9"
+  timeout       = aws_lambda_function.data_pipeline_lambda.timeout
+  memory_size   = var.small_file_max_bytes > 0 ? 1024 : 256
+  layers        = aws_lambda_function.data_pipeline_lambda.layers
+
+  logging_config {
+    log_group  = aws_cloudwatch_log_group.lambda_log_group.name
+    log_format = "Text"
+  }
+
+  environment {
+    variables = merge(aws_lambda_function.data_pipeline_lambda.environment[0].variables, {
+      SQS_MAX_WORKERS = tostring(var.sqs_max_workers)
+    })
+  }
+
+  tags = {
+    Name        = "${var.project}-data-pipeline-sqs-lambda"
+    Environment = var.environment
+    Project     = var.project
+    Purpose     = "data-pipeline-trigger"
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "trigger_queue_mapping" {
+  count                              = var.enable_sqs_trigger ? 1 : 0
+  event_source_arn                   = aws_sqs_queue.trigger_queue[0].arn
+  function_name                      = aws_lambda_function.sqs_trigger_lambda[0].arn
+  batch_size                         = var.sqs_batch_size
+  maximum_batching_window_in_seconds = var.sqs_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
 }
 
 # Lambda permission for S3 to invoke
@@ -63,6 +200,54 @@ resource "aws_cloudwatch_log_group" "lambda_log_group" {
   }
 }
 
+# Trigger state table for pending keys and recently seen S3 events
+resource "aws_dynamodb_table" "trigger_state" {
+  count        = local.create_trigger_state ? 1 : 0
+  name         = "${var.project}-trigger-state"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "${var.project}-trigger-state"
+    Environment = var.environment
+    Project     = var.project
+    Purpose     = "data-pipeline-trigger-state"
+  }
+}
+
+# Scheduled flush so a quiet bucket still releases an open coalescing window
+resource "aws_cloudwatch_event_rule" "coalesce_flush" {
+  count               = var.enable_coalescing ? 1 : 0
+  name                = "${var.project}-coalesce-flush"
+  description         = "Release expired coalescing windows of the pipeline trigger"
+  schedule_expression = "rate(1 minute)"
+}
+
+resource "aws_cloudwatch_event_target" "coalesce_flush_lambda" {
+  count = var.enable_coalescing ? 1 : 0
+  rule  = aws_cloudwatch_event_rule.coalesce_flush[0].name
+  arn   = aws_lambda_function.data_pipeline_lambda.arn
+}
+
+resource "aws_lambda_permission" "events_invoke_lambda" {
+  count         = var.enable_coalescing ? 1 : 0
+  statement_id  = "AllowExecutionFromEventBridgeFlush"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.data_pipeline_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.coalesce_flush[0].arn
+}
+
 # Data source to reference existing default log group to look up existing log group 
 data "aws_cloudwatch_log_group" "default_lambda_log_group" {
   name = "/aws/lambda/${var.project}-data-pipeline-lambda"
@@ -21,4 +21,19 @@ output "lambda_log_group_name" {
 output "default_lambda_log_group_name" {
   description = "Name of the default Lambda log group (data source)"
   value       = data.aws_cloudwatch_log_group.default_lambda_log_group.name
-}
\ No newline at end of file
+}
+
+output "trigger_state_table_name" {
+  description = "Name of the trigger state DynamoDB table (coalescing/dedupe)"
+  value       = try(aws_dynamodb_table.trigger_state[0].name, null)
+}
+
+output "trigger_queue_arn" {
+  description = "ARN of the SQS trigger queue (SQS trigger mode)"
+  value       = try(aws_sqs_queue.trigger_queue[0].arn, "")
+}
+
+output "sqs_trigger_lambda_name" {
+  description = "Name of the SQS-batched trigger Lambda function"
+  value       = try(aws_lambda_function.sqs_trigger_lambda[0].function_name, null)
+}
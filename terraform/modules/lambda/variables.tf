@@ -32,4 +32,88 @@ variable "silver_to_gold_job_name" {
 variable "state_machine_arn" {
   description = "ARN of the Step Functions state machine"
   type        = string
-}
\ No newline at end of file
+}
+
+variable "enable_coalescing" {
+  description = "Coalesce bronze uploads into one pipeline run per window"
+  type        = bool
+  default     = false
+}
+
+variable "coalesce_window_seconds" {
+  description = "Seconds a coalescing window stays open after its first key"
+  type        = number
+  default     = 60
+}
+
+variable "coalesce_max_bytes" {
+  description = "Pending bytes that release a coalescing window early"
+  type        = number
+  default     = 134217728
+}
+
+variable "enable_event_dedupe" {
+  description = "Share the duplicate S3 event cache across containers via DynamoDB"
+  type        = bool
+  default     = false
+}
+
+variable "dedupe_ttl_seconds" {
+  description = "Seconds a delivered S3 event is remembered for duplicate suppression"
+  type        = number
+  default     = 3600
+}
+
+variable "enable_sqs_trigger" {
+  description = "Deliver bronze notifications through SQS to the batched sqs_handler"
+  type        = bool
+  default     = false
+}
+
+variable "sqs_batch_size" {
+  description = "Maximum messages per sqs_handler invocation"
+  type        = number
+  default     = 100
+}
+
+variable "sqs_batching_window_seconds" {
+  description = "Seconds SQS waits to fill a batch before invoking"
+  type        = number
+  default     = 30
+}
+
+variable "sqs_max_workers" {
+  description = "Threads used by sqs_handler to start executions concurrently"
+  type        = number
+  default     = 8
+}
+
+variable "small_file_max_bytes" {
+  description = "Bronze objects up to this size are transformed in the Lambda (0 disables; not for use with the Bronze->Silver streaming job)"
+  type        = number
+  default     = 0
+}
+
+variable "dedup_window_days" {
+  description = "Days of event_id history the fast path deduplicates against; keep equal to the Glue job's"
+  type        = number
+  default     = 7
+}
+
+variable "silver_columns" {
+  description = "Bronze fields the fast path carries into silver; keep equal to the Glue job's silver_columns"
+  type        = string
+  default     = "default"
+}
+
+variable "fast_path_layer_arns" {
+  description = "Lambda layers providing pyarrow for the small-file fast path"
+  type        = list(string)
+  default     = []
+}
+
+variable "log_level" {
+  description = "Trigger log level; DEBUG adds full event and execution input dumps"
+  type        = string
+  default     = "INFO"
+}
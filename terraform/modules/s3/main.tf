@@ -70,6 +70,22 @@ resource "aws_s3_bucket_lifecycle_configuration" "data_lake_lifecycle" {
     }
   }
 
+  rule {
+    id     = "silver_raw_data_lifecycle"
+    status = "Enabled"
+    filter { prefix = "silver_raw/" }
+
+    # Fields left out of silver, rarely read
+    transition {
+      days          = min(30, var.data_lake_lifecycle_days)
+      storage_class = "STANDARD_IA"
+    }
+    transition {
+      days          = min(90, var.data_lake_lifecycle_days)
+      storage_class = "GLACIER_IR"
+    }
+  }
+
   rule {
     id     = "gold_data_lifecycle"
     status = "Enabled"
@@ -82,6 +98,46 @@ resource "aws_s3_bucket_lifecycle_configuration" "data_lake_lifecycle" {
     }
   }
 
+  rule {
+    id     = "quarantine_data_lifecycle"
+    status = "Enabled"
+    filter { prefix = "quarantine/" }
+
+    transition {
+      days          = min(30, var.data_lake_lifecycle_days)
+      storage_class = "STANDARD_IA"
+    }
+  }
+
+  rule {
+    id     = "dedup_index_lifecycle"
+    status = "Enabled"
+
+    filter {
+      prefix = "_dedup/"
+    }
+
+    # Cross-run event_id index, only the recent window is read
+    expiration {
+      days = 30
+    }
+  }
+
+  rule {
+    id     = "change_log_lifecycle"
+    status = "Enabled"
+
+    filter {
+      prefix = "_changes/"
+    }
+
+    # Committed-batch log, only entries after the gold position are read;
+    # a gold position older than this falls back to reading all of silver
+    expiration {
+      days = 30
+    }
+  }
+
   rule {
     id     = "temp_data_lifecycle"
     status = "Enabled"
@@ -132,6 +188,12 @@ resource "aws_s3_object" "gold_folder" {
   content = ""
 }
 
+resource "aws_s3_object" "quarantine_folder" {
+  bucket  = aws_s3_bucket.data_lake.id
+  key     = "quarantine/"
+  content = ""
+}
+
 resource "aws_s3_object" "glue_scripts_folder" {
   bucket  = aws_s3_bucket.data_lake.id
   key     = "glue_scripts/"
@@ -152,14 +214,29 @@ resource "aws_s3_object" "athena_results_folder" {
 }
 
 # S3 notifications - triggering on bronze
+# Direct Lambda trigger, or the SQS queue when trigger_queue_arn is set
 resource "aws_s3_bucket_notification" "medallion_notification" {
-  count  = var.enable_notifications && var.lambda_function_arn != "" ? 1 : 0
+  count  = var.enable_notifications && (var.lambda_function_arn != "" || var.trigger_queue_arn != "") ? 1 : 0
   bucket = aws_s3_bucket.data_lake.id
 
-  lambda_function {
-    lambda_function_arn = var.lambda_function_arn
-    events              = ["s3:ObjectCreated:CompleteMultipartUpload", "s3:ObjectCreated:Put"]
-    filter_prefix       = "bronze/"
-    filter_suffix       = ".json"
+  # One configuration per suffix (S3 filters take a single suffix each)
+  dynamic "lambda_function" {
+    for_each = var.trigger_queue_arn == "" ? var.bronze_suffixes : []
+    content {
+      lambda_function_arn = var.lambda_function_arn
+      events              = ["s3:ObjectCreated:CompleteMultipartUpload", "s3:ObjectCreated:Put"]
+      filter_prefix       = "bronze/"
+      filter_suffix       = lambda_function.value
+    }
+  }
+
+  dynamic "queue" {
+    for_each = var.trigger_queue_arn != "" ? var.bronze_suffixes : []
+    content {
+      queue_arn     = var.trigger_queue_arn
+      events        = ["s3:ObjectCreated:CompleteMultipartUpload", "s3:ObjectCreated:Put"]
+      filter_prefix = "bronze/"
+      filter_suffix = queue.value
+    }
   }
 }
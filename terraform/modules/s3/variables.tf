@@ -43,4 +43,16 @@ variable "enable_notifications" {
   description = "Create S3 -> Lambda event notification"
   type        = bool
   default     = false
-}
\ No newline at end of file
+}
+
+variable "bronze_suffixes" {
+  description = "Bronze object suffixes that trigger the pipeline (plain and compressed NDJSON)"
+  type        = list(string)
+  default     = [".json", ".json.gz", ".json.bz2", ".json.zst"]
+}
+
+variable "trigger_queue_arn" {
+  description = "SQS queue ARN for batched notifications (replaces the direct Lambda trigger)"
+  type        = string
+  default     = ""
+}